@@ -1,38 +1,267 @@
+import asyncio
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
 from fastmcp import FastMCP
-import sqlite3
-from pathlib import Path
+
+import agregation
+from coins import canonique, referentiel
+from db import ARTICLES_DB_PATH, LEADERBOARD_DB_PATH, BaseIntrouvable, migrer_bases, ouvrir_lecture
+from recherche import rechercher, requete_fts, resultats_tronques
+from snapshots import classement_snapshot, cryptos_du_snapshot, historique_coin, snapshot_courant
+
+# Outils async : chaque base a une seule connexion en lecture, ouverte au
+# premier appel et confiée à un thread dédié (le modèle d'aiosqlite, sans la
+# dépendance). Les requêtes ne bloquent pas la boucle d'événements et passent
+# toutes par la même connexion, son cache de pages et ses requêtes préparées.
+#
+# Le texte de chaque outil est mémorisé par (outil, arguments) tant que
+# PRAGMA data_version de la base ne change pas : un agent qui rappelle le même
+# outil en boucle ne relance pas la requête tant que rien n'a été écrit.
+
+# Nombre de réponses mémorisées par base (0 désactive la mémorisation)
+MCP_CACHE_TAILLE = int(os.getenv("MCP_CACHE_TAILLE", "256"))
+# Nombre maximal de lignes renvoyées par un outil
+LIMITE_MAX = 50
 
 
-# Obtenir le répertoire du script
-SCRIPT_DIR = Path(__file__).parent
-DB_PATH = SCRIPT_DIR / "leaderboard.db"
+@asynccontextmanager
+async def demarrage(serveur):
+    # WAL + schéma à jour avant la première lecture : au démarrage du serveur,
+    # pas à l'import du module (les migrations écrivent dans les deux bases)
+    await asyncio.to_thread(migrer_bases)
+    yield
+
 
 # on créer le serv
-mcp = FastMCP("CryptoLeaderboard")
+mcp = FastMCP("CryptoLeaderboard", lifespan=demarrage)
 
 
-@mcp.tool()    #définit la fonction comme publique en java
-def lire_classement_crypto(limit: int = 5) -> str:
-    try:
-        conn = sqlite3.connect(str(DB_PATH))
-        cursor = conn.cursor() # sert a exectuer les commandes sql fournit de base
+class Lecteur:
+    """Connexion en lecture d'une base, utilisée depuis un seul thread, et ses réponses mémorisées."""
+
+    def __init__(self, db_path, taille_cache=MCP_CACHE_TAILLE):
+        self.db_path = db_path
+        self.taille_cache = taille_cache
+        self._executeur = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"mcp-{db_path.stem}")
+        self._conn = None
+        self._memo = OrderedDict()  # (outil, arguments) -> (data_version, texte)
+
+    def _executer(self, cle, fonction, args):
+        # toujours dans le thread du lecteur : ni la connexion ni _memo ne sont partagés
+        if self._conn is None:
+            if not self.db_path.exists():
+                raise BaseIntrouvable(f"Base de données introuvable à : {self.db_path}")
+            self._conn = ouvrir_lecture(self.db_path)
+
+        if not self.taille_cache:
+            return fonction(self._conn, *args)
+
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        en_cache = self._memo.get(cle)
+        if en_cache is not None and en_cache[0] == version:
+            self._memo.move_to_end(cle)
+            return en_cache[1]
+
+        texte = fonction(self._conn, *args)
+        self._memo[cle] = (version, texte)
+        self._memo.move_to_end(cle)
+        if len(self._memo) > self.taille_cache:
+            self._memo.popitem(last=False)
+        return texte
+
+    async def appeler(self, fonction, *args):
+        """Résultat de `fonction(conn, *args)`, calculé dans le thread du lecteur ou mémorisé."""
+        cle = (fonction.__name__, args)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executeur, self._executer, cle, fonction, args
+        )
 
-        cursor.execute("SELECT rank, name, symbol, count FROM classement ORDER BY rank LIMIT ?", (limit,))
-        rows = cursor.fetchall()
-        conn.close()
 
-        if not rows:
-            return "Aucune donnée trouvée."
+articles = Lecteur(ARTICLES_DB_PATH)
+leaderboard = Lecteur(LEADERBOARD_DB_PATH)
 
-        resultat = "Voici le classement actuel :\n"
-        for row in rows:
-            resultat += f"#{row[0]} {row[1]} ({row[2]}) - Mentionné {row[3]} fois\n"
 
-        return resultat
+def borner(limit):
+    return min(max(limit, 1), LIMITE_MAX)
 
+
+async def outil(lecteur, fonction, *args, erreur="Erreur lors de la lecture de la DB"):
+    try:
+        return await lecteur.appeler(fonction, *args)
     except Exception as e:
-        return f"Erreur lors de la lecture de la DB : {str(e)}"
+        return f"{erreur} : {str(e)}"
+
+
+# Requêtes des outils : exécutées dans le thread d'un Lecteur, elles retournent le texte final
+
+def _classement(conn, limit):
+    ref = referentiel(LEADERBOARD_DB_PATH)
+    rows = classement_snapshot(conn, snapshot_courant(conn), limit)
+    if not rows:
+        return "Aucune donnée trouvée."
+    lignes = ["Voici le classement actuel :"]
+    for rank, coin_id, count, _ in rows:
+        symbol, name = ref.coin(conn, coin_id)
+        lignes.append(f"#{rank} {name} ({symbol}) - Mentionné {count} fois")
+    return "\n".join(lignes) + "\n"
+
+
+def _cryptos(conn, symboles):
+    ref = referentiel(LEADERBOARD_DB_PATH)
+    ids = [ref.coin_id(conn, symbol) for symbol in symboles]
+    trouves = cryptos_du_snapshot(conn, snapshot_courant(conn), [i for i in ids if i is not None])
+    lignes = ["Classement actuel :"]
+    for symbol, coin_id in zip(symboles, ids):
+        row = trouves.get(coin_id)
+        if row is None:
+            lignes.append(f"{symbol} - absent du classement")
+        else:
+            symbol, name = ref.coin(conn, coin_id)
+            lignes.append(f"#{row[0]} {name} ({symbol}) - Mentionné {row[2]} fois")
+    return "\n".join(lignes) + "\n"
+
+
+def _rang(conn, symbol):
+    """Ligne de détail du classement courant pour un symbole."""
+    ref = referentiel(LEADERBOARD_DB_PATH)
+    coin_id = ref.coin_id(conn, symbol)
+    row = cryptos_du_snapshot(conn, snapshot_courant(conn), [coin_id]).get(coin_id) if coin_id is not None else None
+    if row is None:
+        return f"{symbol} - absent du classement actuel"
+    symbol, name = ref.coin(conn, coin_id)
+    return f"{name} ({symbol}) : #{row[0]} du classement du {row[3]}, mentionné {row[2]} fois"
+
+
+def _mentions_recentes(conn, symbol, heure):
+    """Mentions d'un symbole sur les fenêtres de agregation.FENETRES, lues dans mentions_horaires."""
+    comptes = []
+    for fenetre, heures in agregation.FENETRES.items():
+        n = conn.execute(
+            "SELECT COALESCE(SUM(count), 0) FROM mentions_horaires WHERE heure >= ? AND symbol = ?",
+            (heure - heures + 1, symbol)
+        ).fetchone()[0]
+        comptes.append(f"{n} sur {fenetre}")
+    return "Mentions récentes : " + ", ".join(comptes)
+
+
+def _historique(conn, symbol, limit):
+    ref = referentiel(LEADERBOARD_DB_PATH)
+    coin_id = ref.coin_id(conn, symbol)
+    rows = historique_coin(conn, coin_id, limit) if coin_id is not None else []
+    if not rows:
+        return f"{symbol} n'apparaît dans aucun classement."
+    symbol, name = ref.coin(conn, coin_id)
+    lignes = [f"Historique de {name} ({symbol}), du plus récent au plus ancien :"]
+    for snapshot_id, created_at, rank, count in rows:
+        lignes.append(f"- snapshot #{snapshot_id} ({created_at}) : #{rank}, {count} mentions")
+    return "\n".join(lignes) + "\n"
+
+
+def _derniers_articles(conn, limit):
+    rows = conn.execute("""
+        SELECT titre, lien, date_ajout
+        FROM articles
+        ORDER BY date_ajout DESC, id DESC
+        LIMIT ?
+    """, (limit,)).fetchall()
+    if not rows:
+        return "Aucun article en base."
+    return "\n".join(["Derniers articles :", *(f"- {titre} ({date})\n  {lien}" for titre, lien, date in rows)]) + "\n"
+
+
+def _recherche(conn, requete, limit):
+    requete_sql = requete_fts(requete)
+    if not requete_sql:
+        return "La recherche ne contient aucun mot."
+    rows = rechercher(conn, requete_sql, limit)
+    if not rows:
+        return f"Aucun article trouvé pour « {requete} »."
+    lignes = [f"Articles trouvés pour « {requete} » :"]
+    for row in rows:
+        lignes.append(f"- {row[1]} ({row[3]})\n  {row[4]}\n  {row[2]}")
+    if resultats_tronques(conn, requete_sql):
+        lignes.append("(classement limité aux articles trouvés les plus récents : d'autres articles correspondent)")
+    return "\n".join(lignes) + "\n"
+
+
+def _articles_crypto(conn, symbol, limit):
+    rows = agregation.articles_mentionnant(conn, symbol, limit)
+    if not rows:
+        return f"Aucun article ne cite {symbol}."
+    lignes = [f"Articles qui citent {symbol} :"]
+    for row in rows:
+        lignes.append(f"- {row[1]} ({row[3]})\n  {row[2]}")
+    return "\n".join(lignes) + "\n"
+
+
+def _co_mentions(conn, symbol, limit):
+    rows = agregation.co_mentions(conn, symbol, limit)
+    if not rows:
+        return f"Aucune crypto n'est citée avec {symbol}."
+    lignes = [f"Cryptos citées avec {symbol} :"]
+    for row in rows:
+        lignes.append(f"- {row[1] or row[0]} ({row[0]}) - dans {row[2]} articles")
+    return "\n".join(lignes) + "\n"
+
+
+@mcp.tool()    #définit la fonction comme publique en java
+async def lire_classement_crypto(limit: int = 5) -> str:
+    """Classement actuel des cryptos les plus citées (50 au plus)."""
+    return await outil(leaderboard, _classement, borner(limit))
+
+
+@mcp.tool()
+async def lire_cryptos(symbols: list[str]) -> str:
+    """Rang et mentions de plusieurs cryptos (ex: une watchlist ["BTC", "ETH", "SOL"]), en un appel."""
+    symboles = tuple(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))[:100]
+    if not symboles:
+        return "Aucun symbole demandé."
+    return await outil(leaderboard, _cryptos, symboles)
+
+
+@mcp.tool()
+async def detail_crypto(symbol: str) -> str:
+    """Fiche d'une crypto (ex: BTC ou un alias comme XBT) : rang actuel et mentions sur 1h, 24h et 7 jours."""
+    symbol = canonique(symbol)[0]
+    rang, recentes = await asyncio.gather(
+        outil(leaderboard, _rang, symbol),
+        outil(articles, _mentions_recentes, symbol, agregation.heure_courante()),
+    )
+    return f"{rang}\n{recentes}\n"
+
+
+@mcp.tool()
+async def historique_crypto(symbol: str, limit: int = 10) -> str:
+    """Rang et mentions d'une crypto dans les derniers classements produits (50 au plus)."""
+    return await outil(leaderboard, _historique, canonique(symbol)[0], borner(limit))
+
+
+@mcp.tool()
+async def derniers_articles(limit: int = 5) -> str:
+    """Articles les plus récemment ajoutés (50 au plus)."""
+    return await outil(articles, _derniers_articles, borner(limit))
+
+
+@mcp.tool()
+async def rechercher_articles(requete: str, limit: int = 5) -> str:
+    """Recherche plein texte dans les articles (titre et résumé), du plus pertinent au moins pertinent."""
+    return await outil(articles, _recherche, requete, borner(limit), erreur="Erreur lors de la recherche")
+
+
+@mcp.tool()
+async def articles_crypto(symbol: str, limit: int = 5) -> str:
+    """Articles les plus récents qui citent une crypto (ex: ETH), pour expliquer son rang."""
+    return await outil(articles, _articles_crypto, canonique(symbol)[0], borner(limit))
+
+
+@mcp.tool()
+async def cryptos_citees_avec(symbol: str, limit: int = 5) -> str:
+    """Cryptos le plus souvent citées dans les mêmes articles qu'une crypto donnée (ex: SOL)."""
+    return await outil(articles, _co_mentions, canonique(symbol)[0], borner(limit))
 
 
 if __name__ == "__main__":
-    mcp.run() #lance le serveur
\ No newline at end of file
+    mcp.run() #lance le serveur
@@ -0,0 +1,266 @@
+import json
+import time
+from collections import Counter
+
+from coins import canonique
+
+# Compteurs de mentions par symbole canonique (coins.py : « XBT » compte pour
+# BTC, « Ether » pour Ethereum), tenus à jour article par article : une
+# nouvelle extraction ajoute ses coins, une extraction remplacée retire les
+# anciens. Le classement se calcule ensuite en SQL sur ces compteurs, sans
+# repasser sur l'ensemble des articles.
+#
+# La table article_coins garde en plus quel article cite quel coin, indexée
+# dans les deux sens : articles d'une crypto, cryptos citées ensemble.
+#
+# mentions_horaires compte les mentions par heure de publication de l'article
+# (heure d'ajout à défaut) et par symbole : les classements sur 1h / 24h / 7j
+# et les tendances ne lisent que les heures de la fenêtre, quel que soit le
+# nombre total d'articles.
+
+# Fenêtres acceptées par classement_fenetre et tendances, en heures
+FENETRES = {"1h": 1, "24h": 24, "7d": 24 * 7}
+
+
+def mentions(article_id, coins):
+    """
+    (symbol, name, position) des coins retenus pour un article.
+
+    `position` ordonne les premières mentions (article puis rang dans
+    l'extraction) et départage les ex aequo comme l'ancien tri Python. Un coin
+    cité sous deux alias dans le même article ne compte qu'une fois.
+    """
+    vus = set()
+    for i, coin in enumerate(coins or []):
+        symbol, name = canonique(coin['symbol'], coin['name'])
+        if 2 <= len(symbol) <= 8 and symbol not in vus:
+            vus.add(symbol)
+            yield symbol, name, article_id * 1000 + i
+
+
+def appliquer_delta(conn, anciens, nouveaux):
+    """
+    Met à jour les compteurs, dans la transaction en cours de `conn`.
+
+    `anciens` et `nouveaux` sont des listes de (article_id, coins) : les
+    extractions remplacées (à retirer) et les nouvelles (à ajouter).
+    """
+    delta = Counter()
+    noms = {}
+    premieres = {}
+
+    for article_id, coins in anciens:
+        for symbol, _, _ in mentions(article_id, coins):
+            delta[symbol] -= 1
+
+    for article_id, coins in nouveaux:
+        for symbol, name, position in mentions(article_id, coins):
+            delta[symbol] += 1
+            noms[symbol] = name  # nom canonique ; hors dictionnaire, le dernier vu l'emporte
+            premieres[symbol] = min(position, premieres.get(symbol, position))
+
+    conn.executemany("""
+        INSERT INTO compteurs_cryptos (symbol, name, count, premiere_mention)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (symbol) DO UPDATE SET
+            count = count + excluded.count,
+            name = CASE WHEN excluded.name != '' THEN excluded.name ELSE name END,
+            premiere_mention = MIN(premiere_mention, excluded.premiere_mention)
+    """, [
+        (symbol, noms.get(symbol, ""), n, premieres.get(symbol, 1 << 62))
+        for symbol, n in delta.items()
+        if n != 0 or symbol in noms
+    ])
+    conn.execute("DELETE FROM compteurs_cryptos WHERE count <= 0")
+
+
+def recompter(conn):
+    """Reconstruit les compteurs depuis toutes les extractions (initialisation, réparation)."""
+    conn.execute("DELETE FROM compteurs_cryptos")
+    appliquer_delta(conn, [], (
+        (article_id, json.loads(coins))
+        for article_id, coins in conn.execute("SELECT article_id, coins FROM extractions ORDER BY article_id")
+    ))
+
+
+def indexer_mentions(conn, anciens, nouveaux):
+    """Met à jour article_coins, dans la transaction en cours ; mêmes arguments qu'appliquer_delta."""
+    conn.executemany(
+        "DELETE FROM article_coins WHERE article_id = ?",
+        [(article_id,) for article_id, _ in anciens]
+    )
+    conn.executemany("INSERT OR IGNORE INTO article_coins (article_id, symbol) VALUES (?, ?)", [
+        (article_id, symbol)
+        for article_id, coins in nouveaux
+        for symbol, _, _ in mentions(article_id, coins)
+    ])
+
+
+def reindexer_mentions(conn):
+    """Reconstruit article_coins depuis toutes les extractions."""
+    conn.execute("DELETE FROM article_coins")
+    indexer_mentions(conn, [], (
+        (article_id, json.loads(coins))
+        for article_id, coins in conn.execute("SELECT article_id, coins FROM extractions")
+    ))
+
+
+def heures_articles(conn, article_ids):
+    """
+    Heure de publication de chaque article, en heures depuis l'epoch (UTC) ;
+    date_ajout quand le flux ne donnait pas de date. Un rattrapage d'archives
+    range ainsi ses mentions à leur heure de publication, pas toutes dans
+    l'heure de son passage.
+    """
+    if not article_ids:
+        # base vide pendant les migrations 5 et 6, avant la colonne date_publication (9)
+        return {}
+    return dict(conn.execute("""
+        SELECT id, CAST(strftime('%s', COALESCE(date_publication, date_ajout)) AS INTEGER) / 3600
+        FROM articles
+        WHERE id IN (SELECT value FROM json_each(?))
+    """, (json.dumps(sorted(article_ids)),)))
+
+
+def appliquer_delta_horaire(conn, anciens, nouveaux):
+    """Met à jour mentions_horaires, dans la transaction en cours ; mêmes arguments qu'appliquer_delta."""
+    anciens, nouveaux = list(anciens), list(nouveaux)
+    heures = heures_articles(conn, {article_id for article_id, _ in anciens + nouveaux})
+    delta = Counter()
+    for signe, extractions in ((-1, anciens), (1, nouveaux)):
+        for article_id, coins in extractions:
+            heure = heures.get(article_id)
+            if heure is None:
+                continue
+            for symbol, _, _ in mentions(article_id, coins):
+                delta[heure, symbol] += signe
+
+    conn.executemany("""
+        INSERT INTO mentions_horaires (heure, symbol, count)
+        VALUES (?, ?, ?)
+        ON CONFLICT (heure, symbol) DO UPDATE SET count = count + excluded.count
+    """, [(heure, symbol, n) for (heure, symbol), n in delta.items() if n != 0])
+    conn.executemany(
+        "DELETE FROM mentions_horaires WHERE heure = ? AND symbol = ? AND count <= 0",
+        [(heure, symbol) for (heure, symbol), n in delta.items() if n < 0]
+    )
+
+
+def recompter_horaires(conn):
+    """Reconstruit mentions_horaires depuis toutes les extractions."""
+    conn.execute("DELETE FROM mentions_horaires")
+    appliquer_delta_horaire(conn, [], [
+        (article_id, json.loads(coins))
+        for article_id, coins in conn.execute("SELECT article_id, coins FROM extractions")
+    ])
+
+
+def heure_courante():
+    return int(time.time()) // 3600
+
+
+def classement(conn):
+    """Classement courant, rangs calculés en SQL à partir des compteurs."""
+    return [
+        {"rank": rank, "symbol": symbol, "name": name, "count": count}
+        for rank, symbol, name, count in conn.execute("""
+            SELECT ROW_NUMBER() OVER (ORDER BY count DESC, premiere_mention) AS rank,
+                   symbol, name, count
+            FROM compteurs_cryptos
+            ORDER BY rank
+        """)
+    ]
+
+
+def articles_mentionnant(conn, symbol, limit, avant=None):
+    """
+    (id, titre, lien, date_ajout) des articles qui citent `symbol`, du plus
+    récent au plus ancien ; `avant` : id du dernier article de la page précédente.
+    """
+    return conn.execute(f"""
+        SELECT a.id, a.titre, a.lien, a.date_ajout
+        FROM article_coins m
+        JOIN articles a ON a.id = m.article_id
+        WHERE m.symbol = ?{" AND m.article_id < ?" if avant is not None else ""}
+        ORDER BY m.article_id DESC
+        LIMIT ?
+    """, (canonique(symbol)[0], *([avant] if avant is not None else []), limit)).fetchall()
+
+
+def co_mentions(conn, symbol, limit):
+    """
+    (symbol, name, count) des cryptos le plus souvent citées dans les mêmes
+    articles que `symbol` : jointure de article_coins sur elle-même, par ses
+    deux index, sans relire les extractions.
+    """
+    return conn.execute("""
+        SELECT autre.symbol, c.name, COUNT(*) AS n
+        FROM article_coins cible
+        JOIN article_coins autre
+          ON autre.article_id = cible.article_id AND autre.symbol != cible.symbol
+        LEFT JOIN compteurs_cryptos c ON c.symbol = autre.symbol
+        WHERE cible.symbol = ?
+        GROUP BY autre.symbol
+        ORDER BY n DESC, autre.symbol
+        LIMIT ?
+    """, (canonique(symbol)[0], limit)).fetchall()
+
+
+def classement_fenetre(conn, heures, limit, offset=0, maintenant=None):
+    """
+    Classement sur les `heures` dernières heures (heure en cours comprise), lu
+    dans mentions_horaires. Ex aequo départagés comme le classement global.
+    """
+    debut = (maintenant if maintenant is not None else heure_courante()) - heures + 1
+    return [
+        {"rank": rank, "symbol": symbol, "name": name, "count": count}
+        for rank, symbol, name, count in conn.execute("""
+            SELECT ROW_NUMBER() OVER (
+                       ORDER BY SUM(m.count) DESC, MIN(c.premiere_mention), m.symbol
+                   ) AS rank,
+                   m.symbol, COALESCE(MIN(c.name), m.symbol), SUM(m.count)
+            FROM mentions_horaires m
+            LEFT JOIN compteurs_cryptos c ON c.symbol = m.symbol
+            WHERE m.heure >= ?
+            GROUP BY m.symbol
+            ORDER BY rank
+            LIMIT ? OFFSET ?
+        """, (debut, limit, offset))
+    ]
+
+
+def tendances(conn, heures, limit, minimum=2, maintenant=None):
+    """
+    Cryptos dont les mentions accélèrent : mentions des `heures` dernières
+    heures comparées aux `heures` précédentes.
+
+    score = (actuel - précédent) / (précédent + 1) : 0 à volume constant,
+    positif quand les mentions augmentent. Seules les cryptos citées au moins
+    `minimum` fois sur la fenêtre courante sont classées.
+    """
+    maintenant = maintenant if maintenant is not None else heure_courante()
+    debut = maintenant - heures + 1
+    return [
+        {"rank": rank, "symbol": symbol, "name": name, "count": actuel,
+         "count_precedent": precedent, "score": score}
+        for rank, symbol, name, actuel, precedent, score in conn.execute("""
+            WITH fenetres AS (
+                SELECT symbol,
+                       SUM(CASE WHEN heure >= :debut THEN count ELSE 0 END) AS actuel,
+                       SUM(CASE WHEN heure < :debut THEN count ELSE 0 END) AS precedent
+                FROM mentions_horaires
+                WHERE heure >= :debut - :heures
+                GROUP BY symbol
+            )
+            SELECT ROW_NUMBER() OVER (
+                       ORDER BY (actuel - precedent) * 1.0 / (precedent + 1) DESC, actuel DESC, f.symbol
+                   ) AS rank,
+                   f.symbol, COALESCE(c.name, f.symbol), actuel, precedent,
+                   ROUND((actuel - precedent) * 1.0 / (precedent + 1), 4)
+            FROM fenetres f
+            LEFT JOIN compteurs_cryptos c ON c.symbol = f.symbol
+            WHERE actuel >= :minimum
+            ORDER BY rank
+            LIMIT :limit
+        """, {"debut": debut, "heures": heures, "minimum": minimum, "limit": limit})
+    ]
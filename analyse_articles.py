@@ -1,126 +1,231 @@
 from dotenv import load_dotenv
 import os
 import json
-import google.generativeai as genai
-from collections import defaultdict
-import time
-import sqlite3
+import argparse
+import asyncio
 
-# --- CONFIG GEMINI (Inchangé) ---
-load_dotenv()
-GEMINI_API_KEY = os.getenv("API_KEY")
-if not GEMINI_API_KEY:
-    raise EnvironmentError("Clé GEMINI_API_KEY introuvable.")
+import agregation
+import cache_extractions
+import db
+import metriques
+import migrations
+import pipeline
+from extraction import CONCURRENCE, GEMINI_RPM, Statistiques, extraire_tous, version_prompt
+from extraction_locale import ExtracteurLocal
+from snapshots import creer_snapshot, meme_classement, snapshot_courant
 
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel(
-    "gemini-2.5-flash-lite",
-    generation_config={"response_mime_type": "application/json"}
-)
+MODELE_GEMINI = "gemini-2.5-flash-lite"
+# modèles enregistrés pour l'extracteur local (ambigu = à confirmer par le LLM en mode hybride)
+MODELE_LOCAL = "local"
+MODELE_LOCAL_AMBIGU = "local-ambigu"
 
-#co a la bdd
-conn = sqlite3.connect("articles.db")
-cursor = conn.cursor()
+ETAPES = metriques.histogramme("analyse_etape_secondes", "Durée des étapes de analyse_articles.py", ("etape",))
 
-print("Connexion à la base de données réussie.")
 
-#recup de la data
-cursor.execute("SELECT contenu_ia FROM articles")
-
-# fetchall() récupère TOUS les résultats de la requête d'un coup
-rows = cursor.fetchall()
+class ModeleRest:
+    """
+    GenerativeModel sur le transport REST : google-generativeai n'y a pas
+    d'appel async, generate_content_async passe donc l'appel à un thread.
+    """
 
-print(f"{len(rows)} articles trouvés dans la base de données.")
+    def __init__(self, modele):
+        self.modele = modele
 
-crypto_scores = defaultdict(int)
-crypto_names = {}
+    def generate_content(self, prompt):
+        return self.modele.generate_content(prompt)
 
-for i, row in enumerate(rows):
-    text_to_analyze = row[0]
+    async def generate_content_async(self, prompt):
+        return await asyncio.to_thread(self.modele.generate_content, prompt)
 
-    print(f"Traitement article {i + 1}/{len(rows)}...")
 
-    prompt = f"""
-    Tu es un expert crypto. Analyse ce texte et extrais les crypto-monnaies mentionnées.
+def creer_modele():
+    # --- CONFIG GEMINI ---
+    import google.generativeai as genai
 
-    Règles :
-    1. Ignore les termes génériques.
-    2. Ignore les entreprises sauf token.
-    3. Renvoie une liste vide si rien.
+    load_dotenv()
+    GEMINI_API_KEY = os.getenv("API_KEY")
+    if not GEMINI_API_KEY:
+        raise EnvironmentError("Clé GEMINI_API_KEY introuvable.")
 
-    Format JSON : {{ "coins": [{{"name": "Bitcoin", "symbol": "BTC"}}] }}
+    # GEMINI_API_ENDPOINT : autre endpoint REST (proxy, ou bench/faux_gemini.py en local)
+    endpoint = os.getenv("GEMINI_API_ENDPOINT")
+    if endpoint:
+        genai.configure(api_key=GEMINI_API_KEY, transport="rest", client_options={"api_endpoint": endpoint})
+    else:
+        genai.configure(api_key=GEMINI_API_KEY)
+    modele = genai.GenerativeModel(
+        MODELE_GEMINI,
+        generation_config={"response_mime_type": "application/json"}
+    )
+    return ModeleRest(modele) if endpoint else modele
 
-    Texte :
-    "{text_to_analyze}"
-    """
 
-    try:
-        response = model.generate_content(prompt)
-        data = json.loads(response.text)
-        found_coins = data.get("coins", [])
+def afficher_progression(rows):
+    termines = [0]
 
-        if found_coins:
-            print(f"   -> Trouvé : {', '.join([c['symbol'] for c in found_coins])}")
+    def progression(i, found_coins, erreur):
+        termines[0] += 1
+        prefixe = f"[{termines[0]}/{len(rows)}] article #{rows[i][0]}"
+        if erreur is not None:
+            print(f"{prefixe}   ⚠️ Erreur : {erreur}")
+        elif found_coins:
+            print(f"{prefixe}   -> Trouvé : {', '.join([c['symbol'] for c in found_coins])}")
         else:
-            print("   -> Rien.")
-
-        # score d'itération
-        for coin in found_coins:
-            symbol = coin['symbol'].upper().strip()
-            name = coin['name'].strip()
-            if 2 <= len(symbol) <= 8:
-                crypto_scores[symbol] += 1
-                crypto_names[symbol] = name
-
-        # temps de pause entre les requêtes en secondes
-        time.sleep(4)
-
-    except Exception as e:
-        print(f"   ⚠️ Erreur : {e}")
-
-
-conn.close()
-
-# --- LEADERBOARD ---
-leaderboard = []
-for symbol, count in crypto_scores.items():
-    leaderboard.append({
-        "name": crypto_names.get(symbol, symbol),
-        "symbol": symbol,
-        "count": count,
-    })
-
-# Tri et classement
-leaderboard.sort(key=lambda x: x['count'], reverse=True)
-for rank, item in enumerate(leaderboard, 1):
-    item['rank'] = rank
-
-
-conn_lb = sqlite3.connect("leaderboard.db")
-cursor_lb = conn_lb.cursor()
-
-# Création de la table si elle n'existe pas déja
-cursor_lb.execute("""
-    CREATE TABLE IF NOT EXISTS classement (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        rank INTEGER,
-        symbol TEXT,
-        name TEXT,
-        count INTEGER,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-""")
+            print(f"{prefixe}   -> Rien.")
 
+    return progression
 
-# insertion en vdd
-for item in leaderboard:
-    cursor_lb.execute(
-        "INSERT INTO classement (rank, symbol, name, count) VALUES (?, ?, ?, ?)",
-        (item['rank'], item['symbol'], item['name'], item['count'])
-    )
 
-conn_lb.commit()
-conn_lb.close()
+def versions_valides(mode, extracteur):
+    """Couples (modele, version_prompt) dont les extractions restent valables dans ce mode."""
+    valides = [(MODELE_GEMINI, version_prompt(1)), (MODELE_GEMINI, version_prompt(2))]
+    if mode in ("local", "hybrid"):
+        valides.append((MODELE_LOCAL, extracteur.version))
+    if mode == "local":
+        valides.append((MODELE_LOCAL_AMBIGU, extracteur.version))
+    return valides
+
 
-print("\n--- TOP 5 CRYPTOS ---")
-print(json.dumps(leaderboard[:5], indent=2))
\ No newline at end of file
+def analyseur(mode, extracteur, concurrence=CONCURRENCE, rpm=GEMINI_RPM, taille_lot=1, budget_tokens=None,
+              stats=None, progression=True):
+    """
+    Coroutine d'analyse d'un lot (id, contenu_ia) selon le mode, pour
+    pipeline.analyser : retourne les groupes (rows, resultats, version, modele)
+    à enregistrer. Le modèle Gemini n'est créé qu'au premier article qui en a besoin.
+    """
+    modele = []
+
+    async def analyser_lot(rows):
+        groupes = []
+        if mode in ("local", "hybrid"):
+            with ETAPES.chronometrer("extraction_locale"):
+                analyses = [extracteur.analyser(texte) for _, texte in rows]
+            surs = [(row, coins) for row, (coins, ambigu) in zip(rows, analyses) if not ambigu]
+            ambigus = [(row, coins) for row, (coins, ambigu) in zip(rows, analyses) if ambigu]
+
+            groupes.append(([row for row, _ in surs], [coins for _, coins in surs], extracteur.version, MODELE_LOCAL))
+            if mode == "local":
+                groupes.append((
+                    [row for row, _ in ambigus], [coins for _, coins in ambigus],
+                    extracteur.version, MODELE_LOCAL_AMBIGU
+                ))
+                rows = []
+            else:
+                rows = [row for row, _ in ambigus]
+            if progression:
+                print(f"Extracteur local : {len(surs)} articles résolus, {len(ambigus)} ambigus.")
+
+        if rows:
+            if progression:
+                print(f"{len(rows)} articles envoyés à Gemini.")
+            if not modele:
+                modele.append(creer_modele())
+            # extraction concurrente, bornée par le quota (plus de pause fixe entre les requêtes)
+            with ETAPES.chronometrer("extraction_llm"):
+                resultats = await extraire_tous(
+                    modele[0],
+                    [row[1] for row in rows],
+                    concurrence=concurrence,
+                    rpm=rpm,
+                    progression=afficher_progression(rows) if progression else None,
+                    taille_lot=taille_lot,
+                    budget_tokens=budget_tokens,
+                    stats=stats
+                )
+            groupes.append((rows, resultats, version_prompt(taille_lot, budget_tokens), MODELE_GEMINI))
+        return groupes
+
+    return analyser_lot
+
+
+async def analyser_tout(conn, analyser_lot, valides, apres_id=0, nom_reprise=None, taille_lot=pipeline.TAILLE_LOT):
+    """Analyse en flux, lot par lot ; retourne (articles analysés, articles envoyés au LLM)."""
+    analyses = envoyes = 0
+    async for lot, groupes in pipeline.analyser(conn, valides, analyser_lot, apres_id, nom_reprise, taille_lot):
+        analyses += len(lot)
+        envoyes += sum(len(rows) for rows, _, _, modele in groupes if modele == MODELE_GEMINI)
+    return analyses, envoyes
+
+
+def publier_classement(conn, chemin_leaderboard=None):
+    """
+    Classement des compteurs d'articles.db, enregistré comme nouveau snapshot
+    dans leaderboard.db (db.LEADERBOARD_DB_PATH par défaut) s'il diffère du
+    snapshot courant : (snapshot_id, classement, créé ?).
+
+    Un run sans changement (rien d'extrait, ou aucun compte modifié) ne crée
+    pas de snapshot identique : l'historique et le cache de l'API restent tels quels.
+    """
+    # rangs calculés en SQL sur les compteurs tenus à jour à chaque extraction
+    with ETAPES.chronometrer("classement"):
+        leaderboard = agregation.classement(conn)
+    premier_id, dernier_id, nb_articles = cache_extractions.fenetre_extractions(conn)
+
+    with db.connexion_ecriture(chemin_leaderboard or db.LEADERBOARD_DB_PATH) as conn_lb:
+        # Création des tables si elles n'existent pas déja
+        migrations.migrer_leaderboard(conn_lb)
+
+        courant = snapshot_courant(conn_lb)
+        if meme_classement(conn_lb, courant, leaderboard):
+            return courant, leaderboard, False
+
+        # insertion en bdd : un nouveau snapshot, qui devient le classement courant
+        with ETAPES.chronometrer("snapshot"):
+            snapshot_id = creer_snapshot(
+                conn_lb,
+                leaderboard,
+                premier_article_id=premier_id,
+                dernier_article_id=dernier_id,
+                nb_articles=nb_articles
+            )
+    return snapshot_id, leaderboard, True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse les articles avec Gemini et produit un nouveau classement")
+    parser.add_argument("--concurrence", type=int, default=CONCURRENCE, help="Appels Gemini simultanés")
+    parser.add_argument("--rpm", type=int, default=GEMINI_RPM, help="Quota de requêtes par minute")
+    parser.add_argument("--lot", type=int, default=1, help="Articles regroupés dans un même prompt")
+    parser.add_argument("--budget-tokens", type=int, default=None, help="Budget de tokens par prompt de lot")
+    parser.add_argument(
+        "--mode", choices=["llm", "local", "hybrid"], default="llm",
+        help="llm : tout passe par Gemini ; local : dictionnaire seul ; hybrid : seuls les articles ambigus vont à Gemini"
+    )
+    parser.add_argument(
+        "--metriques", default=os.getenv("METRIQUES_JSON"),
+        help="Fichier JSON où écrire les métriques du run (durées des étapes, requêtes SQL, appels LLM)"
+    )
+    args = parser.parse_args()
+
+    #co a la bdd (ARTICLES_DB, comme l'API et le serveur MCP)
+    with db.connexion_ecriture(db.ARTICLES_DB_PATH) as conn:
+        migrations.migrer_articles(conn)
+        print("Connexion à la base de données réussie.")
+
+        # seuls les articles nouveaux (ou dont l'extraction est périmée) sont analysés,
+        # lus et enregistrés par lots : la mémoire ne dépend pas de la taille de la base
+        extracteur = ExtracteurLocal()
+        stats = Statistiques()
+        analyser_lot = analyseur(
+            args.mode, extracteur, args.concurrence, args.rpm, args.lot, args.budget_tokens, stats
+        )
+        analyses, envoyes = asyncio.run(analyser_tout(conn, analyser_lot, versions_valides(args.mode, extracteur)))
+        print(f"{analyses} articles analysés (nouveaux ou périmés).")
+        if envoyes:
+            print(f"Extraction Gemini terminée en {stats.duree:.1f} s : {stats.resume(envoyes)}.")
+
+        snapshot_id, leaderboard, cree = publier_classement(conn)
+
+    if cree:
+        print(f"\nSnapshot #{snapshot_id} enregistré.")
+    else:
+        print(f"\nClassement inchangé : le snapshot #{snapshot_id} reste le classement courant.")
+    print("\n--- TOP 5 CRYPTOS ---")
+    print(json.dumps(leaderboard[:5], indent=2))
+
+    if metriques.ecrire_json(args.metriques):
+        print(f"Métriques écrites dans {args.metriques}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,64 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import asyncio
+import base64
+import json
 import sqlite3
-from pathlib import Path
+from contextlib import asynccontextmanager, closing
 from typing import List, Dict, Optional
-from pydantic import BaseModel
-import feedparser
+from pydantic import BaseModel, TypeAdapter
+import os
 import ssl
-from bs4 import BeautifulSoup
-from datetime import datetime
-
-# Configuration des chemins
-SCRIPT_DIR = Path(__file__).parent
-ARTICLES_DB_PATH = SCRIPT_DIR / "articles.db"
-LEADERBOARD_DB_PATH = SCRIPT_DIR / "leaderboard.db"
+from datetime import datetime, timezone
+
+import agregation
+import export
+import metriques
+import taches
+
+from cache_reponses import cache
+from recherche import rechercher, requete_fts, resultats_tronques
+
+from coins import referentiel
+from snapshots import classement_snapshot, cryptos_du_snapshot, snapshot_courant, snapshot_existe
+from db import (
+    ARTICLES_DB_PATH,
+    LEADERBOARD_DB_PATH,
+    BaseIntrouvable,
+    connexion_articles,
+    connexion_leaderboard,
+    fermer_pools,
+    ouvrir_lecture,
+    ouvrir_pools,
+)
 
 # Correction SSL
 if hasattr(ssl, '_create_unverified_context'):
     ssl._create_default_https_context = ssl._create_unverified_context
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Un pool de connexions par worker, créé au démarrage et fermé à l'arrêt
+    ouvrir_pools()
+
+    # rafraîchissement périodique optionnel (REFRESH_INTERVAL), sur un seul worker élu
+    planificateur = None
+    if taches.REFRESH_INTERVAL > 0:
+        planificateur = asyncio.create_task(taches.planificateur())
+
+    yield
+
+    if planificateur is not None:
+        planificateur.cancel()
+    fermer_pools()
+
 # Création de l'API
 app = FastAPI(
     title="Crypto Leaderboard API",
     description="API pour consulter le classement des cryptomonnaies basé sur les articles",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS pour permettre les requêtes depuis n'importe quelle origine
@@ -32,8 +68,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Cache", "X-Results-Truncated"],
 )
 
+# latence de chaque requête par route (METRIQUES=0 pour la désactiver), exposée sur /metrics
+app.add_middleware(metriques.MiddlewareMetriques)
+
 # Modèles Pydantic
 class CryptoLeaderboard(BaseModel):
     rank: int
@@ -48,10 +88,123 @@ class Article(BaseModel):
     lien: str
     date_ajout: str
 
+class ArticleRecherche(Article):
+    extrait: str
+    score: float
+
+class CryptoBatch(BaseModel):
+    symbol: str
+    found: bool
+    rank: Optional[int] = None
+    name: Optional[str] = None
+    count: Optional[int] = None
+    created_at: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    symbols: List[str]
+    snapshot: Optional[int] = None
+
+class Tendance(BaseModel):
+    rank: int
+    name: str
+    symbol: str
+    count: int
+    count_precedent: int
+    score: float
+
+class CoMention(BaseModel):
+    symbol: str
+    name: Optional[str] = None
+    count: int
+
 class StatsResponse(BaseModel):
     total_articles: int
     total_cryptos: int
     last_update: Optional[str]
+    snapshot_id: Optional[int] = None
+
+class Job(BaseModel):
+    id: str
+    type: str
+    statut: str
+    cree_le: Optional[str] = None
+    debut: Optional[str] = None
+    fin: Optional[str] = None
+    resultat: Optional[Dict] = None
+    erreur: Optional[str] = None
+
+class Snapshot(BaseModel):
+    id: int
+    created_at: Optional[str]
+    premier_article_id: Optional[int] = None
+    dernier_article_id: Optional[int] = None
+    nb_articles: Optional[int] = None
+
+# Sérialisation des réponses mises en cache (mêmes modèles que response_model)
+JSON_CLASSEMENT = TypeAdapter(List[CryptoLeaderboard])
+JSON_CRYPTO = TypeAdapter(CryptoLeaderboard)
+JSON_BATCH = TypeAdapter(List[CryptoBatch])
+JSON_ARTICLES = TypeAdapter(List[Article])
+JSON_RECHERCHE = TypeAdapter(List[ArticleRecherche])
+JSON_CO_MENTIONS = TypeAdapter(List[CoMention])
+JSON_TENDANCES = TypeAdapter(List[Tendance])
+JSON_STATS = TypeAdapter(StatsResponse)
+
+# Durée pendant laquelle les clients peuvent réutiliser une réponse sans revalider :
+# par défaut l'intervalle de rafraîchissement (0 = revalider à chaque fois avec l'ETag)
+CACHE_MAX_AGE = int(os.getenv("CACHE_MAX_AGE", str(taches.REFRESH_INTERVAL)))
+
+def entetes_http(etag: str, fige: bool = False) -> Dict[str, str]:
+    """ETag fort et Cache-Control d'une réponse ; `fige` pour un snapshot historique, qui ne change plus."""
+    if fige:
+        cache_control = "public, max-age=31536000, immutable"
+    elif CACHE_MAX_AGE > 0:
+        cache_control = f"public, max-age={CACHE_MAX_AGE}"
+    else:
+        cache_control = "no-cache"
+    return {"ETag": f'"{etag}"', "Cache-Control": cache_control}
+
+def non_modifie(request: Request, entetes) -> Optional[Response]:
+    """Réponse 304 si le client a déjà cette version (If-None-Match), sinon None."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    etags = {etag.strip().removeprefix("W/") for etag in if_none_match.split(",")}
+    if entetes["ETag"] in etags or "*" in etags:
+        return Response(status_code=304, headers={
+            "ETag": entetes["ETag"],
+            "Cache-Control": entetes["Cache-Control"]
+        })
+    return None
+
+def encoder_curseur(*valeurs) -> str:
+    """Curseur opaque de pagination : la clé de tri de la dernière ligne servie."""
+    brut = json.dumps(valeurs, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(brut).decode().rstrip("=")
+
+def decoder_curseur(curseur: str, types: tuple) -> list:
+    """Valeurs d'un curseur produit par encoder_curseur (400 s'il est illisible)."""
+    try:
+        valeurs = json.loads(base64.urlsafe_b64decode(curseur + "=" * (-len(curseur) % 4)))
+    except ValueError:
+        valeurs = None
+    if (not isinstance(valeurs, list) or len(valeurs) != len(types)
+            or not all(type(v) is t for v, t in zip(valeurs, types))):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+    return valeurs
+
+def crypto_classee(conn, row) -> Dict:
+    """Ligne (rank, coin_id, count, created_at) d'un classement, avec le symbole et le nom du coin."""
+    symbol, name = referentiel(LEADERBOARD_DB_PATH).coin(conn, row[1])
+    return {"rank": row[0], "name": name, "symbol": symbol, "count": row[2], "created_at": row[3]}
+
+def resoudre_snapshot(conn, snapshot: Optional[int]) -> Optional[int]:
+    """Snapshot demandé (404 s'il n'existe pas) ou, par défaut, le snapshot courant."""
+    if snapshot is None:
+        return snapshot_courant(conn)
+    if not snapshot_existe(conn, snapshot):
+        raise HTTPException(status_code=404, detail=f"Snapshot {snapshot} introuvable")
+    return snapshot
 
 # Routes API
 
@@ -63,9 +216,22 @@ def root():
         "version": "1.0.0",
         "endpoints": {
             "/leaderboard": "Obtenir le classement des cryptos",
+            "/leaderboard?window=24h": "Classement sur la dernière heure, 24 heures ou 7 jours",
+            "/trending": "Cryptos dont les mentions accélèrent",
+            "/leaderboard/batch?symbols=BTC,ETH": "Détails de plusieurs cryptos en une requête (GET ou POST)",
             "/leaderboard/{symbol}": "Obtenir les détails d'une crypto",
+            "/leaderboard/{symbol}/articles": "Articles qui citent une crypto",
+            "/leaderboard/{symbol}/co-mentions": "Cryptos citées dans les mêmes articles",
+            "/snapshots": "Historique des classements (à passer en ?snapshot=)",
             "/articles": "Liste des articles",
+            "/articles/search?q=": "Recherche plein texte dans les articles",
             "/stats": "Statistiques globales",
+            "/export/articles": "Export de tous les articles (NDJSON ou CSV, en flux)",
+            "/export/leaderboard-history": "Export de tous les classements (NDJSON ou CSV, en flux)",
+            "/refresh-articles": "Lancer la récupération des articles (POST, tâche de fond)",
+            "/jobs/{id}": "Suivre une tâche de fond",
+            "/cache": "Statistiques du cache de réponses (par worker)",
+            "/metrics": "Métriques au format Prometheus (par worker)",
             "/health": "Status de l'API"
         }
     }
@@ -75,11 +241,11 @@ def health_check():
     """Vérifier que l'API fonctionne"""
     try:
         # Vérifier la connexion aux bases de données
-        conn_articles = sqlite3.connect(str(ARTICLES_DB_PATH))
-        conn_articles.close()
+        with connexion_articles() as conn:
+            conn.execute("SELECT 1")
 
-        conn_leaderboard = sqlite3.connect(str(LEADERBOARD_DB_PATH))
-        conn_leaderboard.close()
+        with connexion_leaderboard() as conn:
+            conn.execute("SELECT 1")
 
         return {
             "status": "healthy",
@@ -94,138 +260,533 @@ def health_check():
 
 @app.get("/leaderboard", response_model=List[CryptoLeaderboard])
 def get_leaderboard(
+    request: Request,
     limit: int = Query(10, ge=1, le=100, description="Nombre de résultats à retourner"),
-    offset: int = Query(0, ge=0, description="Décalage pour la pagination")
+    offset: int = Query(0, ge=0, description="Décalage pour la pagination"),
+    snapshot: Optional[int] = Query(None, ge=1, description="Snapshot historique (par défaut le plus récent)"),
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante (en-tête X-Next-Cursor)"),
+    window: Optional[str] = Query(None, pattern="^(1h|24h|7d)$", description="Fenêtre glissante : 1h, 24h ou 7d")
 ):
     """
     Récupérer le classement des cryptomonnaies
 
     - **limit**: Nombre de résultats (max 100)
     - **offset**: Position de départ pour la pagination
+    - **snapshot**: Id d'un classement historique (voir /snapshots)
+    - **cursor**: Reprendre après la page précédente, sur le même snapshot.
+      Le curseur de la page suivante est renvoyé dans l'en-tête X-Next-Cursor.
+    - **window**: Classement des mentions de la dernière heure, des dernières
+      24 heures ou des 7 derniers jours (heure en cours comprise), au lieu du
+      snapshot. Pagination par offset uniquement.
     """
+    if window is not None:
+        if snapshot is not None or cursor is not None:
+            raise HTTPException(status_code=400, detail="window est incompatible avec snapshot et cursor")
+        return classement_par_fenetre(window, limit, offset)
+
+    if cursor is not None:
+        if offset:
+            raise HTTPException(status_code=400, detail="cursor et offset sont incompatibles")
+        snapshot_curseur, rang = decoder_curseur(cursor, (int, int))
+        if snapshot is not None and snapshot != snapshot_curseur:
+            raise HTTPException(status_code=400, detail="Le curseur porte sur un autre snapshot")
+        snapshot = snapshot_curseur
+
+    cle = ("/leaderboard", limit, offset, snapshot, cursor)
+    versions = cache.versions(LEADERBOARD_DB_PATH)
+    en_cache = cache.lire(cle, versions)
+    if en_cache is not None:
+        return non_modifie(request, en_cache.headers) or en_cache
+
     try:
-        if not LEADERBOARD_DB_PATH.exists():
-            raise HTTPException(
-                status_code=404,
-                detail=f"Base de données introuvable à : {LEADERBOARD_DB_PATH}"
+        with connexion_leaderboard() as conn:
+            snapshot_id = resoudre_snapshot(conn, snapshot)
+            # l'ETag ne dépend que du snapshot : 304 sans lire le classement
+            entetes = entetes_http(f"s{snapshot_id or 0}", fige=snapshot is not None)
+            reponse = non_modifie(request, entetes)
+            if reponse is not None:
+                return reponse
+
+            # une ligne de plus que demandé : dit s'il existe une page suivante
+            rows = classement_snapshot(
+                conn, snapshot_id, limit + 1, offset, apres_rang=rang if cursor is not None else None
             )
+            if len(rows) > limit:
+                rows = rows[:limit]
+                entetes = {**entetes, "X-Next-Cursor": encoder_curseur(snapshot_id, rows[-1][0])}
 
-        conn = sqlite3.connect(str(LEADERBOARD_DB_PATH))
-        cursor = conn.cursor()
+            results = [crypto_classee(conn, row) for row in rows]
 
-        cursor.execute("""
-            SELECT rank, name, symbol, count, created_at 
-            FROM classement 
-            ORDER BY rank 
-            LIMIT ? OFFSET ?
-        """, (limit, offset))
+        return cache.stocker(cle, versions, JSON_CLASSEMENT, results, entetes)
 
-        rows = cursor.fetchall()
-        conn.close()
+    except HTTPException:
+        raise
+    except BaseIntrouvable as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Erreur base de données: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
 
-        if not rows:
-            return []
+def classement_par_fenetre(window: str, limit: int, offset: int) -> Response:
+    """/leaderboard?window= : lu dans les mentions par heure de articles.db."""
+    # l'heure fait partie de la clé : la fenêtre glisse d'une heure à l'autre
+    cle = ("/leaderboard", window, agregation.heure_courante(), limit, offset)
+    versions = cache.versions(ARTICLES_DB_PATH)
+    en_cache = cache.lire(cle, versions)
+    if en_cache is not None:
+        return en_cache
 
-        results = [
-            {
-                "rank": row[0],
-                "name": row[1],
-                "symbol": row[2],
-                "count": row[3],
-                "created_at": row[4] if len(row) > 4 else None
-            }
-            for row in rows
-        ]
+    try:
+        with connexion_articles() as conn:
+            results = agregation.classement_fenetre(conn, agregation.FENETRES[window], limit, offset)
 
-        return results
+        return cache.stocker(cle, versions, JSON_CLASSEMENT, results)
 
-    except sqlite3.Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur base de données: {str(e)}")
+    except BaseIntrouvable:
+        raise HTTPException(
+            status_code=404,
+            detail="Base de données des articles introuvable"
+        )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
+
+@app.get("/trending", response_model=List[Tendance])
+def get_trending(
+    window: str = Query("24h", pattern="^(1h|24h|7d)$", description="Fenêtre comparée à la précédente : 1h, 24h ou 7d"),
+    limit: int = Query(10, ge=1, le=100, description="Nombre de résultats à retourner"),
+    min_mentions: int = Query(2, ge=1, description="Mentions minimales sur la fenêtre courante")
+):
+    """
+    Récupérer les cryptomonnaies dont les mentions accélèrent
+
+    - **window**: Fenêtre courante, comparée à la fenêtre de même durée qui la précède
+    - **limit**: Nombre de résultats (max 100)
+    - **min_mentions**: Ignorer les cryptos moins citées sur la fenêtre courante
+
+    `score` = (count - count_precedent) / (count_precedent + 1) : 0 à volume
+    constant, positif quand les mentions augmentent.
+    """
+    cle = ("/trending", window, agregation.heure_courante(), limit, min_mentions)
+    versions = cache.versions(ARTICLES_DB_PATH)
+    en_cache = cache.lire(cle, versions)
+    if en_cache is not None:
+        return en_cache
+
+    try:
+        with connexion_articles() as conn:
+            results = agregation.tendances(conn, agregation.FENETRES[window], limit, min_mentions)
+
+        return cache.stocker(cle, versions, JSON_TENDANCES, results)
+
+    except BaseIntrouvable:
+        raise HTTPException(
+            status_code=404,
+            detail="Base de données des articles introuvable"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
+
+# Nombre maximal de symboles par requête /leaderboard/batch
+BATCH_MAX = 100
+
+def symboles_batch(symbols: List[str]) -> List[str]:
+    """Symboles demandés, en majuscules, sans vides ni doublons, dans l'ordre (400 si aucun ou trop)."""
+    symboles = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    if not symboles:
+        raise HTTPException(status_code=400, detail="Aucun symbole demandé")
+    if len(symboles) > BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Au plus {BATCH_MAX} symboles par requête")
+    return symboles
+
+def lire_batch(request: Optional[Request], symboles: List[str], snapshot: Optional[int]):
+    """Réponse de /leaderboard/batch : une entrée par symbole demandé, found=false s'il n'est pas classé."""
+    cle = ("/leaderboard/batch", tuple(symboles), snapshot)
+    versions = cache.versions(LEADERBOARD_DB_PATH)
+    en_cache = cache.lire(cle, versions)
+    if en_cache is not None:
+        if request is not None:
+            return non_modifie(request, en_cache.headers) or en_cache
+        return en_cache
+
+    try:
+        with connexion_leaderboard() as conn:
+            snapshot_id = resoudre_snapshot(conn, snapshot)
+            entetes = entetes_http(f"s{snapshot_id or 0}", fige=snapshot is not None)
+            if request is not None:
+                reponse = non_modifie(request, entetes)
+                if reponse is not None:
+                    return reponse
+
+            ref = referentiel(LEADERBOARD_DB_PATH)
+            ids = [ref.coin_id(conn, symbol) for symbol in symboles]
+            trouves = cryptos_du_snapshot(conn, snapshot_id, [coin_id for coin_id in ids if coin_id is not None])
+
+            results = []
+            for symbol, coin_id in zip(symboles, ids):
+                row = trouves.get(coin_id)
+                if row is None:
+                    results.append({"symbol": symbol, "found": False})
+                else:
+                    results.append({"found": True, **crypto_classee(conn, row)})
+
+        return cache.stocker(cle, versions, JSON_BATCH, results, entetes)
+
+    except HTTPException:
+        raise
+    except BaseIntrouvable as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
+
+# déclarées avant /leaderboard/{symbol}, qui prendrait sinon "batch" pour un symbole
+@app.get("/leaderboard/batch", response_model=List[CryptoBatch])
+def get_crypto_batch(
+    request: Request,
+    symbols: str = Query(..., description="Symboles séparés par des virgules (ex: BTC,ETH,SOL)"),
+    snapshot: Optional[int] = Query(None, ge=1, description="Snapshot historique (par défaut le plus récent)")
+):
+    """
+    Récupérer plusieurs cryptomonnaies en une requête (ex: une watchlist)
+
+    - **symbols**: Symboles séparés par des virgules, 100 au plus
+    - **snapshot**: Id d'un classement historique (voir /snapshots)
+
+    Une entrée par symbole, dans l'ordre demandé ; `found` vaut false pour un
+    symbole absent du classement. Un alias (XBT, MATIC) renvoie la crypto
+    sous son symbole canonique.
+    """
+    return lire_batch(request, symboles_batch(symbols.split(",")), snapshot)
+
+@app.post("/leaderboard/batch", response_model=List[CryptoBatch])
+def post_crypto_batch(body: BatchRequest):
+    """
+    Récupérer plusieurs cryptomonnaies en une requête, symboles dans le corps
+
+    Corps : {"symbols": ["BTC", "ETH"], "snapshot": null}. Même réponse que GET.
+    """
+    if body.snapshot is not None and body.snapshot < 1:
+        raise HTTPException(status_code=400, detail="snapshot doit être >= 1")
+    return lire_batch(None, symboles_batch(body.symbols), body.snapshot)
 
 @app.get("/leaderboard/{symbol}", response_model=CryptoLeaderboard)
-def get_crypto_by_symbol(symbol: str):
+def get_crypto_by_symbol(
+    request: Request,
+    symbol: str,
+    snapshot: Optional[int] = Query(None, ge=1, description="Snapshot historique (par défaut le plus récent)")
+):
     """
     Récupérer les informations d'une cryptomonnaie spécifique
 
-    - **symbol**: Le symbole de la crypto (ex: BTC, ETH)
+    - **symbol**: Le symbole de la crypto (ex: BTC, ETH), ou un de ses alias (XBT, Ether)
+    - **snapshot**: Id d'un classement historique (voir /snapshots)
     """
+    cle = ("/leaderboard/{symbol}", symbol.upper(), snapshot)
+    versions = cache.versions(LEADERBOARD_DB_PATH)
+    en_cache = cache.lire(cle, versions)
+    if en_cache is not None:
+        return non_modifie(request, en_cache.headers) or en_cache
+
     try:
-        conn = sqlite3.connect(str(LEADERBOARD_DB_PATH))
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT rank, name, symbol, count, created_at 
-            FROM classement 
-            WHERE UPPER(symbol) = UPPER(?)
-            ORDER BY created_at DESC
-            LIMIT 1
-        """, (symbol,))
-
-        row = cursor.fetchone()
-        conn.close()
-
-        if not row:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Cryptomonnaie '{symbol}' non trouvée dans le classement"
-            )
+        with connexion_leaderboard() as conn:
+            snapshot_id = resoudre_snapshot(conn, snapshot)
+            entetes = entetes_http(f"s{snapshot_id or 0}", fige=snapshot is not None)
+            reponse = non_modifie(request, entetes)
+            if reponse is not None:
+                return reponse
+
+            coin_id = referentiel(LEADERBOARD_DB_PATH).coin_id(conn, symbol)
+            row = cryptos_du_snapshot(conn, snapshot_id, [coin_id]).get(coin_id) if coin_id is not None else None
+            if not row:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Cryptomonnaie '{symbol}' non trouvée dans le classement"
+                )
+            result = crypto_classee(conn, row)
 
-        return {
-            "rank": row[0],
-            "name": row[1],
-            "symbol": row[2],
-            "count": row[3],
-            "created_at": row[4] if len(row) > 4 else None
-        }
+        return cache.stocker(cle, versions, JSON_CRYPTO, result, entetes)
 
     except HTTPException:
         raise
+    except BaseIntrouvable as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
+
+@app.get("/leaderboard/{symbol}/articles", response_model=List[Article])
+def get_crypto_articles(
+    symbol: str,
+    limit: int = Query(20, ge=1, le=100, description="Nombre d'articles à retourner"),
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante (en-tête X-Next-Cursor)")
+):
+    """
+    Récupérer les articles qui citent une cryptomonnaie, du plus récent au plus ancien
+
+    - **symbol**: Le symbole de la crypto (ex: BTC, ETH)
+    - **limit**: Nombre d'articles (max 100)
+    - **cursor**: Reprendre après la page précédente (en-tête X-Next-Cursor)
+    """
+    avant = decoder_curseur(cursor, (int,))[0] if cursor is not None else None
+
+    cle = ("/leaderboard/{symbol}/articles", symbol.upper(), limit, cursor)
+    versions = cache.versions(ARTICLES_DB_PATH)
+    en_cache = cache.lire(cle, versions)
+    if en_cache is not None:
+        return en_cache
+
+    try:
+        with connexion_articles() as conn:
+            rows = agregation.articles_mentionnant(conn, symbol, limit + 1, avant)
+
+        entetes = {}
+        if len(rows) > limit:
+            rows = rows[:limit]
+            entetes["X-Next-Cursor"] = encoder_curseur(rows[-1][0])
+
+        return cache.stocker(cle, versions, JSON_ARTICLES, [
+            {
+                "id": row[0],
+                "titre": row[1],
+                "lien": row[2],
+                "date_ajout": row[3]
+            }
+            for row in rows
+        ], entetes)
+
+    except BaseIntrouvable:
+        raise HTTPException(
+            status_code=404,
+            detail="Base de données des articles introuvable"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
+
+@app.get("/leaderboard/{symbol}/co-mentions", response_model=List[CoMention])
+def get_co_mentions(
+    symbol: str,
+    limit: int = Query(10, ge=1, le=100, description="Nombre de cryptos à retourner")
+):
+    """
+    Récupérer les cryptomonnaies le plus souvent citées dans les mêmes articles
+
+    - **symbol**: Le symbole de la crypto (ex: SOL)
+    - **limit**: Nombre de cryptos (max 100)
+
+    `count` est le nombre d'articles qui citent les deux cryptos.
+    """
+    cle = ("/leaderboard/{symbol}/co-mentions", symbol.upper(), limit)
+    versions = cache.versions(ARTICLES_DB_PATH)
+    en_cache = cache.lire(cle, versions)
+    if en_cache is not None:
+        return en_cache
+
+    try:
+        with connexion_articles() as conn:
+            rows = agregation.co_mentions(conn, symbol, limit)
+
+        return cache.stocker(cle, versions, JSON_CO_MENTIONS, [
+            {"symbol": row[0], "name": row[1], "count": row[2]}
+            for row in rows
+        ])
+
+    except BaseIntrouvable:
+        raise HTTPException(
+            status_code=404,
+            detail="Base de données des articles introuvable"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
+
+@app.get("/snapshots", response_model=List[Snapshot])
+def get_snapshots(
+    limit: int = Query(20, ge=1, le=100, description="Nombre de snapshots à retourner")
+):
+    """
+    Lister les classements produits, du plus récent au plus ancien
+
+    - **limit**: Nombre de snapshots (max 100)
+    """
+    try:
+        with connexion_leaderboard() as conn:
+            rows = conn.execute("""
+                SELECT id, created_at, premier_article_id, dernier_article_id, nb_articles
+                FROM snapshots
+                ORDER BY id DESC
+                LIMIT ?
+            """, (limit,)).fetchall()
+
+        return [
+            {
+                "id": row[0],
+                "created_at": row[1],
+                "premier_article_id": row[2],
+                "dernier_article_id": row[3],
+                "nb_articles": row[4]
+            }
+            for row in rows
+        ]
+
+    except BaseIntrouvable as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
 @app.get("/articles", response_model=List[Article])
 def get_articles(
+    request: Request,
     limit: int = Query(20, ge=1, le=100, description="Nombre d'articles à retourner"),
-    offset: int = Query(0, ge=0, description="Décalage pour la pagination")
+    offset: int = Query(0, ge=0, description="Décalage pour la pagination"),
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante (en-tête X-Next-Cursor)")
 ):
     """
-    Récupérer la liste des articles
+    Récupérer la liste des articles, du plus récent au plus ancien
 
     - **limit**: Nombre d'articles (max 100)
     - **offset**: Position de départ pour la pagination
+    - **cursor**: Reprendre après la page précédente : coût constant quelle que
+      soit la profondeur, contrairement à offset. Le curseur de la page suivante
+      est renvoyé dans l'en-tête X-Next-Cursor.
     """
+    if cursor is not None:
+        if offset:
+            raise HTTPException(status_code=400, detail="cursor et offset sont incompatibles")
+        date_curseur, id_curseur = decoder_curseur(cursor, (str, int))
+
+    cle = ("/articles", limit, offset, cursor)
+    versions = cache.versions(ARTICLES_DB_PATH)
+    en_cache = cache.lire(cle, versions)
+    if en_cache is not None:
+        return non_modifie(request, en_cache.headers) or en_cache
+
     try:
-        if not ARTICLES_DB_PATH.exists():
-            raise HTTPException(
-                status_code=404,
-                detail="Base de données des articles introuvable"
-            )
+        with connexion_articles() as conn:
+            # les articles ne sont qu'ajoutés : le plus grand id identifie le contenu
+            dernier_id = conn.execute("SELECT MAX(id) FROM articles").fetchone()[0]
+            entetes = entetes_http(f"a{dernier_id or 0}")
+            reponse = non_modifie(request, entetes)
+            if reponse is not None:
+                return reponse
+
+            # index (date_ajout, id) : la page par curseur est une simple recherche dans l'index
+            if cursor is not None:
+                rows = conn.execute("""
+                    SELECT id, titre, lien, date_ajout
+                    FROM articles
+                    WHERE (date_ajout, id) < (?, ?)
+                    ORDER BY date_ajout DESC, id DESC
+                    LIMIT ?
+                """, (date_curseur, id_curseur, limit + 1)).fetchall()
+            else:
+                rows = conn.execute("""
+                    SELECT id, titre, lien, date_ajout 
+                    FROM articles 
+                    ORDER BY date_ajout DESC, id DESC
+                    LIMIT ? OFFSET ?
+                """, (limit + 1, offset)).fetchall()
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            entetes = {**entetes, "X-Next-Cursor": encoder_curseur(rows[-1][3], rows[-1][0])}
+
+        return cache.stocker(cle, versions, JSON_ARTICLES, [
+            {
+                "id": row[0],
+                "titre": row[1],
+                "lien": row[2],
+                "date_ajout": row[3]
+            }
+            for row in rows
+        ], entetes)
 
-        conn = sqlite3.connect(str(ARTICLES_DB_PATH))
-        cursor = conn.cursor()
+    except HTTPException:
+        raise
+    except BaseIntrouvable:
+        raise HTTPException(
+            status_code=404,
+            detail="Base de données des articles introuvable"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
-        cursor.execute("""
-            SELECT id, titre, lien, date_ajout 
-            FROM articles 
-            ORDER BY date_ajout DESC 
-            LIMIT ? OFFSET ?
-        """, (limit, offset))
+@app.get("/articles/search", response_model=List[ArticleRecherche])
+def get_search_articles(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="Mots recherchés"),
+    limit: int = Query(20, ge=1, le=100, description="Nombre d'articles à retourner"),
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante (en-tête X-Next-Cursor)")
+):
+    """
+    Rechercher dans le titre et le contenu des articles, du plus pertinent au moins pertinent
 
-        rows = cursor.fetchall()
-        conn.close()
+    - **q**: Mots recherchés, tous obligatoires ; "phrase exacte" et préfixe* acceptés
+    - **limit**: Nombre d'articles (max 100)
+    - **cursor**: Reprendre après la page précédente (en-tête X-Next-Cursor)
 
-        return [
+    Tous les articles trouvés sont classés, sauf si RECHERCHE_CANDIDATS limite le
+    classement aux plus récents : l'en-tête X-Results-Truncated: true signale
+    alors que d'autres articles correspondent, hors du classement et des pages.
+    `extrait` est un passage de l'article en HTML échappé, les mots trouvés entre
+    <mark> et </mark>. `score` : pertinence bm25, plus haut = plus pertinent.
+
+    Les pages suivantes ne contiennent jamais d'article ajouté après la première,
+    mais ces ajouts modifient les scores bm25 : si des articles arrivent pendant
+    la pagination, une page peut répéter ou sauter quelques résultats.
+    """
+    requete = requete_fts(q)
+    if not requete:
+        raise HTTPException(status_code=400, detail="La recherche ne contient aucun mot")
+    apres = borne = None
+    if cursor is not None:
+        score, dernier, borne = decoder_curseur(cursor, (float, int, int))
+        apres = (score, dernier)
+
+    cle = ("/articles/search", requete, limit, cursor)
+    versions = cache.versions(ARTICLES_DB_PATH)
+    en_cache = cache.lire(cle, versions)
+    if en_cache is not None:
+        return non_modifie(request, en_cache.headers) or en_cache
+
+    try:
+        with connexion_articles() as conn:
+            # index tenu à jour à chaque ajout d'article : même ETag que /articles
+            dernier_id = conn.execute("SELECT MAX(id) FROM articles").fetchone()[0]
+            entetes = entetes_http(f"a{dernier_id or 0}")
+            reponse = non_modifie(request, entetes)
+            if reponse is not None:
+                return reponse
+
+            if borne is None:
+                borne = dernier_id or 0
+            rows = rechercher(conn, requete, limit + 1, apres, borne)
+            if resultats_tronques(conn, requete, borne):
+                entetes = {**entetes, "X-Results-Truncated": "true"}
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            entetes = {**entetes, "X-Next-Cursor": encoder_curseur(rows[-1][5], rows[-1][0], borne)}
+
+        return cache.stocker(cle, versions, JSON_RECHERCHE, [
             {
                 "id": row[0],
                 "titre": row[1],
                 "lien": row[2],
-                "date_ajout": row[3]
+                "date_ajout": row[3],
+                "extrait": row[4],
+                "score": -row[5]
             }
             for row in rows
-        ]
+        ], entetes)
 
+    except HTTPException:
+        raise
+    except BaseIntrouvable:
+        raise HTTPException(
+            status_code=404,
+            detail="Base de données des articles introuvable"
+        )
+    except sqlite3.OperationalError as e:
+        # index plein texte absent (base pas encore migrée)
+        raise HTTPException(status_code=503, detail=f"Recherche indisponible: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
@@ -234,94 +795,195 @@ def get_stats():
     """
     Récupérer les statistiques globales
     """
+    cle = ("/stats",)
+    versions = cache.versions(ARTICLES_DB_PATH, LEADERBOARD_DB_PATH)
+    en_cache = cache.lire(cle, versions)
+    if en_cache is not None:
+        return en_cache
+
     try:
         stats = {}
 
         # Compter les articles
         if ARTICLES_DB_PATH.exists():
-            conn_articles = sqlite3.connect(str(ARTICLES_DB_PATH))
-            cursor_articles = conn_articles.cursor()
-            cursor_articles.execute("SELECT COUNT(*) FROM articles")
-            stats["total_articles"] = cursor_articles.fetchone()[0]
-
-            cursor_articles.execute("SELECT MAX(date_ajout) FROM articles")
-            last_update = cursor_articles.fetchone()[0]
-            stats["last_update"] = last_update
-            conn_articles.close()
+            with connexion_articles() as conn:
+                stats["total_articles"], stats["last_update"] = conn.execute(
+                    "SELECT COUNT(*), MAX(date_ajout) FROM articles"
+                ).fetchone()
         else:
             stats["total_articles"] = 0
             stats["last_update"] = None
 
         # Compter les cryptos
         if LEADERBOARD_DB_PATH.exists():
-            conn_leaderboard = sqlite3.connect(str(LEADERBOARD_DB_PATH))
-            cursor_leaderboard = conn_leaderboard.cursor()
-            cursor_leaderboard.execute("SELECT COUNT(DISTINCT symbol) FROM classement")
-            stats["total_cryptos"] = cursor_leaderboard.fetchone()[0]
-            conn_leaderboard.close()
+            with connexion_leaderboard() as conn:
+                stats["snapshot_id"] = snapshot_courant(conn)
+                stats["total_cryptos"] = conn.execute(
+                    "SELECT COUNT(*) FROM classement WHERE snapshot_id = ?",
+                    (stats["snapshot_id"],)
+                ).fetchone()[0]
         else:
             stats["total_cryptos"] = 0
 
-        return stats
+        return cache.stocker(cle, versions, JSON_STATS, stats)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
-@app.post("/refresh-articles")
-def refresh_articles():
+def date_sql(valeur: Optional[datetime]) -> Optional[str]:
+    """Date au format des colonnes TIMESTAMP de SQLite (UTC, "AAAA-MM-JJ HH:MM:SS")."""
+    if valeur is None:
+        return None
+    if valeur.tzinfo is not None:
+        valeur = valeur.astimezone(timezone.utc).replace(tzinfo=None)
+    return valeur.strftime("%Y-%m-%d %H:%M:%S")
+
+def reponse_export(db_path, requete, nom: str, format: str, gzip: bool) -> StreamingResponse:
     """
-    Récupérer de nouveaux articles depuis le flux RSS
+    Export en flux du résultat de `requete(conn)` (curseur, colonnes).
+
+    L'export prend sa propre connexion, hors pool : un long téléchargement ne
+    bloque pas les autres requêtes du worker. Elle est ouverte par le flux
+    lui-même (export.flux), jamais avant : rien ne reste ouvert si la réponse
+    n'est pas envoyée.
     """
+    if not db_path.exists():
+        raise HTTPException(status_code=404, detail=f"Base de données introuvable à : {db_path}")
+
+    # requête vérifiée avant les en-têtes, sur une connexion aussitôt fermée :
+    # une erreur donne un 500 plutôt qu'un flux interrompu
     try:
-        rss_url = "https://cointelegraph.com/rss"
-        feed = feedparser.parse(rss_url)
-
-        conn = sqlite3.connect(str(ARTICLES_DB_PATH))
-        cursor = conn.cursor()
-
-        # Créer la table si elle n'existe pas
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS articles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                titre TEXT NOT NULL,
-                lien TEXT UNIQUE NOT NULL,
-                contenu_ia TEXT,
-                date_ajout TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        with closing(ouvrir_lecture(db_path)) as conn:
+            requete(conn)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
+
+    # compressé : un fichier .gz à enregistrer tel quel, pas un Content-Encoding
+    # que le client décompresserait avant de l'enregistrer sous ce nom
+    entetes = {"Content-Disposition": f'attachment; filename="{nom}.{format}{".gz" if gzip else ""}"'}
+    return StreamingResponse(
+        export.flux(lambda: ouvrir_lecture(db_path), requete, format, gzip),
+        media_type=export.TYPE_GZIP if gzip else export.FORMATS[format],
+        headers=entetes
+    )
+
+@app.get("/export/articles")
+def export_articles(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson ou csv"),
+    gzip: bool = Query(False, description="Fichier compressé (.gz, application/gzip)"),
+    id_min: Optional[int] = Query(None, ge=1, description="Premier id exporté"),
+    id_max: Optional[int] = Query(None, ge=1, description="Dernier id exporté"),
+    depuis: Optional[datetime] = Query(None, description="Articles ajoutés à partir de cette date (UTC)"),
+    jusqu_a: Optional[datetime] = Query(None, description="Articles ajoutés avant cette date (UTC)")
+):
+    """
+    Exporter les articles en flux, contenu compris, sans pagination
 
-        count_new = 0
-        count_existing = 0
+    - **format**: ndjson (un objet JSON par ligne) ou csv (avec en-tête)
+    - **gzip**: Fichier compressé au format gzip (.gz)
+    - **id_min**, **id_max**: Bornes d'id, incluses (ex: reprendre après le dernier id reçu)
+    - **depuis**, **jusqu_a**: Bornes sur date_ajout, la seconde exclue
 
-        for entry in feed.entries[:50]:
-            raw_summary = entry.summary
-            soup = BeautifulSoup(raw_summary, "html.parser")
-            clean_summary = soup.get_text(separator=" ").strip()
-            full_text = f"Titre: {entry.title}\nRésumé: {clean_summary}"
+    Trié par id, ou par date_ajout puis id avec un filtre de date.
+    """
+    return reponse_export(
+        ARTICLES_DB_PATH,
+        lambda conn: export.articles(conn, id_min, id_max, date_sql(depuis), date_sql(jusqu_a)),
+        "articles", format, gzip
+    )
+
+@app.get("/export/leaderboard-history")
+def export_leaderboard_history(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson ou csv"),
+    gzip: bool = Query(False, description="Fichier compressé (.gz, application/gzip)"),
+    snapshot_min: Optional[int] = Query(None, ge=1, description="Premier snapshot exporté"),
+    snapshot_max: Optional[int] = Query(None, ge=1, description="Dernier snapshot exporté"),
+    depuis: Optional[datetime] = Query(None, description="Classements produits à partir de cette date (UTC)"),
+    jusqu_a: Optional[datetime] = Query(None, description="Classements produits avant cette date (UTC)")
+):
+    """
+    Exporter tous les classements produits (une ligne par crypto et par snapshot), en flux
 
-            try:
-                cursor.execute(
-                    "INSERT INTO articles (titre, lien, contenu_ia) VALUES (?, ?, ?)",
-                    (entry.title, entry.link, full_text)
-                )
-                count_new += 1
-            except sqlite3.IntegrityError:
-                count_existing += 1
+    - **format**: ndjson (un objet JSON par ligne) ou csv (avec en-tête)
+    - **gzip**: Fichier compressé au format gzip (.gz)
+    - **snapshot_min**, **snapshot_max**: Bornes d'id de snapshot, incluses
+    - **depuis**, **jusqu_a**: Bornes sur la date du classement, la seconde exclue
+    """
+    return reponse_export(
+        LEADERBOARD_DB_PATH,
+        lambda conn: export.historique_classement(
+            conn, snapshot_min, snapshot_max, date_sql(depuis), date_sql(jusqu_a)
+        ),
+        "leaderboard-history", format, gzip
+    )
+
+@app.get("/cache")
+def get_cache():
+    """
+    Statistiques du cache de réponses de ce worker (hits, misses, invalidations)
 
-        conn.commit()
-        conn.close()
+    Le cache se règle avec CACHE_TTL (secondes, 0 pour le désactiver) et CACHE_TAILLE.
+    """
+    return cache.stats()
 
-        return {
-            "success": True,
-            "message": f"Récupération terminée",
-            "total_fetched": len(feed.entries[:50]),
-            "new_articles": count_new,
-            "existing_articles": count_existing
-        }
+@app.get("/metrics")
+def get_metrics():
+    """
+    Métriques de ce worker au format texte de Prometheus : latence par route,
+    durée des requêtes SQLite par instruction, étapes de l'ingestion des flux
+    """
+    return Response(metriques.exposition(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/refresh-articles", status_code=202)
+async def refresh_articles():
+    """
+    Lancer la récupération des articles depuis les flux RSS, en tâche de fond
+
+    Répond tout de suite (202) avec l'id du job à suivre sur /jobs/{id}.
+    Si un rafraîchissement est déjà en cours, c'est son id qui est renvoyé.
+    """
+    try:
+        job_id, cree = await taches.lancer_rafraichissement()
+        return JSONResponse(
+            status_code=202,
+            headers={"Location": f"/jobs/{job_id}"},
+            content={
+                "success": True,
+                "message": "Récupération lancée" if cree else "Récupération déjà en cours",
+                "job_id": job_id,
+                "status_url": f"/jobs/{job_id}"
+            }
+        )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
 
+@app.get("/jobs/{job_id}", response_model=Job)
+def get_job(job_id: str):
+    """
+    Récupérer l'état d'une tâche de fond (en_attente, en_cours, termine, echec)
+
+    - **job_id**: L'id renvoyé par POST /refresh-articles
+    """
+    try:
+        with connexion_articles() as conn:
+            job = taches.lire_job(conn, job_id)
+
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job '{job_id}' introuvable")
+
+        return job
+
+    except HTTPException:
+        raise
+    except sqlite3.OperationalError:
+        # table des jobs pas encore créée : aucun job n'a été lancé
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' introuvable")
+    except BaseIntrouvable as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
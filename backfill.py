@@ -0,0 +1,115 @@
+"""
+Rattrapage d'archives : ingère des pages de flux RSS en nombre (des années
+d'archives), extrait les cryptos des nouveaux articles et publie un classement,
+en flux (pipeline.py) : mémoire constante quelle que soit la taille du corpus.
+
+    python backfill.py --urls archives.txt --mode local
+    python backfill.py --urls archives.txt --mode local --reprendre   # après une interruption
+
+`--urls` : un fichier d'urls, une par ligne (« - » : entrée standard), lu au fur
+et à mesure ; par défaut les flux configurés (RSS_FEEDS).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import db
+import ingestion
+import metriques
+import migrations
+import pipeline
+from analyse_articles import analyser_tout, analyseur, publier_classement, versions_valides
+from extraction import CONCURRENCE, GEMINI_RPM, Statistiques
+from extraction_locale import ExtracteurLocal
+
+# nom des points de reprise du rattrapage : flux traités (reprises_flux) et extraction (reprises)
+REPRISE = "backfill"
+
+
+def lire_urls(chemin):
+    """Urls du fichier `chemin`, une par ligne, sans tout charger."""
+    fichier = sys.stdin if chemin == "-" else open(chemin, encoding="utf-8")
+    with fichier:
+        for ligne in fichier:
+            url = ligne.strip()
+            if url and not url.startswith("#"):
+                yield url
+
+
+async def ingerer(conn, urls, etats, args):
+    total = {"flux": 0, "total_fetched": 0, "new_articles": 0, "existing_articles": 0, "feeds_unchanged": 0}
+    debut = time.perf_counter()
+    async for bilan in pipeline.ingerer(conn, urls, etats, args.concurrence, taille_lot=args.taille_lot,
+                                        nom_reprise=REPRISE):
+        for cle in ("total_fetched", "new_articles", "existing_articles", "feeds_unchanged"):
+            total[cle] += bilan[cle]
+        for url in bilan["feeds_failed"]:
+            print(f"⚠️ Échec : {url}")
+        ecoule = time.perf_counter() - debut
+        print(f"  {total['new_articles']} nouveaux articles ({total['new_articles'] / ecoule:.0f}/s)", end="\r")
+    print()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", default=None, help="Fichier des urls de flux (une par ligne, - : stdin)")
+    parser.add_argument(
+        "--mode", choices=["llm", "local", "hybrid"], default="local",
+        help="Extraction, comme analyse_articles.py (local par défaut : pas de quota sur un rattrapage)"
+    )
+    parser.add_argument("--reprendre", action="store_true",
+                        help="Saute les flux déjà traités par un rattrapage précédent et reprend l'extraction "
+                             "au dernier article traité")
+    parser.add_argument("--sans-analyse", action="store_true", help="Ingestion seule")
+    parser.add_argument("--concurrence", type=int, default=pipeline.CONCURRENCE, help="Téléchargements simultanés")
+    parser.add_argument("--taille-lot", type=int, default=pipeline.TAILLE_LOT,
+                        help="Articles par transaction d'insertion et par lot d'extraction")
+    parser.add_argument("--concurrence-llm", type=int, default=CONCURRENCE, help="Appels Gemini simultanés")
+    parser.add_argument("--rpm", type=int, default=GEMINI_RPM, help="Quota de requêtes par minute")
+    parser.add_argument("--lot", type=int, default=1, help="Articles regroupés dans un même prompt")
+    parser.add_argument("--metriques", default=os.getenv("METRIQUES_JSON"), help="Fichier JSON des métriques du run")
+    args = parser.parse_args()
+
+    # ARTICLES_DB / LEADERBOARD_DB, comme l'API et le serveur MCP
+    with db.connexion_ecriture(db.ARTICLES_DB_PATH) as conn:
+        migrations.migrer_articles(conn)
+
+        urls = lire_urls(args.urls) if args.urls else ingestion.flux_configures()
+        etats = ingestion.lire_etats(conn)
+        if args.reprendre:
+            # une url de reprises_flux a été insérée en entier (même transaction) ; flux_etat,
+            # tenu aussi par le rafraîchissement courant, ne dit rien de ce que le rattrapage a fait
+            traites = pipeline.lire_flux_traites(conn, REPRISE)
+            urls = (url for url in urls if url not in traites)
+        print("Ingestion des flux...")
+        total = asyncio.run(ingerer(conn, urls, etats, args))
+        print(f"{total['new_articles']} nouveaux articles, {total['existing_articles']} doublons ignorés, "
+              f"{total['feeds_unchanged']} flux inchangés.")
+
+        if not args.sans_analyse:
+            extracteur = ExtracteurLocal()
+            apres_id = pipeline.lire_reprise(conn, REPRISE) if args.reprendre else 0
+            if apres_id:
+                print(f"Reprise de l'extraction après l'article #{apres_id}.")
+            stats = Statistiques()
+            analyser_lot = analyseur(args.mode, extracteur, args.concurrence_llm, args.rpm, args.lot,
+                                     stats=stats, progression=False)
+            analyses, envoyes = asyncio.run(analyser_tout(
+                conn, analyser_lot, versions_valides(args.mode, extracteur), apres_id, REPRISE, args.taille_lot
+            ))
+            print(f"{analyses} articles analysés.")
+            if envoyes:
+                print(f"Extraction Gemini : {stats.resume(envoyes)}.")
+
+            snapshot_id, _, cree = publier_classement(conn)
+            print(f"Snapshot #{snapshot_id} enregistré." if cree else f"Classement inchangé (snapshot #{snapshot_id}).")
+
+    if metriques.ecrire_json(args.metriques):
+        print(f"Métriques écrites dans {args.metriques}.")
+
+
+if __name__ == "__main__":
+    main()
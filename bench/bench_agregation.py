@@ -0,0 +1,128 @@
+"""
+Benchmark de l'agrégation incrémentale du classement.
+
+Construit une base avec N articles déjà extraits (mentions synthétiques),
+puis compare le recomptage complet en Python à la mise à jour incrémentale
+(upsert des compteurs + rangs en SQL + snapshot) après 10 nouveaux articles,
+et les requêtes sur l'index des mentions (articles d'une crypto, co-mentions)
+à une boucle Python sur les extractions :
+    python bench/bench_agregation.py --articles 100000
+"""
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import agregation
+import cache_extractions
+import migrations
+import snapshots
+from extraction import agreger
+
+SYMBOLES = ["BTC", "ETH", "SOL", "XRP", "BNB", "DOGE", "ADA", "TRX", "AVAX", "LINK",
+            "DOT", "TON", "SHIB", "LTC", "BCH", "UNI", "NEAR", "APT", "ARB", "OP"]
+
+
+def coins_aleatoires(hasard):
+    # distribution de type Zipf : BTC très fréquent, la traîne rarement citée
+    nb = hasard.choice([0, 1, 1, 1, 2, 2, 3])
+    choisis = {SYMBOLES[min(int(hasard.paretovariate(1.2)) - 1, len(SYMBOLES) - 1)] for _ in range(nb)}
+    return [{"name": s.title(), "symbol": s} for s in sorted(choisis)]
+
+
+def remplir(conn, n, hasard):
+    conn.executemany(
+        "INSERT INTO articles (id, titre, lien, contenu_ia) VALUES (?, ?, ?, ?)",
+        ((i, f"Article {i}", f"https://exemple.test/{i}", f"Texte {i}") for i in range(1, n + 1))
+    )
+    conn.executemany(
+        "INSERT INTO extractions (article_id, hash_contenu, version_prompt, modele, coins) VALUES (?, ?, 'v', 'm', ?)",
+        ((i, cache_extractions.empreinte(f"Texte {i}"), json.dumps(coins_aleatoires(hasard))) for i in range(1, n + 1))
+    )
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--nouveaux", type=int, default=10)
+    args = parser.parse_args()
+
+    hasard = random.Random(0)
+    conn = sqlite3.connect(":memory:")
+    conn_lb = sqlite3.connect(":memory:")
+    migrations.migrer_articles(conn)
+    migrations.migrer_leaderboard(conn_lb)
+    remplir(conn, args.articles, hasard)
+
+    debut = time.perf_counter()
+    agregation.recompter(conn)
+    conn.commit()
+    print(f"initialisation des compteurs : {(time.perf_counter() - debut) * 1000:8.1f} ms")
+    debut = time.perf_counter()
+    agregation.reindexer_mentions(conn)
+    conn.commit()
+    print(f"initialisation de l'index des mentions : {(time.perf_counter() - debut) * 1000:8.1f} ms")
+
+    # nouveaux articles
+    premier = args.articles + 1
+    rows = [(i, f"Texte {i}") for i in range(premier, premier + args.nouveaux)]
+    conn.executemany(
+        "INSERT INTO articles (id, titre, lien, contenu_ia) VALUES (?, ?, ?, ?)",
+        ((i, f"Article {i}", f"https://exemple.test/{i}", texte) for i, texte in rows)
+    )
+    resultats = [coins_aleatoires(hasard) for _ in rows]
+
+    # ancien chemin : on reboucle sur toutes les extractions en Python
+    debut = time.perf_counter()
+    toutes = [json.loads(c) for (c,) in conn.execute("SELECT coins FROM extractions ORDER BY article_id")]
+    attendu = agreger(toutes + resultats)
+    complet = time.perf_counter() - debut
+
+    # nouveau chemin : delta sur les compteurs, rangs en SQL, snapshot en une transaction
+    debut = time.perf_counter()
+    cache_extractions.enregistrer_extractions(conn, rows, resultats, "v", "m")
+    leaderboard = agregation.classement(conn)
+    snapshots.creer_snapshot(conn_lb, leaderboard, *cache_extractions.fenetre_extractions(conn))
+    incremental = time.perf_counter() - debut
+
+    print(f"recomptage complet ({args.articles} articles) : {complet * 1000:8.1f} ms")
+    print(f"mise à jour incrémentale ({args.nouveaux} articles) : {incremental * 1000:8.1f} ms")
+    print("classements identiques :", leaderboard == attendu)
+
+    # cryptos citées avec la 5e du classement, et sa dernière page d'articles
+    cible = leaderboard[4]["symbol"]
+    debut = time.perf_counter()
+    co_python = Counter()
+    articles_python = []
+    for article_id, coins in conn.execute("SELECT article_id, coins FROM extractions ORDER BY article_id DESC"):
+        symboles = {symbol for symbol, _, _ in agregation.mentions(article_id, json.loads(coins))}
+        if cible in symboles:
+            articles_python.append(article_id)
+            co_python.update(symboles - {cible})
+    boucle = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    co_sql = agregation.co_mentions(conn, cible, 10)
+    jointure = time.perf_counter() - debut
+    debut = time.perf_counter()
+    page = agregation.articles_mentionnant(conn, cible, 20)
+    index = time.perf_counter() - debut
+
+    print(f"\nco-mentions de {cible}, boucle Python sur les extractions : {boucle * 1000:8.1f} ms")
+    print(f"co-mentions de {cible}, jointure sur article_coins       : {jointure * 1000:8.1f} ms")
+    print(f"20 derniers articles citant {cible}, par l'index          : {index * 1000:8.1f} ms")
+    print("résultats identiques :",
+          [(symbol, n) for symbol, _, n in co_sql]
+          == sorted(co_python.items(), key=lambda item: (-item[1], item[0]))[:10]
+          and [row[0] for row in page] == articles_python[:20])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Mémoire d'un rattrapage d'archives : pic de RSS de l'ingestion puis de
+l'extraction locale de N articles, en flux (pipeline.py, comme backfill.py) ou
+comme avant, tout en mémoire (ingestion.recuperer_flux sur toutes les pages,
+puis articles_a_extraire et un seul enregistrement).
+
+Les pages d'archives (--par-page entrées chacune) viennent du serveur RSS
+local (serveur_rss.py) ; chaque run tourne dans son propre process, dont le
+pic de RSS est lu par wait4 :
+    python bench/bench_backfill.py --tailles 10k,100k,1M --liste-max 100k
+"""
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import serveur_rss
+from corpus import taille
+
+MODES = ("flux", "liste")
+
+
+def pages(url, n, par_page):
+    for debut in range(0, n, par_page):
+        yield f"{url}/synthetique/archive{debut // par_page}.xml?n={min(par_page, n - debut)}&debut={debut}"
+
+
+def rss_mo():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def enfant(mode, url, n, par_page, dossier):
+    """Un rattrapage dans ce process ; écrit son bilan en JSON sur la sortie standard."""
+    import asyncio
+    import cache_extractions
+    import ingestion
+    import migrations
+    import pipeline
+    from analyse_articles import MODELE_LOCAL, analyser_tout, analyseur, versions_valides
+    from extraction_locale import ExtracteurLocal
+
+    conn = sqlite3.connect(Path(dossier) / "articles.db")
+    migrations.migrer_articles(conn)
+    extracteur = ExtracteurLocal()
+    valides = versions_valides("local", extracteur)
+    base = rss_mo()
+
+    debut = time.perf_counter()
+    if mode == "flux":
+        async def ingerer():
+            async for _ in pipeline.ingerer(conn, pages(url, n, par_page)):
+                pass
+        asyncio.run(ingerer())
+        ingestion_s = time.perf_counter() - debut
+        asyncio.run(analyser_tout(conn, analyseur("local", extracteur, progression=False), valides))
+    else:
+        async def recuperer():
+            # toutes les pages à la fois derrière 10 connexions : sans délai d'attente
+            async with httpx.AsyncClient(timeout=None, limits=ingestion.LIMITES) as client:
+                return await ingestion.recuperer_flux(list(pages(url, n, par_page)), client=client, limite=None)
+        resultats = asyncio.run(recuperer())
+        ingestion.enregistrer(conn, resultats)
+        del resultats
+        ingestion_s = time.perf_counter() - debut
+        rows = cache_extractions.articles_a_extraire(conn, valides)
+        coins = [extracteur.analyser(texte)[0] for _, texte in rows]
+        cache_extractions.enregistrer_extractions(conn, rows, coins, extracteur.version, MODELE_LOCAL)
+    duree = time.perf_counter() - debut
+
+    articles, extraits = conn.execute(
+        "SELECT (SELECT COUNT(*) FROM articles), (SELECT COUNT(*) FROM extractions)"
+    ).fetchone()
+    conn.close()
+    print(json.dumps({
+        "articles": articles, "extraits": extraits, "ingestion_s": round(ingestion_s, 1),
+        "duree_s": round(duree, 1), "rss_base_mo": round(base, 1),
+    }))
+
+
+def mesurer(mode, url, n, par_page):
+    """Bilan d'un run dans un process à part, avec son pic de RSS (Mo)."""
+    with tempfile.TemporaryDirectory() as dossier:
+        processus = subprocess.Popen(
+            [sys.executable, __file__, "--enfant", mode, "--url", url, "--tailles", str(n),
+             "--par-page", str(par_page), "--dossier", dossier],
+            stdout=subprocess.PIPE, text=True
+        )
+        sortie = processus.stdout.read()
+        _, statut, usage = os.wait4(processus.pid, 0)
+        if statut:
+            raise RuntimeError(f"{mode} {n} : le process a échoué ({statut})")
+        bilan = json.loads(sortie)
+        bilan["rss_pic_mo"] = round(usage.ru_maxrss / 1024, 1)
+        return bilan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tailles", default="10k,100k", help="Nombres d'articles (10k, 100k, 1M ou un nombre)")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--liste-max", default="100k", help="Taille au-delà de laquelle le mode liste n'est pas lancé")
+    parser.add_argument("--par-page", type=int, default=500, help="Entrées par page d'archive")
+    parser.add_argument("--enfant", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--dossier", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.enfant:
+        return enfant(args.enfant, args.url, taille(args.tailles), args.par_page, args.dossier)
+
+    serveur, url = serveur_rss.demarrer()
+    print(f"{'articles':>10} {'mode':<6} {'ingestion':>10} {'total':>8} {'art/s':>7} {'RSS base':>9} {'RSS pic':>8}")
+    for valeur in args.tailles.split(","):
+        n = taille(valeur)
+        for mode in args.modes.split(","):
+            if mode == "liste" and n > taille(args.liste_max):
+                continue
+            bilan = mesurer(mode, url, n, args.par_page)
+            assert bilan["articles"] == n and bilan["extraits"] == n, bilan
+            print(f"{n:>10} {mode:<6} {bilan['ingestion_s']:>8.1f} s {bilan['duree_s']:>6.1f} s "
+                  f"{n / bilan['duree_s']:>7.0f} {bilan['rss_base_mo']:>6.0f} Mo {bilan['rss_pic_mo']:>5.0f} Mo",
+                  flush=True)
+    serveur.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark du cache de réponses de l'API (cache_reponses.py).
+
+Lance l'API comme start.sh, sans cache (CACHE_TTL=0) puis avec, et mesure la
+latence p50/p99 de chaque route de lecture sous charge concurrente. Mesure
+aussi le temps passé dans les fonctions des routes seules, hors HTTP. Tout
+tourne sur une copie des bases du dépôt (bench_pool.copier_bases) :
+    python bench/bench_cache.py --requetes 2000 --clients 8
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from bench_pool import RACINE, attendre_pret, copier_bases, lancer_gunicorn
+
+sys.path.insert(0, str(RACINE))
+
+ROUTES = ["/leaderboard", "/leaderboard?limit=100", "/leaderboard/BTC", "/articles", "/stats"]
+
+
+def centile(valeurs, p):
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, int(len(valeurs) * p / 100))]
+
+
+async def charger(base_url, requetes, clients):
+    latences = {route: [] for route in ROUTES}
+
+    async def client_boucle(client, decalage):
+        for i in range(decalage, requetes, clients):
+            route = ROUTES[i % len(ROUTES)]
+            debut = time.perf_counter()
+            r = await client.get(route)
+            latences[route].append(time.perf_counter() - debut)
+            r.raise_for_status()
+
+    limites = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limites) as client:
+        await asyncio.gather(*(client_boucle(client, k) for k in range(clients)))
+        stats = (await client.get("/cache")).json()
+    return latences, stats
+
+
+def mesurer(nom, ttl, args, bases):
+    base_url = f"http://127.0.0.1:{args.port}"
+    proc = lancer_gunicorn(args.port, 8, args.workers, CACHE_TTL=str(ttl), **bases)
+    try:
+        asyncio.run(attendre_pret(base_url))
+        asyncio.run(charger(base_url, 200, args.clients))  # échauffement
+        latences, stats = asyncio.run(charger(base_url, args.requetes, args.clients))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    print(f"\n{nom} (hits {stats['hits']}, misses {stats['misses']} sur le worker interrogé) :")
+    for route, valeurs in latences.items():
+        print(f"  {route:<24} p50 {statistics.median(valeurs) * 1000:6.2f} ms   "
+              f"p99 {centile(valeurs, 99) * 1000:6.2f} ms")
+
+
+def chronometrer(appel, iterations):
+    durees = []
+    for _ in range(iterations):
+        debut = time.perf_counter()
+        appel()
+        durees.append(time.perf_counter() - debut)
+    return f"p50 {statistics.median(durees) * 1e6:6.1f} µs, p99 {centile(durees, 99) * 1e6:6.1f} µs"
+
+
+def mesurer_routes(iterations, bases):
+    """Temps par appel des fonctions de route, sans la couche HTTP : sans cache, avec cache, et en 304."""
+    import db
+    db.ARTICLES_DB_PATH = Path(bases["ARTICLES_DB"])
+    db.LEADERBOARD_DB_PATH = Path(bases["LEADERBOARD_DB"])
+    import api
+    from db import ouvrir_pools
+    from fastapi import Request
+
+    def requete(etag=None):
+        entetes = [(b"if-none-match", etag.encode())] if etag else []
+        return Request({"type": "http", "headers": entetes})
+
+    ouvrir_pools()
+    appels = {
+        "/leaderboard?limit=100": lambda r: api.get_leaderboard(r, limit=100, offset=0, snapshot=None, cursor=None, window=None),
+        "/leaderboard/BTC": lambda r: api.get_crypto_by_symbol(r, symbol="BTC", snapshot=None),
+        "/articles": lambda r: api.get_articles(r, limit=20, offset=0, cursor=None),
+        "/stats": lambda r: api.get_stats(),
+    }
+    print("\nFonctions des routes, hors HTTP :")
+    for route, appel in appels.items():
+        print(f"  {route}")
+        for nom, ttl in (("sans cache", 0), ("avec cache", 60)):
+            api.cache.ttl = ttl
+            api.cache.vider()
+            print(f"    {nom:<12} {chronometrer(lambda: appel(requete()), iterations)}")
+        etag = appel(requete()).headers.get("etag")
+        if etag:
+            conditionnelle = requete(etag)
+            print(f"    {'304':<12} {chronometrer(lambda: appel(conditionnelle), iterations)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requetes", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=8, help="Nombre de clients concurrents")
+    parser.add_argument("--workers", type=int, default=2, help="Workers gunicorn (2 dans start.sh)")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        bases = copier_bases(dossier)
+        mesurer("sans cache", 0, args, bases)
+        mesurer("avec cache", 60, args, bases)
+        mesurer_routes(args.requetes, bases)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark du référentiel des coins (coins.py, migration 3 de leaderboard.db).
+
+Enregistre N snapshots de 100 cryptos avec l'ancien schéma de `classement`
+(symbol, name et created_at en texte sur chaque ligne, deux index couvrants)
+puis avec le nouveau (coin_id entier, clé primaire (snapshot_id, rank)), et
+compare la taille de la base et la lecture d'un classement de 100 lignes avec
+les noms. Mesure aussi la résolution des coins extraits (alias -> canonique) :
+    python bench/bench_coins.py --snapshots 10000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import coins
+import migrations
+from extraction_locale import DICTIONNAIRE
+from snapshots import classement_snapshot, creer_snapshot, cryptos_du_snapshot
+
+TAILLE = 100
+
+ANCIEN_SCHEMA = [
+    """CREATE TABLE snapshots (id INTEGER PRIMARY KEY AUTOINCREMENT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        premier_article_id INTEGER, dernier_article_id INTEGER, nb_articles INTEGER)""",
+    """CREATE TABLE classement (id INTEGER PRIMARY KEY AUTOINCREMENT, rank INTEGER, symbol TEXT, name TEXT,
+        count INTEGER, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, snapshot_id INTEGER)""",
+    "CREATE INDEX idx_classement_snapshot_rank ON classement (snapshot_id, rank, name, symbol, count, created_at)",
+    """CREATE INDEX idx_classement_snapshot_symbol
+        ON classement (snapshot_id, symbol COLLATE NOCASE, rank, name, count, created_at)""",
+    "CREATE INDEX idx_classement_symbol ON classement (symbol COLLATE NOCASE, created_at)",
+]
+
+
+def classements(n, hasard):
+    """n classements de TAILLE cryptos : celles du dictionnaire puis des inconnues."""
+    univers = [(symbol, nom) for symbol, nom, _ in DICTIONNAIRE] + [(f"TK{i}", f"Token {i}") for i in range(200)]
+    for _ in range(n):
+        tires = hasard.sample(univers, TAILLE)
+        yield [{"rank": rank, "symbol": symbol, "name": nom, "count": 1000 - rank}
+               for rank, (symbol, nom) in enumerate(tires, 1)]
+
+
+def remplir_ancien(chemin, n):
+    conn = sqlite3.connect(chemin)
+    for ddl in ANCIEN_SCHEMA:
+        conn.execute(ddl)
+    with conn:
+        for leaderboard in classements(n, random.Random(0)):
+            snapshot_id = conn.execute("INSERT INTO snapshots DEFAULT VALUES").lastrowid
+            created_at = conn.execute("SELECT created_at FROM snapshots WHERE id = ?", (snapshot_id,)).fetchone()[0]
+            conn.executemany(
+                "INSERT INTO classement (snapshot_id, rank, symbol, name, count, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(snapshot_id, c["rank"], c["symbol"], c["name"], c["count"], created_at) for c in leaderboard]
+            )
+    conn.execute("VACUUM")
+    return conn
+
+
+def remplir_nouveau(chemin, n):
+    conn = sqlite3.connect(chemin)
+    migrations.migrer_leaderboard(conn)
+    for leaderboard in classements(n, random.Random(0)):
+        creer_snapshot(conn, leaderboard)
+    conn.execute("VACUUM")
+    return conn
+
+
+def chronometrer(appel, repetitions=200):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        appel()
+        durees.append((time.perf_counter() - debut) * 1e6)
+    return statistics.median(durees)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshots", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        ancien = remplir_ancien(os.path.join(dossier, "ancien.db"), args.snapshots)
+        nouveau = remplir_nouveau(os.path.join(dossier, "nouveau.db"), args.snapshots)
+        ref = coins.Referentiel()
+        dernier = args.snapshots
+
+        def lire_ancien():
+            return ancien.execute("""
+                SELECT rank, name, symbol, count, created_at FROM classement
+                WHERE snapshot_id = ? ORDER BY rank LIMIT ?
+            """, (dernier, TAILLE)).fetchall()
+
+        def lire_nouveau():
+            return [(rank, *ref.coin(nouveau, coin_id), count, created_at)
+                    for rank, coin_id, count, created_at in classement_snapshot(nouveau, dernier, TAILLE)]
+
+        def chercher_ancien():
+            return ancien.execute("""
+                SELECT rank, name, symbol, count, created_at FROM classement
+                WHERE snapshot_id = ? AND symbol = ? COLLATE NOCASE LIMIT 1
+            """, (dernier, "eth")).fetchone()
+
+        def chercher_nouveau():
+            coin_id = ref.coin_id(nouveau, "eth")
+            return cryptos_du_snapshot(nouveau, dernier, [coin_id]).get(coin_id)
+
+        lignes = args.snapshots * TAILLE
+        print(f"{args.snapshots} snapshots de {TAILLE} cryptos ({lignes} lignes de classement)\n")
+        print(f"  {'':<28} {'ancien schéma':>14} {'coin_id':>14}")
+        taille_ancien = os.path.getsize(os.path.join(dossier, "ancien.db"))
+        taille_nouveau = os.path.getsize(os.path.join(dossier, "nouveau.db"))
+        print(f"  {'taille de la base':<28} {taille_ancien / 1e6:>11.1f} Mo {taille_nouveau / 1e6:>11.1f} Mo")
+        print(f"  {'octets par ligne':<28} {taille_ancien / lignes:>14.0f} {taille_nouveau / lignes:>14.0f}")
+        print(f"  {'classement de 100 lignes':<28} {chronometrer(lire_ancien):>11.1f} µs "
+              f"{chronometrer(lire_nouveau):>11.1f} µs")
+        print(f"  {'une crypto par symbole':<28} {chronometrer(chercher_ancien):>11.1f} µs "
+              f"{chronometrer(chercher_nouveau):>11.1f} µs")
+
+        extraits = [("xbt", "Bitcoin"), ("ETH", "Ether"), ("MATIC", "Polygon"), ("SOL", "Solana"),
+                    ("WETH", "Wrapped Ether"), ("Tron", "TRON")] * 100_000
+        debut = time.perf_counter()
+        for symbol, name in extraits:
+            coins.canonique(symbol, name)
+        ecoule = time.perf_counter() - debut
+        print(f"\nrésolution des coins extraits : {len(extraits) / ecoule:,.0f} coins/s "
+              f"({ecoule / len(extraits) * 1e9:.0f} ns par coin)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Benchmark des exports en flux (/export/articles, /export/leaderboard-history).
+
+Génère N articles et N lignes d'historique de classement (1 million par
+défaut), lance l'API sur ces bases (uvicorn, un seul process) et télécharge
+chaque export : débit en Mo/s et en lignes/s côté client, pic de mémoire
+anonyme du serveur (RssAnon échantillonné pendant l'export : hors pages de la
+base mappées par mmap, qui sont du cache de fichier). Comparé à la pagination
+par /articles?limit=100 (curseur) sur les premières lignes :
+    python bench/bench_export.py --lignes 1000000
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import migrations
+from bench_pool import RACINE, attendre_pret
+
+# API servie sur les bases du benchmark plutôt que sur celles du dépôt
+LANCEUR = """
+import sys
+from pathlib import Path
+sys.path.insert(0, sys.argv[3])
+import db
+db.ARTICLES_DB_PATH = Path(sys.argv[1]) / "articles.db"
+db.LEADERBOARD_DB_PATH = Path(sys.argv[1]) / "leaderboard.db"
+import api, uvicorn
+uvicorn.run(api.app, host="127.0.0.1", port=int(sys.argv[2]), log_level="warning")
+"""
+
+RESUME = ("Bitcoin recule sous les 90 000 dollars alors que les ETF enregistrent des sorties. "
+          "Ether suit le mouvement, Solana résiste grâce aux flux institutionnels. "
+          "Les régulateurs examinent les stablecoins et la finance décentralisée.")
+
+
+def generer(dossier, n):
+    conn = sqlite3.connect(dossier / "articles.db")
+    migrations.migrer_articles(conn)
+    conn.execute("""
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO articles (id, titre, lien, contenu_ia, date_ajout)
+        SELECT i, 'Article ' || i || ' sur le marché des cryptos', 'https://exemple.test/articles/' || i,
+               'Titre: Article ' || i || char(10) || 'Résumé: ' || substr(?, 1 + i % 40, 180)
+                   || ' ' || hex(randomblob(8)),
+               datetime(1700000000 + i * 60, 'unixepoch')
+        FROM n
+    """, (n, RESUME))
+    conn.commit()
+    conn.close()
+
+    # 20 cryptos par classement
+    conn = sqlite3.connect(dossier / "leaderboard.db")
+    migrations.migrer_leaderboard(conn)
+    conn.execute("""
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO snapshots (id, created_at, nb_articles)
+        SELECT i, datetime(1700000000 + i * 600, 'unixepoch'), 50 FROM n
+    """, (n // 20,))
+    # les 20 premiers coins du référentiel (semé à la migration)
+    conn.execute("""
+        INSERT INTO classement (snapshot_id, rank, coin_id, count)
+        SELECT s.id, r.rank, r.rank, 100 - r.rank
+        FROM snapshots s,
+             (WITH RECURSIVE k(rank) AS (SELECT 1 UNION ALL SELECT rank + 1 FROM k WHERE rank < 20)
+              SELECT rank FROM k) r
+    """)
+    conn.execute("INSERT INTO snapshot_courant (id, snapshot_id) SELECT 1, MAX(id) FROM snapshots")
+    conn.commit()
+    conn.close()
+
+
+def memoire(pid, champ):
+    """Valeur d'un champ de /proc/<pid>/status, en Mo."""
+    for ligne in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if ligne.startswith(champ + ":"):
+            return int(ligne.split()[1]) / 1024
+    return 0.0
+
+
+def pic_pendant(pid, appel, intervalle=0.02):
+    """Résultat de `appel()` et pic de RssAnon du process `pid` pendant l'appel."""
+    pic = [memoire(pid, "RssAnon")]
+    fini = threading.Event()
+
+    def echantillonner():
+        while not fini.wait(intervalle):
+            pic[0] = max(pic[0], memoire(pid, "RssAnon"))
+
+    fil = threading.Thread(target=echantillonner)
+    fil.start()
+    try:
+        return appel(), pic[0]
+    finally:
+        fini.set()
+        fil.join()
+
+
+def telecharger(client, chemin, lignes):
+    """(octets reçus sur le réseau, lignes, secondes) d'un export, lu en flux."""
+    octets = 0
+    debut = time.perf_counter()
+    with client.stream("GET", chemin) as reponse:
+        reponse.raise_for_status()
+        for morceau in reponse.iter_raw():
+            octets += len(morceau)
+    return octets, lignes, time.perf_counter() - debut
+
+
+def paginer(client, lignes_max):
+    """Ancienne méthode : /articles?limit=100 page après page, jusqu'à `lignes_max` lignes."""
+    octets = lignes = 0
+    curseur = None
+    debut = time.perf_counter()
+    while lignes < lignes_max:
+        reponse = client.get("/articles", params={"limit": 100, **({"cursor": curseur} if curseur else {})})
+        octets += len(reponse.content)
+        lignes += len(reponse.json())
+        curseur = reponse.headers.get("x-next-cursor")
+        if not curseur:
+            break
+    return octets, lignes, time.perf_counter() - debut
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lignes", type=int, default=1_000_000)
+    parser.add_argument("--pages", type=int, default=100_000, help="Lignes lues par pagination pour comparer")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    scenarios = [
+        ("/export/articles (ndjson)", "/export/articles", args.lignes),
+        ("/export/articles (csv)", "/export/articles?format=csv", args.lignes),
+        ("/export/articles (ndjson, gzip)", "/export/articles?gzip=true", args.lignes),
+        ("/export/articles?depuis=", "/export/articles?depuis=2023-11-14T22:13:20&format=csv", args.lignes),
+        ("/export/leaderboard-history", "/export/leaderboard-history", args.lignes // 20 * 20),
+        ("/export/leaderboard-history (csv, gzip)", "/export/leaderboard-history?format=csv&gzip=true",
+         args.lignes // 20 * 20),
+    ]
+
+    with tempfile.TemporaryDirectory() as dossier:
+        dossier = Path(dossier)
+        debut = time.perf_counter()
+        generer(dossier, args.lignes)
+        print(f"{args.lignes} articles et {args.lignes // 20 * 20} lignes de classement générés "
+              f"en {time.perf_counter() - debut:.1f} s\n")
+
+        env = dict(os.environ, CACHE_TTL="0", REFRESH_INTERVAL="0")
+        proc = subprocess.Popen(
+            [sys.executable, "-c", LANCEUR, str(dossier), str(args.port), str(RACINE)], env=env
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            asyncio.run(attendre_pret(base_url, timeout=120))
+            print(f"serveur démarré : {memoire(proc.pid, 'RssAnon'):.0f} Mo de mémoire anonyme\n")
+            print(f"  {'':<42} {'lignes':>9} {'Mo reçus':>9} {'Mo/s':>8} {'lignes/s':>10} {'pic serveur':>12}")
+            with httpx.Client(base_url=base_url, timeout=None) as client:
+                mesures = [(nom, lambda chemin=chemin, n=n: telecharger(client, chemin, n))
+                           for nom, chemin, n in scenarios]
+                mesures.append((f"/articles?limit=100, {args.pages} lignes", lambda: paginer(client, args.pages)))
+                for nom, appel in mesures:
+                    (octets, lignes, secondes), pic = pic_pendant(proc.pid, appel)
+                    print(f"  {nom:<42} {lignes:>9} {octets / 1e6:>9.1f} {octets / 1e6 / secondes:>8.1f} "
+                          f"{lignes / secondes:>10,.0f} {pic:>9.0f} Mo")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
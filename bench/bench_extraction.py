@@ -0,0 +1,73 @@
+"""
+Benchmark du moteur d'extraction asynchrone contre l'ancienne boucle séquentielle.
+
+Utilise le faux modèle local (latence, quota RPM, erreurs 5xx simulés) :
+    python bench/bench_extraction.py --articles 50 --rpm 120 --latence 0.5
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import extraction
+from extraction import agreger, construire_prompt, extraire_tous, lire_coins
+from faux_modele import FauxModele
+
+TEXTES = [
+    "Titre: Bitcoin dépasse 100k\nRésumé: BTC et Ethereum progressent.",
+    "Titre: Solana ETF\nRésumé: SOL attire les institutionnels.",
+    "Titre: Régulation\nRésumé: la SEC publie un rapport sur la blockchain.",
+    "Titre: XRP et BNB\nRésumé: XRP rebondit, BNB suit.",
+]
+
+
+def sequentiel(modele, textes, pause):
+    """Ancienne boucle : un appel à la fois et une pause fixe entre chaque."""
+    resultats = []
+    for texte in textes:
+        try:
+            resultats.append(lire_coins(modele.generate_content(construire_prompt(texte)).text))
+        except Exception:
+            resultats.append(None)
+        time.sleep(pause)
+    return resultats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=50)
+    parser.add_argument("--latence", type=float, default=0.5, help="Latence moyenne simulée (s)")
+    parser.add_argument("--rpm", type=int, default=120, help="Quota simulé (requêtes/minute)")
+    parser.add_argument("--taux-5xx", type=float, default=0.05)
+    parser.add_argument("--concurrence", type=int, default=10)
+    parser.add_argument("--pause", type=float, default=4.0, help="Pause de l'ancienne boucle (s)")
+    parser.add_argument("--sans-sequentiel", action="store_true", help="Ne pas mesurer l'ancienne boucle")
+    args = parser.parse_args()
+
+    textes = [TEXTES[i % len(TEXTES)] for i in range(args.articles)]
+    extraction.BACKOFF_BASE = 0.2
+
+    if not args.sans_sequentiel:
+        modele = FauxModele(latence=args.latence, rpm=args.rpm)
+        debut = time.monotonic()
+        attendu = agreger(sequentiel(modele, textes, args.pause))
+        print(f"séquentiel : {time.monotonic() - debut:6.1f} s")
+
+    modele = FauxModele(latence=args.latence, rpm=args.rpm, taux_5xx=args.taux_5xx)
+    debut = time.monotonic()
+    resultats = asyncio.run(extraire_tous(modele, textes, concurrence=args.concurrence, rpm=args.rpm))
+    ecoule = time.monotonic() - debut
+    echecs = sum(r is None for r in resultats)
+    print(f"asynchrone : {ecoule:6.1f} s  ({modele.nb_appels} appels, {modele.nb_429} x 429, "
+          f"{modele.nb_5xx} x 5xx, {echecs} échecs)")
+    print(f"borne du quota : {max(0, args.articles - args.rpm // 4) * 60 / args.rpm:6.1f} s")
+
+    if not args.sans_sequentiel:
+        print("classements identiques :", agreger(resultats) == attendu)
+
+
+if __name__ == "__main__":
+    main()
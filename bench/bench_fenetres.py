@@ -0,0 +1,94 @@
+"""
+Benchmark des classements par fenêtre (/leaderboard?window=) et des tendances
+(/trending), lus dans les mentions par heure (mentions_horaires).
+
+Pour chaque taille de base, N articles répartis sur 30 jours avec des mentions
+synthétiques (celles de bench_agregation.py) ; compare la lecture des buckets
+horaires au comptage direct sur article_coins + articles filtrés par date :
+    python bench/bench_fenetres.py --articles 10000 100000 1000000
+"""
+import argparse
+import json
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import agregation
+import migrations
+from bench_agregation import coins_aleatoires
+
+JOURS = 30
+DEBUT = 1_750_000_000 // 3600 * 3600  # heure pleine, en secondes depuis l'epoch
+
+
+def generer(n, hasard):
+    conn = sqlite3.connect(":memory:")
+    migrations.migrer_articles(conn)
+    pas = JOURS * 86400 / n
+    conn.executemany(
+        "INSERT INTO articles (id, titre, lien, contenu_ia, date_ajout) "
+        "VALUES (?, ?, ?, ?, datetime(?, 'unixepoch'))",
+        ((i, f"Article {i}", f"https://exemple.test/{i}", "", DEBUT + int(i * pas)) for i in range(1, n + 1))
+    )
+    conn.executemany(
+        "INSERT INTO extractions (article_id, hash_contenu, version_prompt, modele, coins) VALUES (?, '', 'v', 'm', ?)",
+        ((i, json.dumps(coins_aleatoires(hasard))) for i in range(1, n + 1))
+    )
+    agregation.recompter(conn)
+    agregation.reindexer_mentions(conn)
+    agregation.recompter_horaires(conn)
+    conn.commit()
+    return conn
+
+
+def sans_buckets(conn, heures, maintenant):
+    """Même classement, compté sur toutes les mentions des articles de la fenêtre."""
+    return conn.execute("""
+        SELECT m.symbol, COUNT(*) AS n
+        FROM articles a
+        CROSS JOIN article_coins m ON m.article_id = a.id  -- par l'index de date_ajout d'abord
+        WHERE a.date_ajout >= datetime(?, 'unixepoch')
+        GROUP BY m.symbol
+        ORDER BY n DESC, m.symbol
+    """, ((maintenant - heures + 1) * 3600,)).fetchall()
+
+
+def chronometrer(appel, repetitions=20):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        appel()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return statistics.median(durees)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    maintenant = DEBUT // 3600 + JOURS * 24 - 1
+    print(f"{'articles':>9}   {'fenêtre':<8} {'buckets':>10}   {'sans buckets':>12}")
+    for n in args.articles:
+        debut = time.perf_counter()
+        conn = generer(n, random.Random(0))
+        print(f"{n:>9}   (base générée en {time.perf_counter() - debut:.1f} s)")
+        for fenetre, heures in agregation.FENETRES.items():
+            attendu = sans_buckets(conn, heures, maintenant)
+            obtenu = agregation.classement_fenetre(conn, heures, 100, maintenant=maintenant)
+            assert {c["symbol"]: c["count"] for c in obtenu} == dict(attendu)
+            ms = chronometrer(lambda: agregation.classement_fenetre(conn, heures, 100, maintenant=maintenant))
+            ms_direct = chronometrer(lambda: sans_buckets(conn, heures, maintenant))
+            print(f"{'':>9}   {fenetre:<8} {ms:7.2f} ms   {ms_direct:9.2f} ms")
+        ms = chronometrer(lambda: agregation.tendances(conn, 24, 10, maintenant=maintenant))
+        print(f"{'':>9}   {'trending':<8} {ms:7.2f} ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
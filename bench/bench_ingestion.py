@@ -0,0 +1,60 @@
+"""
+Benchmark de l'ingestion multi-flux contre le serveur RSS local.
+
+Compare l'ancienne boucle (feedparser.parse séquentiel sur chaque URL) au
+module ingestion (téléchargements parallèles, puis second passage conditionnel
+où les flux inchangés répondent 304) :
+    python bench/bench_ingestion.py --flux 8 --entrees 50 --latence 0.3
+"""
+import argparse
+import asyncio
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import feedparser
+
+import ingestion
+import migrations
+import serveur_rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flux", type=int, default=8)
+    parser.add_argument("--entrees", type=int, default=50)
+    parser.add_argument("--latence", type=float, default=0.3, help="Latence simulée du serveur (s)")
+    args = parser.parse_args()
+
+    serveur, base = serveur_rss.demarrer(latence=args.latence)
+    urls = [f"{base}/cointelegraph.xml"] + [
+        f"{base}/synthetique/flux{i}.xml?n={args.entrees}" for i in range(args.flux - 1)
+    ]
+
+    debut = time.perf_counter()
+    total = sum(len(feedparser.parse(url).entries[:ingestion.LIMITE_PAR_FLUX]) for url in urls)
+    print(f"séquentiel (feedparser.parse)  : {time.perf_counter() - debut:6.2f} s, {total} entrées")
+
+    conn = sqlite3.connect(":memory:")
+    migrations.migrer_articles(conn)
+    for passage in ("premier passage", "second passage"):
+        debut = time.perf_counter()
+        resume = ingestion.rafraichir(conn, urls)
+        print(f"parallèle, {passage:<15} : {time.perf_counter() - debut:6.2f} s, "
+              f"{resume['total_fetched']} entrées, {resume['new_articles']} nouvelles, "
+              f"{resume['feeds_unchanged']} flux en 304")
+
+    # sans état : même téléchargement parallèle, sans requêtes conditionnelles
+    debut = time.perf_counter()
+    resultats = asyncio.run(ingestion.recuperer_flux(urls))
+    print(f"parallèle, sans ETag           : {time.perf_counter() - debut:6.2f} s, "
+          f"{sum(len(r.entrees) for r in resultats)} entrées")
+    print(f"réponses du serveur : {serveur_rss.Gestionnaire.compteurs}")
+    serveur.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark de l'insertion des articles : ancienne boucle (un INSERT par entrée,
+doublons détectés par IntegrityError) contre l'insertion en bloc du module
+ingestion (un seul executemany en INSERT OR IGNORE, compté par rowcount) :
+    python bench/bench_insertion.py --entrees 10000 --deja-connues 0.5
+"""
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ingestion
+import migrations
+
+
+def inserer_boucle(conn, articles):
+    """L'ancienne boucle de recup_sql.py / refresh_articles."""
+    count_new = 0
+    count_existing = 0
+    for titre, lien, contenu in articles:
+        try:
+            conn.execute("INSERT INTO articles (titre, lien, contenu_ia) VALUES (?, ?, ?)", (titre, lien, contenu))
+            count_new += 1
+        except sqlite3.IntegrityError:
+            count_existing += 1
+    return count_new, count_existing
+
+
+def preparer(chemin, deja):
+    conn = sqlite3.connect(chemin)
+    conn.execute("PRAGMA journal_mode = WAL")
+    migrations.migrer_articles(conn)
+    conn.executemany(
+        "INSERT INTO articles (titre, lien, contenu_ia) VALUES (?, ?, ?)",
+        [(f"Ancien {i}", f"https://exemple.test/{i}", f"Titre: Ancien {i}") for i in range(deja)]
+    )
+    conn.commit()
+    return conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entrees", type=int, default=10_000)
+    parser.add_argument("--deja-connues", type=float, default=0.5, help="Part des entrées déjà en base")
+    args = parser.parse_args()
+
+    deja = int(args.entrees * args.deja_connues)
+    articles = [
+        (f"Article {i}", f"https://exemple.test/{i}", f"Titre: Article {i}\nRésumé: " + "texte " * 40)
+        for i in range(args.entrees)
+    ]
+
+    with tempfile.TemporaryDirectory() as dossier:
+        for nom, fonction in (("boucle + IntegrityError", inserer_boucle), ("en bloc", ingestion.inserer_articles)):
+            conn = preparer(f"{dossier}/{fonction.__name__}.db", deja)
+            debut = time.perf_counter()
+            with conn:
+                nouveaux, existants = fonction(conn, articles)
+            ecoule = time.perf_counter() - debut
+            print(f"{nom:<25} : {ecoule * 1000:8.1f} ms  ({args.entrees / ecoule:,.0f} entrées/s) "
+                  f"— {nouveaux} nouvelles, {existants} existantes")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
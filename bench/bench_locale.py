@@ -0,0 +1,72 @@
+"""
+Accord et débit de l'extracteur local face aux extractions Gemini enregistrées.
+
+Modes comparés sur bench/fixtures/extractions_gemini.json :
+  - local  : dictionnaire seul ;
+  - hybrid : les articles ambigus reprennent la réponse Gemini enregistrée.
+    python bench/bench_locale.py --repetitions 500
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from extraction_locale import ExtracteurLocal
+from faux_modele import FIXTURES
+
+
+def symboles(coins):
+    return {c["symbol"] for c in coins}
+
+
+def accord(predictions, references):
+    vp = sum(len(symboles(p) & symboles(r)) for p, r in zip(predictions, references))
+    fp = sum(len(symboles(p) - symboles(r)) for p, r in zip(predictions, references))
+    fn = sum(len(symboles(r) - symboles(p)) for p, r in zip(predictions, references))
+    exacts = sum(symboles(p) == symboles(r) for p, r in zip(predictions, references))
+    return {
+        "articles identiques": f"{exacts}/{len(references)}",
+        "précision": round(vp / max(1, vp + fp), 3),
+        "rappel": round(vp / max(1, vp + fn), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repetitions", type=int, default=500, help="Passes sur le corpus pour mesurer le débit")
+    parser.add_argument("--details", action="store_true", help="Afficher les désaccords")
+    args = parser.parse_args()
+
+    with open(FIXTURES, encoding="utf-8") as f:
+        articles = json.load(f)
+    textes = [a["contenu_ia"] for a in articles]
+    references = [a["coins"] for a in articles]
+
+    extracteur = ExtracteurLocal()
+    analyses = [extracteur.analyser(t) for t in textes]
+    local = [coins for coins, _ in analyses]
+    hybride = [ref if ambigu else coins for (coins, ambigu), ref in zip(analyses, references)]
+    nb_ambigus = sum(ambigu for _, ambigu in analyses)
+
+    debut = time.perf_counter()
+    for _ in range(args.repetitions):
+        for texte in textes:
+            extracteur.analyser(texte)
+    debit = args.repetitions * len(textes) / (time.perf_counter() - debut)
+
+    print(f"{len(textes)} articles, {debit:,.0f} articles/s en local")
+    print(f"local  : {accord(local, references)}")
+    print(f"hybrid : {accord(hybride, references)} — {nb_ambigus} articles envoyés au LLM")
+
+    if args.details:
+        for article, coins, (_, ambigu) in zip(articles, local, analyses):
+            if symboles(coins) != symboles(article["coins"]):
+                print(f"  #{article['id']} local={sorted(symboles(coins))} gemini={sorted(symboles(article['coins']))}"
+                      f"{' (ambigu)' if ambigu else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Compare l'extraction article par article et l'extraction par lots.
+
+Rejoue les extractions enregistrées (bench/fixtures/extractions_gemini.json)
+avec le faux modèle, vérifie que les deux modes donnent le même classement
+et affiche tokens et temps par article :
+    python bench/bench_lots.py --lot 10 --illisible 0.2 --incomplet 0.2
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from extraction import Statistiques, agreger, extraire_tous
+from faux_modele import FIXTURES, FauxModele, charger_fixtures
+
+
+def executer(textes, fixtures, args, **options):
+    modele = FauxModele(
+        latence=args.latence,
+        fixtures=fixtures,
+        taux_lot_illisible=args.illisible,
+        taux_lot_incomplet=args.incomplet,
+    )
+    stats = Statistiques()
+    resultats = asyncio.run(extraire_tous(
+        modele, textes, concurrence=args.concurrence, rpm=args.rpm, stats=stats, **options
+    ))
+    return agreger(resultats), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lot", type=int, default=10, help="Articles par prompt")
+    parser.add_argument("--budget-tokens", type=int, default=None, help="Budget de tokens par prompt")
+    parser.add_argument("--latence", type=float, default=0.3)
+    parser.add_argument("--rpm", type=int, default=600)
+    parser.add_argument("--concurrence", type=int, default=5)
+    parser.add_argument("--illisible", type=float, default=0.1, help="Part de réponses de lot tronquées")
+    parser.add_argument("--incomplet", type=float, default=0.1, help="Part de réponses de lot incomplètes")
+    args = parser.parse_args()
+
+    fixtures = charger_fixtures()
+    with open(FIXTURES, encoding="utf-8") as f:
+        textes = [article["contenu_ia"] for article in json.load(f)]
+
+    par_article, stats_article = executer(textes, fixtures, args)
+    par_lot, stats_lot = executer(textes, fixtures, args, taille_lot=args.lot, budget_tokens=args.budget_tokens)
+
+    print(f"{len(textes)} articles")
+    print(f"par article : {stats_article.resume(len(textes))}")
+    print(f"par lot     : {stats_lot.resume(len(textes))}")
+    print("crypto_scores identiques :", par_article == par_lot)
+
+
+if __name__ == "__main__":
+    main()
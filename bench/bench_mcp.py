@@ -0,0 +1,164 @@
+"""
+Test de charge du serveur MCP (MCP.py) en stdio, comme test_client_mcp.py.
+
+Génère une base de N articles extraits et K classements, lance le serveur sur
+ces bases et appelle chaque outil en boucle : appels par seconde, un appel à
+la fois puis `--clients` appels en vol, avec la mémorisation des réponses
+(MCP_CACHE_TAILLE par défaut) et sans (MCP_CACHE_TAILLE=0). Les mêmes outils
+appelés en process, sans le transport stdio, donnent le coût côté serveur :
+    python bench/bench_mcp.py --articles 100000 --appels 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import agregation
+import migrations
+from bench_agregation import remplir
+from bench_pool import RACINE
+from snapshots import creer_snapshot
+
+# serveur MCP sur les bases du benchmark plutôt que sur celles du dépôt
+LANCEUR = """
+import sys
+from pathlib import Path
+sys.path.insert(0, sys.argv[2])
+import db
+db.ARTICLES_DB_PATH = Path(sys.argv[1]) / "articles.db"
+db.LEADERBOARD_DB_PATH = Path(sys.argv[1]) / "leaderboard.db"
+import MCP
+MCP.mcp.run(show_banner=False)
+"""
+
+APPELS = [
+    ("lire_classement_crypto", {"limit": 10}),
+    ("lire_cryptos", {"symbols": ["BTC", "ETH", "SOL", "DOGE", "XYZ"]}),
+    ("detail_crypto", {"symbol": "XBT"}),
+    ("historique_crypto", {"symbol": "ETH", "limit": 50}),
+    ("derniers_articles", {"limit": 20}),
+    ("rechercher_articles", {"requete": "texte", "limit": 10}),
+    ("articles_crypto", {"symbol": "SOL", "limit": 20}),
+    ("cryptos_citees_avec", {"symbol": "BTC", "limit": 10}),
+]
+
+
+def generer(dossier, n, nb_snapshots):
+    conn = sqlite3.connect(dossier / "articles.db")
+    migrations.migrer_articles(conn)
+    remplir(conn, n, random.Random(0))
+    agregation.recompter(conn)
+    agregation.reindexer_mentions(conn)
+    agregation.recompter_horaires(conn)
+    conn.commit()
+    leaderboard = agregation.classement(conn)
+    conn.close()
+
+    conn = sqlite3.connect(dossier / "leaderboard.db")
+    migrations.migrer_leaderboard(conn)
+    hasard = random.Random(1)
+    for _ in range(nb_snapshots):
+        # même classement, comptes bruités : un historique par crypto
+        creer_snapshot(conn, [{**crypto, "count": crypto["count"] + hasard.randint(0, 50)} for crypto in leaderboard])
+    conn.close()
+
+
+async def mesurer(session, appels, repetitions, clients):
+    """Appels par seconde de chaque outil, puis du mélange de tous avec `clients` appels en vol."""
+    resultats = {}
+    for nom, arguments in appels:
+        resultat = await session.call_tool(nom, arguments)
+        assert not resultat.isError, resultat
+        debut = time.perf_counter()
+        for _ in range(repetitions):
+            await session.call_tool(nom, arguments)
+        resultats[nom] = repetitions / (time.perf_counter() - debut)
+
+    file = [appels[i % len(appels)] for i in range(repetitions * len(appels))]
+
+    async def client():
+        while file:
+            nom, arguments = file.pop()
+            await session.call_tool(nom, arguments)
+
+    total = len(file)
+    debut = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    resultats[f"mélange, {clients} en vol"] = total / (time.perf_counter() - debut)
+    return resultats
+
+
+async def lancer(dossier, taille_cache, repetitions, clients):
+    parametres = StdioServerParameters(
+        command=sys.executable,
+        args=["-c", LANCEUR, str(dossier), str(RACINE)],
+        env={**os.environ, "MCP_CACHE_TAILLE": str(taille_cache), "FASTMCP_LOG_LEVEL": "WARNING"},
+        cwd=str(RACINE),
+    )
+    async with stdio_client(parametres) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            return await mesurer(session, APPELS, repetitions, clients)
+
+
+async def en_process(taille_cache, repetitions):
+    """Appels par seconde de chaque outil appelé directement (MCP importé sur les bases du benchmark)."""
+    import MCP
+
+    resultats = {}
+    for lecteur in (MCP.articles, MCP.leaderboard):
+        lecteur.taille_cache = taille_cache
+        lecteur._memo.clear()
+    for nom, arguments in APPELS:
+        fonction = getattr(MCP, nom).fn
+        await fonction(**arguments)
+        debut = time.perf_counter()
+        for _ in range(repetitions):
+            await fonction(**arguments)
+        resultats[nom] = repetitions / (time.perf_counter() - debut)
+    return resultats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--snapshots", type=int, default=500)
+    parser.add_argument("--appels", type=int, default=500, help="Appels par outil")
+    parser.add_argument("--clients", type=int, default=8, help="Appels en vol pour le mélange")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        dossier = Path(dossier)
+        debut = time.perf_counter()
+        generer(dossier, args.articles, args.snapshots)
+        print(f"{args.articles} articles et {args.snapshots} classements générés "
+              f"en {time.perf_counter() - debut:.1f} s\n")
+
+        avec = asyncio.run(lancer(dossier, 256, args.appels, args.clients))
+        sans = asyncio.run(lancer(dossier, 0, args.appels, args.clients))
+
+        import db
+        db.ARTICLES_DB_PATH = dossier / "articles.db"
+        db.LEADERBOARD_DB_PATH = dossier / "leaderboard.db"
+        direct_avec = asyncio.run(en_process(256, args.appels))
+        direct_sans = asyncio.run(en_process(0, args.appels))
+
+    print(f"  {'':<28} {'stdio':>22}   {'en process':>22}")
+    print(f"  {'outil (appels/s)':<28} {'mémorisé':>10} {'sans cache':>11}   {'mémorisé':>10} {'sans cache':>11}")
+    for nom in avec:
+        direct = f"{direct_avec[nom]:>10,.0f} {direct_sans[nom]:>11,.0f}" if nom in direct_avec else ""
+        print(f"  {nom:<28} {avec[nom]:>10,.0f} {sans[nom]:>11,.0f}   {direct}")
+
+
+if __name__ == "__main__":
+    main()
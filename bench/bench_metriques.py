@@ -0,0 +1,174 @@
+"""
+Coût des métriques (metriques.py).
+
+Mesure d'abord le coût unitaire de chaque instrument : une observation
+d'histogramme, un execute SQLite chronométré, le middleware ASGI autour d'une
+application vide. Appelle ensuite l'API en process (ASGI, sans réseau) pour
+compter les observations par requête et en déduire le surcoût par requête.
+La comparaison directe avec et sans collecte (tours alternés, pour que la
+dérive de la machine pèse autant sur les deux) est donnée en plus, mais son
+bruit dépasse souvent l'écart à mesurer :
+    python bench/bench_metriques.py --articles 100000 --tours 20
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import agregation
+import metriques
+import migrations
+from bench_agregation import remplir
+from snapshots import creer_snapshot
+
+ROUTES = [
+    "/leaderboard", "/leaderboard?limit=100", "/leaderboard/BTC", "/leaderboard/batch?symbols=BTC,ETH,SOL",
+    "/leaderboard?window=24h", "/articles", "/articles/search?q=texte", "/stats",
+]
+
+
+def generer(dossier, n):
+    conn = sqlite3.connect(dossier / "articles.db")
+    migrations.migrer_articles(conn)
+    remplir(conn, n, random.Random(0))
+    agregation.recompter(conn)
+    agregation.reindexer_mentions(conn)
+    agregation.recompter_horaires(conn)
+    conn.commit()
+    leaderboard = agregation.classement(conn)
+    conn.close()
+
+    conn = sqlite3.connect(dossier / "leaderboard.db")
+    migrations.migrer_leaderboard(conn)
+    for _ in range(20):
+        creer_snapshot(conn, leaderboard)
+    conn.close()
+
+
+def par_appel(appel, repetitions):
+    """Durée médiane d'un appel, en ns, sur 5 séries de `repetitions`."""
+    series = []
+    for _ in range(5):
+        debut = time.perf_counter()
+        for _ in range(repetitions):
+            appel()
+        series.append((time.perf_counter() - debut) / repetitions * 1e9)
+    return statistics.median(series)
+
+
+async def application_vide(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def par_requete_asgi(application, repetitions):
+    """Durée médiane d'une requête ASGI vers `application`, en ns."""
+    scope = {"type": "http", "method": "GET", "path": "/"}
+
+    async def recevoir():
+        return {"type": "http.request"}
+
+    async def envoyer(message):
+        pass
+
+    async def boucle():
+        debut = time.perf_counter()
+        for _ in range(repetitions):
+            await application(scope, recevoir, envoyer)
+        return (time.perf_counter() - debut) / repetitions * 1e9
+
+    return statistics.median(asyncio.run(boucle()) for _ in range(5))
+
+
+def micro(dossier):
+    """Coût unitaire de chaque instrument, en ns : {"sql": surcoût d'un execute, "http": du middleware}."""
+    histogramme = metriques.histogramme("bench_secondes", "Histogramme du benchmark", ("route",))
+    compteur = metriques.compteur("bench_total", "Compteur du benchmark", ("route",))
+    nue = sqlite3.connect(dossier / "articles.db")
+    mesuree = sqlite3.connect(dossier / "articles.db", factory=metriques.ConnexionMesuree)
+    requete = "SELECT name, count FROM compteurs_cryptos WHERE symbol = ?"
+
+    print("coût unitaire (ns)")
+    print(f"  {'Histogramme.observer':<36} {par_appel(lambda: histogramme.observer(0.003, '/leaderboard'), 100_000):>8.0f}")
+    print(f"  {'Compteur.ajouter':<36} {par_appel(lambda: compteur.ajouter(1, '/leaderboard'), 100_000):>8.0f}")
+    nu = par_appel(lambda: nue.execute(requete, ("BTC",)).fetchall(), 20_000)
+    mesure = par_appel(lambda: mesuree.execute(requete, ("BTC",)).fetchall(), 20_000)
+    print(f"  {'execute + fetchall, connexion nue':<36} {nu:>8.0f}")
+    print(f"  {'execute + fetchall, ConnexionMesuree':<36} {mesure:>8.0f}   (+{mesure - nu:.0f} ns)")
+    vide = par_requete_asgi(application_vide, 50_000)
+    avec_middleware = par_requete_asgi(metriques.MiddlewareMetriques(application_vide), 50_000)
+    print(f"  {'requête ASGI, application vide':<36} {vide:>8.0f}")
+    print(f"  {'requête ASGI, MiddlewareMetriques':<36} {avec_middleware:>8.0f}   (+{avec_middleware - vide:.0f} ns)")
+    return {"sql": max(0.0, mesure - nu), "http": max(0.0, avec_middleware - vide)}
+
+
+def observations_sql():
+    return sum(sum(comptes) for _, comptes, _ in metriques.REQUETES_SQL.series())
+
+
+async def tour(client, requetes):
+    debut = time.perf_counter()
+    for i in range(requetes):
+        (await client.get(ROUTES[i % len(ROUTES)])).raise_for_status()
+    return (time.perf_counter() - debut) / requetes * 1e6
+
+
+async def macro(tours, requetes):
+    """(µs par requête avec et sans métriques en tours alternés, execute SQLite par requête)."""
+    import api
+
+    durees = {True: [], False: []}
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await tour(client, len(ROUTES))
+        avant = observations_sql()
+        await tour(client, requetes)
+        par_requete = (observations_sql() - avant) / requetes
+        for _ in range(tours):
+            for actives in (True, False):
+                metriques.ACTIVES = actives
+                durees[actives].append(await tour(client, requetes))
+    metriques.ACTIVES = True
+    return statistics.median(durees[True]), statistics.median(durees[False]), par_requete
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--tours", type=int, default=20, help="Tours avec et sans métriques, alternés")
+    parser.add_argument("--requetes", type=int, default=400, help="Requêtes par tour")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        dossier = Path(dossier)
+        generer(dossier, args.articles)
+        couts = micro(dossier)
+
+        import db
+        db.ARTICLES_DB_PATH = dossier / "articles.db"
+        db.LEADERBOARD_DB_PATH = dossier / "leaderboard.db"
+        db.ouvrir_pools()
+        from cache_reponses import cache
+
+        print(f"\nAPI en process, {len(ROUTES)} routes de lecture (µs par requête, médiane de {args.tours} tours)")
+        print(f"  {'':<20} {'execute/req':>11} {'sans':>7} {'surcoût calculé':>16} {'avec':>7} {'écart mesuré':>13}")
+        for nom, ttl in (("cache de réponses", cache.ttl or 60.0), ("sans cache", 0)):
+            cache.ttl = ttl
+            avec, sans, par_requete = asyncio.run(macro(args.tours, args.requetes))
+            # coût unitaire x nombre d'observations, rapporté à la requête sans métriques
+            calcule = (couts["http"] + par_requete * couts["sql"]) / 1000 / sans
+            print(f"  {nom:<20} {par_requete:>11.1f} {sans:>7.0f} {calcule:>16.2%} {avec:>7.0f} {(avec - sans) / sans:>13.1%}")
+        db.fermer_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Vérification et microbenchmark des backends de nettoyage HTML (nettoyage.py).
+
+Compare chaque backend à la référence BeautifulSoup sur le corpus
+bench/fixtures/resumes_html.json (résumés de flux réels et synthétiques, puis
+cas limites), mesure le débit en entrées/s, et le nettoyage en lot sur un pool
+de processus :
+    python bench/bench_nettoyage.py --entrees 20000 --processus 4
+"""
+import argparse
+import json
+import sys
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bs4 import XMLParsedAsHTMLWarning
+
+import nettoyage
+
+CORPUS = Path(__file__).resolve().parent / "fixtures" / "resumes_html.json"
+
+
+def verifier(nom, resumes):
+    """Fragments dont la sortie diffère de BeautifulSoup."""
+    return [
+        html for html in resumes
+        if nettoyage.nettoyer(html, nom) != nettoyage.nettoyer(html, "bs4")
+    ]
+
+
+def mesurer(fonction, resumes):
+    debut = time.perf_counter()
+    fonction(resumes)
+    return time.perf_counter() - debut
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entrees", type=int, default=20_000)
+    parser.add_argument("--processus", type=int, default=4)
+    args = parser.parse_args()
+
+    # le prologue <?xml ...?> d'un cas limite fait avertir BeautifulSoup
+    warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
+    corpus = json.loads(CORPUS.read_text(encoding="utf-8"))
+    flux = corpus["flux"]
+    resumes = [flux[i % len(flux)] for i in range(args.entrees)]
+
+    disponibles = []
+    for nom in nettoyage.BACKENDS:
+        try:
+            nettoyage.nettoyer("<p>test</p>", nom)
+        except ImportError as e:
+            print(f"{nom:<11} : indisponible ({e})")
+            continue
+        disponibles.append(nom)
+
+    print(f"Conformité à BeautifulSoup ({len(flux)} résumés de flux, {len(corpus['cas_limites'])} cas limites) :")
+    for nom in disponibles:
+        ecarts = verifier(nom, corpus["cas_limites"])
+        print(f"  {nom:<11} : flux {len(flux) - len(verifier(nom, flux))}/{len(flux)}, "
+              f"cas limites {len(corpus['cas_limites']) - len(ecarts)}/{len(corpus['cas_limites'])}")
+        for html in ecarts:
+            print(f"      diffère sur {html[:60]!r}")
+
+    print(f"\nDébit sur {args.entrees} résumés :")
+    reference = None
+    for nom in disponibles:
+        ecoule = mesurer(lambda r: nettoyage.nettoyer_lot(r, nom, processus=1), resumes)
+        reference = reference or ecoule
+        print(f"  {nom:<11} : {args.entrees / ecoule:10,.0f} entrées/s  (x{reference / ecoule:.1f})")
+
+    print(f"\nnettoyer_lot (backend {nettoyage.BACKEND_PAR_DEFAUT}) :")
+    for processus in (1, args.processus):
+        ecoule = mesurer(lambda r: nettoyage.nettoyer_lot(r, processus=processus), resumes)
+        print(f"  {processus} processus : {args.entrees / ecoule:10,.0f} entrées/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark de la pagination de /articles : offset contre curseur.
+
+Génère une base de N articles (1 million par défaut, dates groupées par lots
+comme à l'ingestion), puis mesure le temps d'une page à différentes
+profondeurs :
+  - l'ancienne requête (ORDER BY date_ajout DESC LIMIT/OFFSET, sans index) ;
+  - get_articles en mode offset, avec l'index (date_ajout, id) ;
+  - get_articles en mode curseur.
+    python bench/bench_pagination.py --articles 1000000
+"""
+import argparse
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db
+
+LIMITE = 20
+
+
+def generer(chemin, n):
+    conn = sqlite3.connect(chemin)
+    conn.execute("""
+        CREATE TABLE articles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            titre TEXT NOT NULL,
+            lien TEXT UNIQUE NOT NULL,
+            contenu_ia TEXT,
+            date_ajout TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # 50 articles par rafraîchissement, toutes les 10 minutes : beaucoup d'ex aequo sur date_ajout
+    conn.execute("""
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < ?)
+        INSERT INTO articles (titre, lien, contenu_ia, date_ajout)
+        SELECT 'Article ' || i, 'https://exemple.test/' || i, 'Titre: Article ' || i,
+               datetime(1700000000 + (i / 50) * 600, 'unixepoch')
+        FROM n
+    """, (n,))
+    conn.commit()
+    return conn
+
+
+def chronometrer(appel, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        appel()
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=1_000_000)
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args()
+
+    profondeurs = [p for p in (0, 1_000, 10_000, 100_000, 500_000, args.articles - LIMITE) if p < args.articles]
+
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = Path(dossier) / "articles.db"
+        debut = time.perf_counter()
+        conn = generer(chemin, args.articles)
+        print(f"{args.articles} articles générés en {time.perf_counter() - debut:.1f} s\n")
+
+        print("sans index, ORDER BY date_ajout DESC LIMIT/OFFSET (ancienne requête) :")
+        for offset in profondeurs[:3]:
+            ms = chronometrer(lambda: conn.execute(
+                "SELECT id, titre, lien, date_ajout FROM articles ORDER BY date_ajout DESC LIMIT ? OFFSET ?",
+                (LIMITE, offset)
+            ).fetchall(), args.repetitions)
+            print(f"  offset {offset:>9} : {ms:8.2f} ms")
+
+        import migrations
+        debut = time.perf_counter()
+        migrations.migrer_articles(conn)
+        print(f"\nmigrations (dont l'index (date_ajout, id)) appliquées en {time.perf_counter() - debut:.1f} s")
+
+        # curseur de chaque profondeur : la clé de la dernière ligne de la page précédente
+        cles = {
+            offset: conn.execute(
+                "SELECT date_ajout, id FROM articles ORDER BY date_ajout DESC, id DESC LIMIT 1 OFFSET ?",
+                (offset - 1,)
+            ).fetchone()
+            for offset in profondeurs if offset
+        }
+        conn.close()
+
+        db.ARTICLES_DB_PATH = chemin
+        import api
+        from fastapi import Request
+
+        api.cache.ttl = 0
+        requete = Request({"type": "http", "headers": []})
+
+        print(f"\nget_articles, pages de {LIMITE} :")
+        print(f"  {'profondeur':>10}   {'offset':>10}   {'curseur':>10}")
+        for offset in profondeurs:
+            ms_offset = chronometrer(lambda: api.get_articles(requete, limit=LIMITE, offset=offset, cursor=None),
+                                     args.repetitions)
+            curseur = api.encoder_curseur(*cles[offset]) if offset else None
+            ms_curseur = chronometrer(lambda: api.get_articles(requete, limit=LIMITE, offset=0, cursor=curseur),
+                                      args.repetitions)
+
+            # même page dans les deux modes
+            page_offset = api.get_articles(requete, limit=LIMITE, offset=offset, cursor=None).body
+            assert page_offset == api.get_articles(requete, limit=LIMITE, offset=0, cursor=curseur).body
+            print(f"  {offset:>10}   {ms_offset:7.2f} ms   {ms_curseur:7.2f} ms")
+        db.fermer_pools()
+
+
+if __name__ == "__main__":
+    main()
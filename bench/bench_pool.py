@@ -0,0 +1,122 @@
+"""
+Benchmark du pool de connexions SQLite de l'API.
+
+Lance l'API avec la même commande gunicorn que start.sh, une fois sans pool
+(SQLITE_POOL_SIZE=0, une connexion par requête comme avant) puis avec le pool,
+et mesure le débit (req/s) sur les routes de lecture. L'API tourne sur une
+copie de articles.db et leaderboard.db (elle migre ses bases au démarrage) :
+
+    python bench/bench_pool.py --duree 10 --clients 32
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+RACINE = Path(__file__).resolve().parent.parent
+ROUTES = ["/leaderboard", "/leaderboard/BTC", "/articles", "/stats", "/health"]
+
+
+def copier_bases(dossier):
+    """
+    Copie articles.db et leaderboard.db du dépôt dans `dossier` ; retourne les
+    variables ARTICLES_DB et LEADERBOARD_DB qui pointent sur les copies.
+    """
+    variables = {}
+    for variable, nom in (("ARTICLES_DB", "articles.db"), ("LEADERBOARD_DB", "leaderboard.db")):
+        source = sqlite3.connect(f"{(RACINE / nom).as_uri()}?mode=ro", uri=True)
+        copie = sqlite3.connect(Path(dossier) / nom)
+        with source, copie:
+            source.backup(copie)
+        source.close()
+        copie.close()
+        variables[variable] = str(Path(dossier) / nom)
+    return variables
+
+
+def lancer_gunicorn(port, pool_size, workers, **variables):
+    env = dict(os.environ, SQLITE_POOL_SIZE=str(pool_size), **variables)
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", "api:app",
+            "--workers", str(workers),
+            "--worker-class", "uvicorn.workers.UvicornWorker",
+            "--bind", f"127.0.0.1:{port}",
+            "--log-level", "warning",
+        ],
+        cwd=RACINE,
+        env=env,
+    )
+
+
+async def attendre_pret(base_url, timeout=20):
+    debut = time.monotonic()
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() - debut < timeout:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("L'API n'a pas démarré à temps")
+
+
+async def charger(base_url, duree, clients):
+    fin = time.monotonic() + duree
+    compteur = [0, 0]  # [succès, erreurs]
+
+    async def client_boucle(client, decalage):
+        i = decalage
+        while time.monotonic() < fin:
+            r = await client.get(ROUTES[i % len(ROUTES)])
+            compteur[0 if r.status_code < 400 else 1] += 1
+            i += 1
+
+    limites = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limites) as client:
+        debut = time.monotonic()
+        await asyncio.gather(*(client_boucle(client, k) for k in range(clients)))
+        ecoule = time.monotonic() - debut
+
+    return compteur[0] / ecoule, compteur[1]
+
+
+def mesurer(nom, pool_size, args, bases):
+    base_url = f"http://127.0.0.1:{args.port}"
+    proc = lancer_gunicorn(args.port, pool_size, args.workers, **bases)
+    try:
+        asyncio.run(attendre_pret(base_url))
+        asyncio.run(charger(base_url, 2, args.clients))  # échauffement
+        debit, erreurs = asyncio.run(charger(base_url, args.duree, args.clients))
+        print(f"{nom:<12} {debit:>10.1f} req/s   ({erreurs} erreurs)")
+        return debit
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duree", type=float, default=10, help="Durée de chaque mesure en secondes")
+    parser.add_argument("--clients", type=int, default=32, help="Nombre de clients concurrents")
+    parser.add_argument("--workers", type=int, default=2, help="Workers gunicorn (2 dans start.sh)")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        bases = copier_bases(dossier)
+        avant = mesurer("sans pool", 0, args, bases)
+        apres = mesurer("avec pool", 8, args, bases)
+    print(f"Gain : x{apres / avant:.2f}")
+
+
+if __name__ == "__main__":
+    main()
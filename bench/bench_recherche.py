@@ -0,0 +1,147 @@
+"""
+Benchmark de la recherche plein texte (/articles/search, FTS5).
+
+Génère une base de N articles synthétiques (1 million par défaut) : titres et
+résumés tirés d'un vocabulaire à distribution de Zipf, comme un vrai texte, avec
+des noms de cryptos. Les articles passent par les triggers de la migration 3,
+le temps d'indexation est donc celui de l'ingestion. Mesure ensuite la médiane
+et le p95 de get_search_articles pour des requêtes plus ou moins sélectives,
+en première page et en page suivante (curseur), avec le classement limité
+aux --candidats articles les plus récents (RECHERCHE_CANDIDATS) et avec bm25 exact :
+    python bench/bench_recherche.py --articles 1000000
+"""
+import argparse
+import itertools
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db
+import migrations
+import recherche
+
+LIMITE = 20
+CRYPTOS = ["Bitcoin", "Ethereum", "Solana", "Cardano", "Ripple", "Dogecoin", "Polkadot", "Chainlink",
+           "Litecoin", "Avalanche", "Tron", "Monero", "Zcash", "Stellar", "Uniswap", "Aave"]
+REQUETES = [
+    "zcash",                 # crypto peu citée
+    "whales",                # mot rare
+    "bitcoin",               # crypto très citée
+    "market",                # mot très courant
+    "ethereum etf",          # deux mots
+    '"bitcoin price"',       # phrase exacte
+    "regul*",                # préfixe
+    "zqxwvy",                # aucun résultat
+]
+
+
+# quelques mots réels pour les requêtes, à leur rang dans la loi de Zipf
+REELS = {"market": 30, "price": 60, "etf": 400, "regulation": 1500, "regulators": 2500, "whales": 8000}
+
+
+def vocabulaire(hasard, taille):
+    """Mots inventés, plus les mots réels de REELS à leur rang."""
+    lettres = "abcdefghijklmnopqrstuvwxyz"
+    mots = sorted({"".join(hasard.choices(lettres, k=hasard.randint(3, 10))) for _ in range(taille)} - set(REELS))
+    hasard.shuffle(mots)
+    for mot, rang in sorted(REELS.items(), key=lambda item: item[1]):
+        mots.insert(rang, mot)
+    return mots
+
+
+def generer(chemin, n, graine=42):
+    hasard = random.Random(graine)
+    mots = vocabulaire(hasard, 30_000)
+    # loi de Zipf : le k-ième mot a un poids 1/k
+    poids = [1 / (k + 1) for k in range(len(mots))]
+    cumul = list(itertools.accumulate(poids))
+
+    def phrase(k):
+        tires = hasard.choices(mots, cum_weights=cumul, k=k)
+        # une crypto dans un tiers des phrases, Bitcoin et Ethereum plus souvent que les autres
+        if hasard.random() < 0.33:
+            tires[hasard.randrange(k)] = CRYPTOS[min(int(hasard.expovariate(0.5)), len(CRYPTOS) - 1)]
+        return " ".join(tires)
+
+    conn = sqlite3.connect(chemin)
+    migrations.migrer_articles(conn)
+    lot = 10_000
+    for debut in range(0, n, lot):
+        articles = []
+        for i in range(debut, min(debut + lot, n)):
+            titre = phrase(hasard.randint(6, 12))
+            articles.append((titre, f"https://exemple.test/{i}",
+                             f"Titre: {titre}\nRésumé: {phrase(hasard.randint(20, 50))}"))
+        with conn:
+            conn.executemany("INSERT INTO articles (titre, lien, contenu_ia) VALUES (?, ?, ?)", articles)
+    conn.close()
+
+
+def chronometrer(appel, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        appel()
+        durees.append((time.perf_counter() - debut) * 1000)
+    durees.sort()
+    return statistics.median(durees), durees[min(len(durees) - 1, int(len(durees) * 0.95))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=1_000_000)
+    parser.add_argument("--repetitions", type=int, default=20)
+    parser.add_argument("--candidats", type=int, default=2000, help="RECHERCHE_CANDIDATS du classement approché")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = Path(dossier) / "articles.db"
+        debut = time.perf_counter()
+        generer(chemin, args.articles)
+        ecoule = time.perf_counter() - debut
+        print(f"{args.articles} articles générés et indexés en {ecoule:.1f} s "
+              f"({args.articles / ecoule:,.0f} articles/s, base de {chemin.stat().st_size / 1e6:.0f} Mo)\n")
+
+        db.ARTICLES_DB_PATH = chemin
+        import api
+        from fastapi import Request
+
+        api.cache.ttl = 0
+        requete = Request({"type": "http", "headers": []})
+
+        def page(q, cursor=None):
+            return api.get_search_articles(requete, q=q, limit=LIMITE, cursor=cursor)
+
+        candidats = args.candidats
+        print(f"get_search_articles, pages de {LIMITE} (médiane / p95) :")
+        print(f"  {'requête':<16} {'trouvés':>8}   {f'page 1, {candidats} candidats':>24}"
+              f"   {'page 2 (curseur)':>19}   {'page 1, bm25 exact':>19}")
+        with db.connexion_articles() as conn:
+            for q in REQUETES:
+                trouves = conn.execute(
+                    "SELECT COUNT(*) FROM articles_fts WHERE articles_fts MATCH ?", (api.requete_fts(q),)
+                ).fetchone()[0]
+                recherche.RECHERCHE_CANDIDATS = candidats
+                p50, p95 = chronometrer(lambda: page(q), args.repetitions)
+                suivant = page(q).headers.get("X-Next-Cursor")
+                if suivant:
+                    s50, s95 = chronometrer(lambda: page(q, suivant), args.repetitions)
+                    colonne2 = f"{s50:7.2f} / {s95:7.2f} ms"
+                else:
+                    colonne2 = f"{'-':>19}"
+                # classement de tous les articles trouvés (RECHERCHE_CANDIDATS=0)
+                recherche.RECHERCHE_CANDIDATS = 0
+                e50, e95 = chronometrer(lambda: page(q), max(args.repetitions // 4, 1))
+                print(f"  {q:<16} {trouves:>8}   {p50:12.2f} / {p95:7.2f} ms   {colonne2}"
+                      f"   {e50:7.2f} / {e95:7.2f} ms")
+        db.fermer_pools()
+
+
+if __name__ == "__main__":
+    main()
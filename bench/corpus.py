@@ -0,0 +1,197 @@
+"""
+Corpus synthétique pour les benchmarks : articles.db et leaderboard.db remplis
+comme en production, à 10k, 100k ou 1M articles.
+
+Les articles citent les cryptos du dictionnaire de l'extracteur local sous
+leur ticker, leur nom ou un alias (« XBT », « Ether »), avec une distribution
+de Zipf (BTC et ETH dans une bonne part des articles, la traîne rarement) et
+quelques tokens inconnus. Ils sont répartis sur `--jours` jours jusqu'à
+maintenant, avec leurs extractions (sauf les `--a-extraire` plus récents) ;
+leaderboard.db reçoit un classement par jour. Le même --graine donne le même
+corpus :
+    python bench/corpus.py --taille 100k --dossier bench/corpus/100k
+"""
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import time
+from collections import Counter
+from itertools import accumulate
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import agregation
+import cache_extractions
+import migrations
+from extraction import version_prompt
+from extraction_locale import DICTIONNAIRE
+from snapshots import creer_snapshot
+
+TAILLES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+DOSSIER = Path(__file__).resolve().parent / "corpus"
+LOT = 10_000
+
+# nombre de cryptos citées par article (0 à 5) et leur poids
+NB_MENTIONS = [0, 1, 2, 3, 4, 5]
+POIDS_NB_MENTIONS = [15, 40, 25, 12, 5, 3]
+INCONNUS = [(f"TK{i}", f"Token {i}", []) for i in range(200)]
+
+MOTS = ["marché", "hausse", "baisse", "volatilité", "ETF", "régulation", "liquidité", "halving", "staking",
+        "mise à jour", "réseau", "frais", "baleines", "analystes", "support", "résistance", "record", "afflux",
+        "sorties", "institutionnels", "stablecoins", "dérivés", "options", "mineurs", "validateurs", "airdrop",
+        "plateforme", "portefeuille", "sécurité", "piratage", "SEC", "taux", "inflation", "dollar", "rallye",
+        "correction", "capitalisation", "volume", "tendance", "adoption"]
+
+
+def _date(t):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(t))
+
+
+def articles_synthetiques(n, jours, graine):
+    """(id, titre, lien, contenu_ia, date_ajout, coins) de n articles, du plus ancien au plus récent."""
+    hasard = random.Random(graine)
+    univers = [(symbol, nom, tuple(alias)) for symbol, nom, alias in DICTIONNAIRE + INCONNUS]
+    cumuls = list(accumulate(1 / rang ** 1.1 for rang in range(1, len(univers) + 1)))
+    fin = time.time()
+    pas = jours * 86400 / n
+
+    for i in range(1, n + 1):
+        nb = hasard.choices(NB_MENTIONS, POIDS_NB_MENTIONS)[0]
+        cites = list(dict.fromkeys(hasard.choices(univers, cum_weights=cumuls, k=nb)))
+        # chaque crypto sous l'une de ses formes : ticker, nom ou alias
+        formes = [hasard.choice([symbol, nom, *alias]) for symbol, nom, alias in cites]
+        mots = hasard.sample(MOTS, 6)
+        titre = f"{formes[0]} : {mots[0]} et {mots[1]} #{i}" if formes else f"Crypto : {mots[0]} et {mots[1]} #{i}"
+        resume = f"{', '.join(formes[1:]) or 'Le secteur'} face à {mots[2]}, {mots[3]} et {mots[4]} ; {mots[5]} en vue."
+        yield (
+            i, titre, f"https://corpus.test/{i}", f"Titre: {titre}\nRésumé: {resume}",
+            _date(fin - (n - i) * pas),
+            [{"name": nom, "symbol": symbol} for symbol, nom, _ in cites],
+        )
+
+
+def generer(dossier, n, jours=365, a_extraire=0, graine=0, taille_classement=100):
+    """Crée articles.db et leaderboard.db dans `dossier` (fichiers existants remplacés)."""
+    dossier = Path(dossier)
+    dossier.mkdir(parents=True, exist_ok=True)
+    for nom in ("articles.db", "leaderboard.db", "corpus.json"):
+        for fichier in dossier.glob(nom + "*"):
+            fichier.unlink()
+
+    conn = sqlite3.connect(dossier / "articles.db")
+    migrations.migrer_articles(conn)
+    conn_lb = sqlite3.connect(dossier / "leaderboard.db")
+    migrations.migrer_leaderboard(conn_lb)
+    for c in (conn, conn_lb):
+        c.execute("PRAGMA synchronous = OFF")
+
+    version = version_prompt(1)
+    comptes, noms = Counter(), {}
+    jour = None
+
+    def classer(dernier_id, jour):
+        leaderboard = [
+            {"rank": rank, "symbol": symbol, "name": noms[symbol], "count": count}
+            for rank, (symbol, count) in enumerate(comptes.most_common(taille_classement), 1)
+        ]
+        # fenêtre d'extractions cumulée, comme cache_extractions.fenetre_extractions
+        snapshot_id = creer_snapshot(conn_lb, leaderboard, 1, dernier_id, dernier_id)
+        with conn_lb:
+            conn_lb.execute("UPDATE snapshots SET created_at = ? WHERE id = ?", (f"{jour} 23:59:59", snapshot_id))
+
+    lot = []
+    for article in articles_synthetiques(n, jours, graine):
+        article_id, _, _, _, date_ajout, cites = article
+        if jour is not None and date_ajout[:10] != jour:
+            classer(article_id - 1, jour)
+        jour = date_ajout[:10]
+        if article_id <= n - a_extraire:
+            for coin in cites:
+                comptes[coin["symbol"]] += 1
+                noms.setdefault(coin["symbol"], coin["name"])
+        lot.append(article)
+        if len(lot) == LOT:
+            _inserer(conn, lot, n - a_extraire, version)
+            lot = []
+    _inserer(conn, lot, n - a_extraire, version)
+    classer(n, jour)
+
+    with conn:
+        agregation.recompter(conn)
+        agregation.reindexer_mentions(conn)
+        agregation.recompter_horaires(conn)
+    conn.execute("PRAGMA optimize")
+    conn.close()
+    conn_lb.close()
+
+    description = parametres(n, jours, a_extraire, graine, taille_classement)
+    (dossier / "corpus.json").write_text(json.dumps(description, indent=2), encoding="utf-8")
+    return description
+
+
+def _inserer(conn, lot, dernier_extrait, version):
+    with conn:
+        conn.executemany(
+            "INSERT INTO articles (id, titre, lien, contenu_ia, date_ajout, hash_contenu) VALUES (?, ?, ?, ?, ?, ?)",
+            [(*article[:5], cache_extractions.empreinte(article[3])) for article in lot]
+        )
+        conn.executemany(
+            "INSERT INTO extractions (article_id, hash_contenu, version_prompt, modele, coins, extrait_le) "
+            "VALUES (?, ?, ?, 'gemini-2.5-flash-lite', ?, ?)",
+            [(article_id, cache_extractions.empreinte(contenu), version, json.dumps(cites, ensure_ascii=False), date)
+             for article_id, _, _, contenu, date, cites in lot if article_id <= dernier_extrait]
+        )
+
+
+def parametres(n, jours, a_extraire, graine, taille_classement):
+    """Ce qui identifie un corpus : même description, même contenu (au jour de génération près)."""
+    return {
+        "articles": n, "jours": jours, "a_extraire": a_extraire, "graine": graine,
+        "taille_classement": taille_classement,
+        "schema": {
+            "articles": migrations.MIGRATIONS_ARTICLES[-1][0],
+            "leaderboard": migrations.MIGRATIONS_LEADERBOARD[-1][0],
+        },
+    }
+
+
+def preparer(dossier, n, jours=365, a_extraire=0, graine=0, taille_classement=100):
+    """Corpus de `dossier`, réutilisé s'il a été généré avec les mêmes paramètres, sinon (re)généré."""
+    dossier = Path(dossier)
+    attendu = parametres(n, jours, a_extraire, graine, taille_classement)
+    try:
+        if json.loads((dossier / "corpus.json").read_text(encoding="utf-8")) == attendu:
+            return attendu
+    except (OSError, ValueError):
+        pass
+    return generer(dossier, n, jours, a_extraire, graine, taille_classement)
+
+
+def taille(valeur):
+    """« 100k », « 1M » ou un nombre d'articles."""
+    return TAILLES.get(valeur) or int(valeur)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--taille", default="100k", help="10k, 100k, 1M ou un nombre d'articles")
+    parser.add_argument("--dossier", type=Path, default=None, help="Par défaut bench/corpus/<taille>")
+    parser.add_argument("--jours", type=int, default=365)
+    parser.add_argument("--a-extraire", type=int, default=0, help="Articles récents laissés sans extraction")
+    parser.add_argument("--graine", type=int, default=0)
+    args = parser.parse_args()
+
+    n = taille(args.taille)
+    dossier = args.dossier or DOSSIER / args.taille
+    debut = time.perf_counter()
+    generer(dossier, n, args.jours, args.a_extraire, args.graine)
+    print(f"{n} articles générés dans {dossier} en {time.perf_counter() - debut:.1f} s")
+    for nom in ("articles.db", "leaderboard.db"):
+        print(f"  {nom:<16} {(dossier / nom).stat().st_size / 1e6:>8.1f} Mo")
+
+
+if __name__ == "__main__":
+    main()
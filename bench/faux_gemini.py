@@ -0,0 +1,97 @@
+"""
+Faux endpoint Gemini local : l'API REST generateContent servie en HTTP, pour
+faire tourner analyse_articles.py de bout en bout sans réseau ni quota.
+
+Les réponses viennent du faux modèle (faux_modele.FauxModele) : mêmes coins
+détectés, même quota simulé (429 au-delà de --rpm), mêmes 5xx aléatoires.
+Le client google-generativeai y est redirigé par GEMINI_API_ENDPOINT :
+    python bench/faux_gemini.py --port 8082 --latence 0.2
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8082 API_KEY=local python analyse_articles.py
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from faux_modele import ErreurAPI, FauxModele
+
+ROUTE = re.compile(r"^/v1beta/models/([^/:]+):generateContent")
+STATUTS = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE"}
+
+
+class Gestionnaire(BaseHTTPRequestHandler):
+    modele = None
+    verrou = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _repondre(self, code, corps):
+        contenu = json.dumps(corps, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(contenu)))
+        self.end_headers()
+        self.wfile.write(contenu)
+
+    def _erreur(self, code, message):
+        self._repondre(code, {"error": {"code": code, "message": message, "status": STATUTS.get(code, "UNKNOWN")}})
+
+    def do_POST(self):
+        if not ROUTE.match(self.path):
+            return self._erreur(404, f"Route inconnue : {self.path}")
+        requete = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        prompt = "".join(part.get("text", "") for contenu in requete.get("contents", [])
+                         for part in contenu.get("parts", []))
+
+        # quota et hasard du faux modèle partagés entre les threads du serveur
+        try:
+            with self.verrou:
+                self.modele._verifier_quota()
+                delai = self.modele.latence * self.modele.hasard.uniform(0.5, 1.5)
+        except ErreurAPI as e:
+            return self._erreur(e.code, str(e))
+        time.sleep(delai)
+
+        with self.verrou:
+            texte = self.modele.repondre(prompt)
+        self._repondre(200, {
+            "candidates": [{"content": {"parts": [{"text": texte}], "role": "model"}, "finishReason": 1, "index": 0}],
+            "usageMetadata": {
+                "promptTokenCount": len(prompt) // 4,
+                "candidatesTokenCount": len(texte) // 4,
+                "totalTokenCount": (len(prompt) + len(texte)) // 4,
+            },
+        })
+
+
+def demarrer(port=0, latence=0.0, rpm=None, taux_5xx=0.0):
+    """Démarre le faux endpoint dans un thread ; retourne (serveur, url de base, faux modèle)."""
+    modele = FauxModele(latence=latence, rpm=rpm, taux_5xx=taux_5xx)
+    # un gestionnaire par serveur : chacun son quota et son verrou
+    gestionnaire = type("Gestionnaire", (Gestionnaire,), {"modele": modele, "verrou": threading.Lock()})
+    serveur = ThreadingHTTPServer(("127.0.0.1", port), gestionnaire)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return serveur, f"http://127.0.0.1:{serveur.server_address[1]}", modele
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--latence", type=float, default=0.0, help="Latence moyenne de chaque réponse (s)")
+    parser.add_argument("--rpm", type=int, default=None, help="Quota simulé (requêtes/minute)")
+    parser.add_argument("--taux-5xx", type=float, default=0.0)
+    args = parser.parse_args()
+
+    serveur, url, _ = demarrer(args.port, args.latence, args.rpm, args.taux_5xx)
+    print(f"Faux Gemini sur {url} (GEMINI_API_ENDPOINT={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        serveur.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Faux modèle Gemini local, pour mesurer le moteur d'extraction sans réseau ni quota.
+
+Il expose la même interface que `genai.GenerativeModel` (generate_content /
+generate_content_async), simule une latence, un quota en requêtes par minute
+(429 au-delà) et des erreurs 5xx aléatoires. Il comprend les prompts d'un
+article comme les prompts de lot, et peut rejouer des extractions enregistrées
+(bench/fixtures/extractions_gemini.json) ou rendre des lots illisibles/incomplets.
+"""
+import asyncio
+import json
+import random
+import re
+import time
+from collections import deque
+from pathlib import Path
+from types import SimpleNamespace
+
+# Petit dictionnaire pour répondre quelque chose de plausible
+COINS_CONNUS = {
+    "Bitcoin": "BTC", "BTC": "BTC",
+    "Ethereum": "ETH", "Ether": "ETH", "ETH": "ETH",
+    "Solana": "SOL", "SOL": "SOL",
+    "XRP": "XRP",
+    "BNB": "BNB",
+    "Cardano": "ADA", "ADA": "ADA",
+    "Dogecoin": "DOGE", "DOGE": "DOGE",
+    "Tether": "USDT", "USDT": "USDT",
+    "USDC": "USDC",
+}
+NOMS = {"BTC": "Bitcoin", "ETH": "Ethereum", "SOL": "Solana", "XRP": "XRP", "BNB": "BNB",
+        "ADA": "Cardano", "DOGE": "Dogecoin", "USDT": "Tether", "USDC": "USD Coin"}
+ARTICLE_LOT = re.compile(r'<article id="(\d+)">\n(.*?)\n</article>', re.S)
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "extractions_gemini.json"
+MOTIF = re.compile(r"\b(" + "|".join(sorted(map(re.escape, COINS_CONNUS), key=len, reverse=True)) + r")\b")
+
+
+class ErreurAPI(Exception):
+    def __init__(self, code, message=""):
+        super().__init__(f"{code} {message}".strip())
+        self.code = code
+
+
+def texte_du_prompt(prompt):
+    debut = prompt.find('"', prompt.find('Texte :'))
+    return prompt[debut + 1:prompt.rfind('"')]
+
+
+def charger_fixtures(chemin=FIXTURES):
+    """Extractions enregistrées : {contenu_ia: coins}."""
+    with open(chemin, encoding="utf-8") as f:
+        return {article["contenu_ia"]: article["coins"] for article in json.load(f)}
+
+
+def coins_detectes(texte):
+    symboles = []
+    for match in MOTIF.finditer(texte):
+        symbol = COINS_CONNUS[match.group(1)]
+        if symbol not in symboles:
+            symboles.append(symbol)
+    return [{"name": NOMS[s], "symbol": s} for s in symboles]
+
+
+class FauxModele:
+    def __init__(self, latence=0.4, rpm=None, taux_5xx=0.0, fixtures=None,
+                 taux_lot_illisible=0.0, taux_lot_incomplet=0.0, graine=0):
+        self.latence = latence
+        self.rpm = rpm
+        self.taux_5xx = taux_5xx
+        self.fixtures = fixtures
+        self.taux_lot_illisible = taux_lot_illisible
+        self.taux_lot_incomplet = taux_lot_incomplet
+        self.hasard = random.Random(graine)
+        self.appels = deque()
+        self.nb_appels = 0
+        self.nb_429 = 0
+        self.nb_5xx = 0
+
+    def _verifier_quota(self):
+        maintenant = time.monotonic()
+        while self.appels and maintenant - self.appels[0] > 60:
+            self.appels.popleft()
+        self.nb_appels += 1
+        if self.rpm is not None and len(self.appels) >= self.rpm:
+            self.nb_429 += 1
+            raise ErreurAPI(429, "Resource has been exhausted")
+        self.appels.append(maintenant)
+        if self.hasard.random() < self.taux_5xx:
+            self.nb_5xx += 1
+            raise ErreurAPI(503, "Service unavailable")
+
+    def coins(self, texte):
+        if self.fixtures is not None:
+            return self.fixtures[texte]
+        return coins_detectes(texte)
+
+    def repondre(self, prompt):
+        articles = ARTICLE_LOT.findall(prompt)
+        if not articles:
+            return json.dumps({"coins": self.coins(texte_du_prompt(prompt))}, ensure_ascii=False)
+
+        reponse = {article_id: {"coins": self.coins(texte)} for article_id, texte in articles}
+        if len(articles) > 1 and self.hasard.random() < self.taux_lot_incomplet:
+            del reponse[self.hasard.choice(list(reponse))]
+        texte = json.dumps(reponse, ensure_ascii=False)
+        if len(articles) > 1 and self.hasard.random() < self.taux_lot_illisible:
+            texte = texte[:len(texte) // 2]  # réponse tronquée
+        return texte
+
+    def _reponse(self, prompt):
+        texte = self.repondre(prompt)
+        usage = SimpleNamespace(
+            prompt_token_count=len(prompt) // 4,
+            candidates_token_count=len(texte) // 4,
+        )
+        return SimpleNamespace(text=texte, usage_metadata=usage)
+
+    async def generate_content_async(self, prompt):
+        self._verifier_quota()
+        await asyncio.sleep(self.latence * self.hasard.uniform(0.5, 1.5))
+        return self._reponse(prompt)
+
+    def generate_content(self, prompt):
+        self._verifier_quota()
+        time.sleep(self.latence * self.hasard.uniform(0.5, 1.5))
+        return self._reponse(prompt)
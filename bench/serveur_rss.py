@@ -0,0 +1,113 @@
+"""
+Serveur RSS local, pour tester et mesurer l'ingestion sans toucher au vrai site.
+
+Sert les flux de bench/fixtures/rss/ (/<nom>.xml) ainsi que des flux
+synthétiques (/synthetique/<nom>.xml?n=50), avec ETag et Last-Modified :
+une requête conditionnelle sur un flux inchangé reçoit 304.
+
+    python bench/serveur_rss.py --port 8081 --latence 0.2
+"""
+import argparse
+import hashlib
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+DOSSIER = Path(__file__).resolve().parent / "fixtures" / "rss"
+DEMARRAGE = formatdate(time.time(), usegmt=True)
+
+SUJETS = ["Bitcoin", "Ether", "Solana", "XRP", "BNB", "Dogecoin", "Cardano", "Chainlink", "Toncoin", "Avalanche"]
+
+
+def flux_synthetique(nom, n, debut=0):
+    """Flux RSS de `n` entrées au format Cointelegraph (résumé HTML), stable pour un même nom."""
+    items = []
+    for i in range(debut, debut + n):
+        sujet = SUJETS[(i * 7 + len(nom)) % len(SUJETS)]
+        autre = SUJETS[(i * 3 + 1) % len(SUJETS)]
+        items.append(f"""    <item>
+      <title>{sujet} #{i} : le marché réagit ({nom})</title>
+      <link>https://exemple.test/{nom}/article-{i}</link>
+      <description><![CDATA[<p style="float:right; margin:0 0 10px 15px; width:240px;"><img src="https://exemple.test/{i}.jpg"></p><p>{sujet} progresse de {i % 17}% &amp; entraîne <strong>{autre}</strong> dans son sillage.</p>]]></description>
+    </item>""")
+    return ("<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n<rss version=\"2.0\"><channel>\n"
+            f"    <title>{nom}</title>\n" + "\n".join(items) + "\n</channel></rss>\n").encode("utf-8")
+
+
+class Gestionnaire(BaseHTTPRequestHandler):
+    latence = 0.0
+    compteurs = {"200": 0, "304": 0, "404": 0}
+    verrou = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _contenu(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/synthetique/"):
+            params = parse_qs(url.query)
+            n = int(params.get("n", ["50"])[0])
+            debut = int(params.get("debut", ["0"])[0])
+            return flux_synthetique(Path(url.path).stem, n, debut), DEMARRAGE
+        fichier = DOSSIER / Path(url.path).name
+        if fichier.suffix == ".xml" and fichier.exists():
+            return fichier.read_bytes(), formatdate(fichier.stat().st_mtime, usegmt=True)
+        return None, None
+
+    def _repondre(self, code, corps=b"", entetes=None):
+        with self.verrou:
+            self.compteurs[str(code)] = self.compteurs.get(str(code), 0) + 1
+        self.send_response(code)
+        for nom, valeur in (entetes or {}).items():
+            self.send_header(nom, valeur)
+        self.send_header("Content-Length", str(len(corps)))
+        self.end_headers()
+        if corps and self.command == "GET":
+            self.wfile.write(corps)
+
+    def do_GET(self):
+        if self.latence:
+            time.sleep(self.latence)
+
+        contenu, last_modified = self._contenu()
+        if contenu is None:
+            return self._repondre(404)
+
+        etag = '"' + hashlib.sha1(contenu).hexdigest() + '"'
+        entetes = {"ETag": etag, "Last-Modified": last_modified, "Content-Type": "application/rss+xml"}
+        if self.headers.get("If-None-Match") == etag or (
+            "If-None-Match" not in self.headers and self.headers.get("If-Modified-Since") == last_modified
+        ):
+            return self._repondre(304, entetes=entetes)
+        self._repondre(200, contenu, entetes)
+
+    do_HEAD = do_GET
+
+
+def demarrer(port=0, latence=0.0):
+    """Démarre le serveur dans un thread ; retourne (serveur, url de base)."""
+    Gestionnaire.latence = latence
+    serveur = ThreadingHTTPServer(("127.0.0.1", port), Gestionnaire)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return serveur, f"http://127.0.0.1:{serveur.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latence", type=float, default=0.0, help="Latence ajoutée à chaque réponse (s)")
+    args = parser.parse_args()
+
+    serveur, url = demarrer(args.port, args.latence)
+    print(f"Flux servis sur {url}/cointelegraph.xml et {url}/synthetique/<nom>.xml?n=50")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        serveur.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""
+Suite de benchmarks reproductible, sur un corpus synthétique (bench/corpus.py)
+et sans réseau : serveur RSS local (serveur_rss.py) et faux endpoint Gemini
+(faux_gemini.py).
+
+Scénarios :
+  api        routes de lecture de l'API sous gunicorn (comme start.sh), à
+             plusieurs niveaux de concurrence, avec et sans cache de réponses
+  ingestion  flux RSS récupérés, nettoyés et insérés (puis revus en 304)
+  analyse    analyse_articles.py de bout en bout, par mode d'extraction
+  mcp        latence de chaque outil du serveur MCP, mémorisé ou non
+
+Les résultats sont écrits en JSON (bench/resultats/ par défaut) ; --comparer
+les confronte à un run précédent et sort en erreur si une mesure régresse de
+plus de --seuil :
+    python bench/suite.py --taille 100k
+    python bench/suite.py --taille 100k --scenarios api,mcp --comparer bench/resultats/ancien.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import corpus
+import faux_gemini
+import serveur_rss
+from bench_pool import RACINE, attendre_pret, lancer_gunicorn
+
+SCENARIOS = ["api", "ingestion", "analyse", "mcp"]
+RESULTATS = Path(__file__).resolve().parent / "resultats"
+
+ROUTES_API = [
+    "/leaderboard", "/leaderboard?limit=100", "/leaderboard?window=24h", "/trending?window=7d",
+    "/leaderboard/BTC", "/leaderboard/batch?symbols=BTC,ETH,SOL,DOGE", "/leaderboard/ETH/articles",
+    "/leaderboard/SOL/co-mentions", "/snapshots", "/articles", "/articles/search?q=halving", "/stats",
+]
+# (mode, options de analyse_articles.py)
+MODES_ANALYSE = [
+    ("local", ["--mode", "local"]),
+    ("hybride", ["--mode", "hybrid"]),
+    ("llm", ["--mode", "llm"]),
+    ("llm_lots_10", ["--mode", "llm", "--lot", "10"]),
+]
+
+
+def centiles(durees):
+    """p50 / p99 en ms de durées en secondes."""
+    durees = sorted(durees)
+    return {
+        "p50_ms": round(durees[len(durees) // 2] * 1000, 3),
+        "p99_ms": round(durees[min(len(durees) - 1, int(len(durees) * 0.99))] * 1000, 3),
+    }
+
+
+# --- api ---------------------------------------------------------------------
+
+async def charger_api(base_url, requetes, clients):
+    latences = {route: [] for route in ROUTES_API}
+    erreurs = [0]
+
+    async def client_boucle(client, decalage):
+        for i in range(decalage, requetes, clients):
+            route = ROUTES_API[i % len(ROUTES_API)]
+            debut = time.perf_counter()
+            r = await client.get(route)
+            latences[route].append(time.perf_counter() - debut)
+            erreurs[0] += r.status_code >= 400
+
+    limites = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limites, timeout=60) as client:
+        debut = time.perf_counter()
+        await asyncio.gather(*(client_boucle(client, k) for k in range(clients)))
+        ecoule = time.perf_counter() - debut
+    return {
+        "req_par_s": round(requetes / ecoule, 1),
+        "erreurs": erreurs[0],
+        "routes": {route: centiles(durees) for route, durees in latences.items()},
+    }
+
+
+def scenario_api(dossier, args):
+    resultats = {}
+    for nom, variables in (("avec_cache", {}), ("sans_cache", {"CACHE_TTL": "0"})):
+        proc = lancer_gunicorn(
+            args.port, 8, args.workers,
+            ARTICLES_DB=str(dossier / "articles.db"), LEADERBOARD_DB=str(dossier / "leaderboard.db"),
+            METRIQUES="0", **variables
+        )
+        try:
+            base_url = f"http://127.0.0.1:{args.port}"
+            asyncio.run(attendre_pret(base_url, timeout=120))
+            asyncio.run(charger_api(base_url, len(ROUTES_API) * 4, 4))  # échauffement
+            resultats[nom] = {
+                f"clients_{clients}": asyncio.run(charger_api(base_url, args.requetes, clients))
+                for clients in args.clients
+            }
+        finally:
+            proc.terminate()
+            proc.wait()
+    return resultats
+
+
+# --- ingestion ---------------------------------------------------------------
+
+def scenario_ingestion(dossier, args):
+    import ingestion
+    import migrations
+
+    serveur, url = serveur_rss.demarrer()
+    urls = [f"{url}/synthetique/suite{i}.xml?n={args.entrees}" for i in range(args.flux)]
+    try:
+        with tempfile.TemporaryDirectory() as temporaire:
+            chemin = Path(temporaire) / "articles.db"
+            shutil.copy(dossier / "articles.db", chemin)
+            conn = sqlite3.connect(chemin)
+            migrations.migrer_articles(conn)
+
+            resultats = {}
+            for passage in ("premier_passage", "second_passage"):
+                debut = time.perf_counter()
+                flux = asyncio.run(ingestion.recuperer_flux(urls, ingestion.lire_etats(conn), limite=args.entrees))
+                resume = ingestion.enregistrer(conn, flux)
+                ecoule = time.perf_counter() - debut
+                resultats[passage] = {
+                    "duree_s": round(ecoule, 3),
+                    "entrees": resume["total_fetched"],
+                    "nouveaux": resume["new_articles"],
+                    "flux_inchanges": resume["feeds_unchanged"],
+                }
+            resultats["premier_passage"]["articles_par_s"] = round(
+                resultats["premier_passage"]["nouveaux"] / resultats["premier_passage"]["duree_s"], 1
+            )
+            conn.close()
+    finally:
+        serveur.shutdown()
+    return resultats
+
+
+# --- analyse -----------------------------------------------------------------
+
+def scenario_analyse(dossier, args):
+    import analyse_articles
+    import db
+
+    serveur, url, _ = faux_gemini.demarrer(latence=args.latence_llm)
+    variables = {"GEMINI_API_ENDPOINT": url, "API_KEY": "local"}
+    anciennes = {nom: os.environ.get(nom) for nom in variables}
+    os.environ.update(variables)
+    chemins = db.ARTICLES_DB_PATH, db.LEADERBOARD_DB_PATH
+    resultats = {}
+    try:
+        for nom, options in MODES_ANALYSE:
+            with tempfile.TemporaryDirectory() as temporaire:
+                # chaque mode part d'une copie du corpus (db.*_DB_PATH, lus par analyse_articles.py)
+                for base in ("articles.db", "leaderboard.db"):
+                    shutil.copy(dossier / base, temporaire)
+                db.ARTICLES_DB_PATH = Path(temporaire) / "articles.db"
+                db.LEADERBOARD_DB_PATH = Path(temporaire) / "leaderboard.db"
+                sys.argv = ["analyse_articles.py", "--concurrence", "16", "--rpm", "100000", *options]
+                debut = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    analyse_articles.main()
+                ecoule = time.perf_counter() - debut
+            resultats[nom] = {
+                "duree_s": round(ecoule, 3),
+                "articles_par_s": round(args.a_extraire / ecoule, 1),
+            }
+    finally:
+        db.ARTICLES_DB_PATH, db.LEADERBOARD_DB_PATH = chemins
+        for nom, valeur in anciennes.items():
+            if valeur is None:
+                os.environ.pop(nom, None)
+            else:
+                os.environ[nom] = valeur
+        serveur.shutdown()
+    return resultats
+
+
+# --- mcp ---------------------------------------------------------------------
+
+async def latences_mcp(MCP, appels, repetitions):
+    resultats = {}
+    for nom, arguments in appels:
+        fonction = getattr(MCP, nom).fn
+        await fonction(**arguments)
+        durees = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            await fonction(**arguments)
+            durees.append(time.perf_counter() - debut)
+        resultats[nom] = centiles(durees)
+    return resultats
+
+
+def scenario_mcp(dossier, args):
+    import db
+    db.ARTICLES_DB_PATH = dossier / "articles.db"
+    db.LEADERBOARD_DB_PATH = dossier / "leaderboard.db"
+    import MCP
+    from bench_mcp import APPELS
+
+    resultats = {}
+    for nom, taille_cache in (("memorise", 256), ("sans_cache", 0)):
+        for lecteur in (MCP.articles, MCP.leaderboard):
+            lecteur.taille_cache = taille_cache
+            lecteur._memo.clear()
+        resultats[nom] = asyncio.run(latences_mcp(MCP, APPELS, args.appels_mcp))
+    return resultats
+
+
+# --- résultats ---------------------------------------------------------------
+
+def contexte(args, description):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RACINE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "taille": args.taille,
+        "corpus": description,
+        "options": {cle: valeur for cle, valeur in vars(args).items() if cle not in ("comparer", "sortie")},
+    }
+
+
+def aplatir(resultats, prefixe=""):
+    """{"api.avec_cache.clients_16.req_par_s": 812.4, ...} : les mesures numériques, par chemin."""
+    mesures = {}
+    for cle, valeur in resultats.items():
+        chemin = f"{prefixe}{cle}"
+        if isinstance(valeur, dict):
+            mesures.update(aplatir(valeur, chemin + "."))
+        elif isinstance(valeur, (int, float)) and not isinstance(valeur, bool):
+            mesures[chemin] = valeur
+    return mesures
+
+
+def sens(chemin):
+    """+1 si une valeur plus haute est meilleure (débits), -1 si plus basse (durées), 0 sinon."""
+    if chemin.endswith("_par_s"):
+        return 1
+    if chemin.endswith(("_ms", "_s")):
+        return -1
+    return 0
+
+
+def comparer(ancien, nouveau, seuil, plancher_ms=1.0):
+    """
+    Mesures présentes dans les deux runs : (chemin, ancien, nouveau, variation, régression).
+    Une latence sous `plancher_ms` dans les deux runs n'est jamais une régression :
+    à ce niveau, l'écart d'un run à l'autre est du bruit.
+    """
+    avant, apres = aplatir(ancien["scenarios"]), aplatir(nouveau["scenarios"])
+    lignes = []
+    for chemin in sorted(avant.keys() & apres.keys()):
+        direction = sens(chemin)
+        if not direction or not avant[chemin]:
+            continue
+        variation = (apres[chemin] - avant[chemin]) / avant[chemin]
+        bruit = chemin.endswith("_ms") and max(avant[chemin], apres[chemin]) < plancher_ms
+        lignes.append((chemin, avant[chemin], apres[chemin], variation, not bruit and -direction * variation > seuil))
+    return lignes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--taille", default="100k", help="10k, 100k, 1M ou un nombre d'articles")
+    parser.add_argument("--corpus", type=Path, default=None, help="Dossier du corpus (bench/corpus/<taille>)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Parmi " + ", ".join(SCENARIOS))
+    parser.add_argument("--a-extraire", type=int, default=2000, help="Articles du corpus laissés à analyser")
+    parser.add_argument("--requetes", type=int, default=2000, help="Requêtes par niveau de concurrence (api)")
+    parser.add_argument("--clients", default="1,16,64", help="Niveaux de concurrence (api)")
+    parser.add_argument("--workers", type=int, default=2, help="Workers gunicorn (2 dans start.sh)")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--flux", type=int, default=20, help="Flux RSS (ingestion)")
+    parser.add_argument("--entrees", type=int, default=50, help="Entrées par flux (ingestion)")
+    parser.add_argument("--latence-llm", type=float, default=0.0, help="Latence du faux Gemini (analyse)")
+    parser.add_argument("--appels-mcp", type=int, default=300, help="Appels par outil (mcp)")
+    parser.add_argument("--sortie", type=Path, default=None, help="Fichier JSON des résultats")
+    parser.add_argument("--comparer", type=Path, default=None, help="Résultats d'un run précédent")
+    parser.add_argument("--seuil", type=float, default=0.10, help="Variation tolérée avant de signaler une régression")
+    parser.add_argument("--plancher-ms", type=float, default=1.0, help="Latences ignorées par --comparer en dessous")
+    args = parser.parse_args()
+    args.clients = [int(c) for c in args.clients.split(",")]
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    inconnus = set(scenarios) - set(SCENARIOS)
+    if inconnus:
+        parser.error(f"scénarios inconnus : {', '.join(sorted(inconnus))}")
+
+    n = corpus.taille(args.taille)
+    dossier = args.corpus or corpus.DOSSIER / args.taille
+    debut = time.perf_counter()
+    description = corpus.preparer(dossier, n, a_extraire=args.a_extraire)
+    print(f"Corpus de {n} articles prêt dans {dossier} ({time.perf_counter() - debut:.1f} s)")
+
+    fonctions = {"api": scenario_api, "ingestion": scenario_ingestion, "analyse": scenario_analyse, "mcp": scenario_mcp}
+    resultats = {"contexte": contexte(args, description), "scenarios": {}}
+    for nom in scenarios:
+        debut = time.perf_counter()
+        resultats["scenarios"][nom] = fonctions[nom](dossier, args)
+        print(f"  {nom:<10} {time.perf_counter() - debut:>7.1f} s")
+
+    sortie = args.sortie or RESULTATS / f"{args.taille}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    sortie.parent.mkdir(parents=True, exist_ok=True)
+    sortie.write_text(json.dumps(resultats, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Résultats écrits dans {sortie}")
+
+    for chemin, valeur in aplatir(resultats["scenarios"]).items():
+        if chemin.endswith(("req_par_s", "articles_par_s", "p50_ms")) and ".routes." not in chemin:
+            print(f"  {chemin:<60} {valeur:>12,.1f}")
+
+    if args.comparer:
+        ancien = json.loads(args.comparer.read_text(encoding="utf-8"))
+        lignes = comparer(ancien, resultats, args.seuil, args.plancher_ms)
+        regressions = [ligne for ligne in lignes if ligne[4]]
+        print(f"\nComparaison avec {args.comparer} ({len(lignes)} mesures, seuil {args.seuil:.0%}) :")
+        for chemin, avant, apres, variation, regression in lignes:
+            if regression or (-sens(chemin) * variation < -args.seuil and max(avant, apres) >= args.plancher_ms):
+                print(f"  {'RÉGRESSION' if regression else 'amélioration':<12} {chemin:<60} "
+                      f"{avant:>10,.1f} -> {apres:>10,.1f} ({variation:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print("  aucune régression")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import hashlib
+import json
+
+import agregation
+
+# Les cryptos extraites sont conservées par article dans articles.db, avec
+# l'empreinte du texte analysé, la version du prompt et le modèle utilisés.
+# Une nouvelle analyse ne renvoie au LLM que les articles sans extraction ou
+# dont l'extraction est périmée (texte, prompt ou modèle différent).
+#
+# L'empreinte du texte de chaque article est stockée dans articles.hash_contenu
+# (posée à l'insertion par ingestion.inserer_articles) : trouver les textes
+# modifiés est une comparaison de colonnes, sans rehacher la base. Un article
+# inséré sans empreinte, ou dont le texte a changé (un trigger la remet à
+# NULL), est haché au début de l'analyse suivante, par l'index partiel des
+# empreintes manquantes.
+
+
+def empreinte(texte):
+    return hashlib.sha256((texte or "").encode("utf-8")).hexdigest()
+
+
+def hacher_articles(conn):
+    """Pose l'empreinte des articles qui n'en ont pas, dans la transaction en cours ; retourne leur nombre."""
+    conn.create_function("empreinte", 1, empreinte, deterministic=True)
+    return conn.execute(
+        "UPDATE articles SET hash_contenu = empreinte(contenu_ia) WHERE hash_contenu IS NULL"
+    ).rowcount
+
+
+def _requete_a_extraire(conn, versions_valides, suite=""):
+    with conn:
+        hacher_articles(conn)
+    valeurs = ", ".join("(?, ?)" for _ in versions_valides)
+    return f"""
+        SELECT a.id, a.contenu_ia
+        FROM articles a
+        LEFT JOIN extractions e ON e.article_id = a.id
+        WHERE (e.article_id IS NULL
+           OR (e.modele, e.version_prompt) NOT IN (VALUES {valeurs})
+           OR e.hash_contenu != a.hash_contenu)
+        {suite}
+    """, [valeur for couple in versions_valides for valeur in couple]
+
+
+def articles_a_extraire(conn, versions_valides):
+    """
+    (id, contenu_ia) des articles sans extraction, ou dont l'extraction est périmée.
+
+    `versions_valides` liste les couples (modele, version_prompt) encore
+    acceptés : par exemple les prompts Gemini par article et par lot, pour
+    que passer d'un mode à l'autre ne relance rien.
+    """
+    sql, parametres = _requete_a_extraire(conn, versions_valides, "ORDER BY a.id")
+    return conn.execute(sql, parametres).fetchall()
+
+
+def lots_a_extraire(conn, versions_valides, apres_id=0, taille=500):
+    """
+    Les mêmes articles que articles_a_extraire, d'id > `apres_id`, en lots d'au
+    plus `taille` : une requête par lot, reprise après le dernier id du lot
+    précédent (pagination par clé), sans jamais tout charger en mémoire.
+    """
+    sql, parametres = _requete_a_extraire(conn, versions_valides, "AND a.id > ? ORDER BY a.id LIMIT ?")
+    while True:
+        lot = conn.execute(sql, parametres + [apres_id, taille]).fetchall()
+        if not lot:
+            return
+        yield lot
+        apres_id = lot[-1][0]
+
+
+def enregistrer_extractions(conn, rows, resultats, version_prompt, modele):
+    """
+    Enregistre les coins extraits et met à jour les compteurs, l'index des
+    mentions (article_coins) et les mentions par heure, en une transaction.
+
+    Les articles en échec (résultat à None) seront retentés au prochain run.
+    """
+    nouvelles = [
+        (article_id, empreinte(texte), coins)
+        for (article_id, texte), coins in zip(rows, resultats)
+        if coins is not None
+    ]
+    if not nouvelles:
+        return
+
+    with conn:
+        # extractions remplacées : leurs mentions sont retirées des compteurs
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS ids_maj (id INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM ids_maj")
+        conn.executemany("INSERT INTO ids_maj (id) VALUES (?)", [(article_id,) for article_id, _, _ in nouvelles])
+        anciennes = [
+            (article_id, json.loads(coins))
+            for article_id, coins in conn.execute(
+                "SELECT article_id, coins FROM extractions WHERE article_id IN (SELECT id FROM ids_maj)"
+            )
+        ]
+
+        conn.executemany("""
+            INSERT INTO extractions (article_id, hash_contenu, version_prompt, modele, coins)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (article_id) DO UPDATE SET
+                hash_contenu = excluded.hash_contenu,
+                version_prompt = excluded.version_prompt,
+                modele = excluded.modele,
+                coins = excluded.coins,
+                extrait_le = CURRENT_TIMESTAMP
+        """, [
+            (article_id, hash_contenu, version_prompt, modele, json.dumps(coins, ensure_ascii=False))
+            for article_id, hash_contenu, coins in nouvelles
+        ])
+
+        mentions = [(article_id, coins) for article_id, _, coins in nouvelles]
+        agregation.appliquer_delta(conn, anciennes, mentions)
+        agregation.indexer_mentions(conn, anciennes, mentions)
+        agregation.appliquer_delta_horaire(conn, anciennes, mentions)
+
+
+def fenetre_extractions(conn):
+    """(premier id, dernier id, nombre) des articles couverts par les extractions."""
+    return conn.execute("SELECT MIN(article_id), MAX(article_id), COUNT(*) FROM extractions").fetchone()
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from fastapi.responses import Response
+
+from db import ouvrir_lecture
+
+# Cache des réponses des routes de lecture, par worker.
+# Une entrée garde le JSON déjà sérialisé (pas de validation pydantic ni
+# d'encodage sur un hit) et la version des bases lue avant la requête SQL :
+# dès qu'un écrivain commite (analyse_articles.py, rafraîchissement...), la
+# version change et l'entrée n'est plus servie. Le TTL borne en plus la durée
+# de vie des entrées, l'éviction se fait en LRU.
+
+# Durée de vie d'une entrée en secondes (0 = cache désactivé)
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+# Nombre maximal d'entrées par worker
+CACHE_TAILLE = int(os.getenv("CACHE_TAILLE", "1024"))
+
+
+class VersionDonnees:
+    """
+    Version d'une base SQLite, lue par `PRAGMA data_version` sur une connexion
+    dédiée : la valeur change dès qu'une autre connexion, de n'importe quel
+    process, a commité une écriture.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._conn = None
+        self._pid = None
+        self._verrou = threading.Lock()
+
+    def lire(self):
+        """Version courante, ou None si la base n'existe pas encore."""
+        if not self.db_path.exists():
+            return None
+        with self._verrou:
+            if self._conn is None or self._pid != os.getpid():
+                self._conn = ouvrir_lecture(self.db_path)
+                self._pid = os.getpid()
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+class CacheReponses:
+    """Cache LRU + TTL de réponses JSON pré-sérialisées, invalidé par la version des bases."""
+
+    def __init__(self, taille=CACHE_TAILLE, ttl=CACHE_TTL):
+        self.taille = taille
+        self.ttl = ttl
+        self._entrees = OrderedDict()
+        self._versions = {}
+        self._pid = os.getpid()
+        self._verrou = threading.Lock()
+        self.compteurs = {"hits": 0, "misses": 0, "invalidations": 0, "expirations": 0, "evictions": 0}
+
+    @property
+    def actif(self):
+        return self.taille > 0 and self.ttl > 0
+
+    def versions(self, *db_paths):
+        """Versions des bases dont dépend une réponse, à lire avant la requête SQL."""
+        if not self.actif:
+            return None
+        versions = []
+        for db_path in db_paths:
+            version = self._versions.get(db_path)
+            if version is None:
+                version = self._versions.setdefault(db_path, VersionDonnees(db_path))
+            versions.append(version.lire())
+        return tuple(versions)
+
+    def lire(self, cle, versions):
+        """Réponse en cache pour `cle` si elle a été calculée avec ces versions et n'a pas expiré."""
+        if not self.actif:
+            return None
+        with self._verrou:
+            if self._pid != os.getpid():
+                # après un fork, les versions du parent ne valent rien ici
+                self._entrees.clear()
+                self._pid = os.getpid()
+
+            entree = self._entrees.get(cle)
+            if entree is None:
+                self.compteurs["misses"] += 1
+                return None
+
+            versions_entree, expire, corps, entetes = entree
+            if versions_entree != versions or expire < time.monotonic():
+                del self._entrees[cle]
+                self.compteurs["invalidations" if versions_entree != versions else "expirations"] += 1
+                self.compteurs["misses"] += 1
+                return None
+
+            self._entrees.move_to_end(cle)
+            self.compteurs["hits"] += 1
+        return reponse_json(corps, "HIT", entetes)
+
+    def stocker(self, cle, versions, adaptateur, donnees, entetes=None):
+        """
+        Valide et sérialise `donnees` avec le TypeAdapter du modèle de la route,
+        puis les met en cache avec leurs en-têtes HTTP (ETag, Cache-Control).
+        """
+        corps = adaptateur.dump_json(adaptateur.validate_python(donnees))
+        if self.actif:
+            with self._verrou:
+                self._entrees[cle] = (versions, time.monotonic() + self.ttl, corps, entetes)
+                self._entrees.move_to_end(cle)
+                while len(self._entrees) > self.taille:
+                    self._entrees.popitem(last=False)
+                    self.compteurs["evictions"] += 1
+            return reponse_json(corps, "MISS", entetes)
+        return reponse_json(corps, "BYPASS", entetes)
+
+    def vider(self):
+        with self._verrou:
+            self._entrees.clear()
+
+    def stats(self):
+        with self._verrou:
+            total = self.compteurs["hits"] + self.compteurs["misses"]
+            return {
+                "actif": self.actif,
+                "ttl": self.ttl,
+                "capacite": self.taille,
+                "entrees": len(self._entrees),
+                **self.compteurs,
+                "taux_hits": round(self.compteurs["hits"] / total, 4) if total else None,
+            }
+
+
+def reponse_json(corps, statut_cache, entetes=None):
+    return Response(
+        content=corps,
+        media_type="application/json",
+        headers={**(entetes or {}), "X-Cache": statut_cache}
+    )
+
+
+cache = CacheReponses()
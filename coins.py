@@ -0,0 +1,111 @@
+import threading
+
+from extraction_locale import DICTIONNAIRE
+
+# Référentiel des cryptos : une seule identité par crypto, quel que soit le
+# ticker ou le nom sous lequel une extraction la rapporte (« XBT » et « BTC »,
+# « Ether » et « Ethereum »). Les alias sont ceux du dictionnaire de
+# l'extracteur local, indexés une fois en mémoire : résoudre un coin extrait
+# est une lecture de dict. Un coin hors dictionnaire garde son symbole.
+#
+# Dans leaderboard.db, la table `coins` donne à chaque crypto canonique un id
+# entier : les snapshots ne stockent que (snapshot_id, rank, coin_id, count),
+# et les noms sont joints en mémoire par un Referentiel.
+
+# ticker ou alias en majuscules -> (symbol, nom) ; nom ou alias en minuscules -> (symbol, nom)
+_PAR_TICKER = {}
+_PAR_NOM = {}
+for _symbol, _nom, _alias in DICTIONNAIRE:
+    _PAR_TICKER[_symbol] = (_symbol, _nom)
+    for _terme in [_nom, *_alias]:
+        if _terme.isupper():
+            _PAR_TICKER[_terme] = (_symbol, _nom)
+        else:
+            _PAR_NOM[_terme.lower()] = (_symbol, _nom)
+
+
+def canonique(symbol, name=""):
+    """
+    (symbol, name) canoniques d'un coin : par son ticker, sinon par son nom
+    (« Ether » -> ETH) ; un coin inconnu garde son symbole, en majuscules.
+    """
+    symbol = symbol.upper().strip()
+    name = name.strip()
+    connu = _PAR_TICKER.get(symbol) or _PAR_NOM.get(symbol.lower()) or _PAR_NOM.get(name.lower())
+    return connu if connu is not None else (symbol, name)
+
+
+def semer(conn):
+    """Coins du dictionnaire, dans son ordre : mêmes ids d'une base à l'autre pour les cryptos connues."""
+    conn.executemany(
+        "INSERT OR IGNORE INTO coins (symbol, name) VALUES (?, ?)",
+        [(symbol, nom) for symbol, nom, _ in DICTIONNAIRE]
+    )
+
+
+def interner(conn, coins):
+    """
+    Ids des coins (symbol, name), dans le même ordre, créés au besoin dans la
+    transaction en cours. Le nom d'un coin est celui de sa première apparition.
+    """
+    coins = [canonique(symbol, name) for symbol, name in coins]
+    canoniques = {}
+    for symbol, name in coins:
+        canoniques.setdefault(symbol, name)
+    conn.executemany("INSERT OR IGNORE INTO coins (symbol, name) VALUES (?, ?)", canoniques.items())
+    ids = {}
+    symboles = list(canoniques)
+    for debut in range(0, len(symboles), 500):
+        lot = symboles[debut:debut + 500]
+        ids.update((symbol.upper(), coin_id) for coin_id, symbol in conn.execute(
+            f"SELECT id, symbol FROM coins WHERE symbol IN ({', '.join('?' * len(lot))})", lot
+        ))
+    return [ids[symbol] for symbol, _ in coins]
+
+
+class Referentiel:
+    """
+    Table `coins` d'une base en mémoire : id -> (symbol, name) et
+    symbole -> id. Chargée au premier usage, puis relue seulement quand un id
+    ou un symbole inconnu est demandé et que la table a grandi entre-temps.
+    """
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._par_id = {}
+        self._par_symbole = {}
+        self._max_id = None
+
+    def _recharger(self, conn):
+        with self._verrou:
+            max_id = conn.execute("SELECT MAX(id) FROM coins").fetchone()[0] or 0
+            if max_id == self._max_id:
+                return
+            rows = conn.execute("SELECT id, symbol, name FROM coins").fetchall()
+            # dicts remplacés d'un bloc : les lectures concurrentes restent sans verrou
+            self._par_id = {coin_id: (symbol, name) for coin_id, symbol, name in rows}
+            self._par_symbole = {symbol.upper(): coin_id for coin_id, symbol, _ in rows}
+            self._max_id = max_id
+
+    def coin(self, conn, coin_id):
+        """(symbol, name) du coin `coin_id`."""
+        if coin_id not in self._par_id:
+            self._recharger(conn)
+        return self._par_id[coin_id]
+
+    def coin_id(self, conn, symbol):
+        """Id du coin désigné par un symbole, un alias ou un nom (« xbt », « Ether »), ou None."""
+        symbol = canonique(symbol)[0]
+        if symbol not in self._par_symbole:
+            self._recharger(conn)
+        return self._par_symbole.get(symbol)
+
+
+_referentiels = {}
+_verrou_referentiels = threading.Lock()
+
+
+def referentiel(db_path):
+    """Referentiel partagé de la base `db_path` (un par fichier et par process)."""
+    with _verrou_referentiels:
+        return _referentiels.setdefault(str(db_path), Referentiel())
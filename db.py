@@ -0,0 +1,163 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import metriques
+import migrations
+
+# Configuration des chemins (partagée par l'API, le serveur MCP et les scripts)
+# ARTICLES_DB / LEADERBOARD_DB : autres fichiers (corpus de bench/corpus.py, par exemple)
+SCRIPT_DIR = Path(__file__).parent
+ARTICLES_DB_PATH = Path(os.getenv("ARTICLES_DB", SCRIPT_DIR / "articles.db"))
+LEADERBOARD_DB_PATH = Path(os.getenv("LEADERBOARD_DB", SCRIPT_DIR / "leaderboard.db"))
+
+# Taille du pool par worker (gunicorn lance un process par worker).
+# 0 désactive le pool : une connexion est ouverte puis fermée à chaque requête.
+POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+
+# Pragmas appliqués à chaque connexion en lecture
+PRAGMAS_LECTURE = (
+    "PRAGMA query_only = ON",
+    "PRAGMA mmap_size = 268435456",  # 256 Mo mappés en mémoire
+    "PRAGMA cache_size = -16000",  # ~16 Mo de cache de pages
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class BaseIntrouvable(Exception):
+    """La base SQLite demandée n'existe pas encore."""
+
+
+def ouvrir_lecture(db_path):
+    """Ouvre une connexion en lecture seule (URI mode=ro) avec les pragmas de lecture."""
+    uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, factory=metriques.ConnexionMesuree)
+    for pragma in PRAGMAS_LECTURE:
+        conn.execute(pragma)
+    return conn
+
+
+class Pool:
+    """
+    Pool de connexions en lecture seule vers une base SQLite.
+
+    Les connexions sont créées à la demande (jusqu'à `taille`) puis réutilisées.
+    Le pool est lié au process qui l'a créé : après un fork (workers gunicorn),
+    chaque worker reconstruit le sien.
+    """
+
+    def __init__(self, db_path, taille=POOL_SIZE):
+        self.db_path = Path(db_path)
+        self.taille = taille
+        self.pid = os.getpid()
+        self._libres = queue.LifoQueue()
+        self._toutes = []
+        self._verrou = threading.Lock()
+
+    def _acquerir(self):
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._verrou:
+            if len(self._toutes) < self.taille:
+                conn = ouvrir_lecture(self.db_path)
+                self._toutes.append(conn)
+                return conn
+
+        # pool plein : on attend qu'une connexion soit rendue
+        return self._libres.get()
+
+    @contextmanager
+    def connexion(self):
+        if not self.db_path.exists():
+            raise BaseIntrouvable(f"Base de données introuvable à : {self.db_path}")
+
+        if self.taille == 0:
+            conn = ouvrir_lecture(self.db_path)
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+
+        conn = self._acquerir()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._libres.put(conn)
+
+    def fermer(self):
+        with self._verrou:
+            for conn in self._toutes:
+                conn.close()
+            self._toutes.clear()
+        self._libres = queue.LifoQueue()
+
+
+_pools = {}
+_pools_verrou = threading.Lock()
+
+
+def get_pool(db_path):
+    """Retourne le pool du process courant pour cette base (créé au premier appel)."""
+    cle = (os.getpid(), str(db_path))
+    pool = _pools.get(cle)
+    if pool is None:
+        with _pools_verrou:
+            pool = _pools.get(cle)
+            if pool is None:
+                pool = Pool(db_path)
+                _pools[cle] = pool
+    return pool
+
+
+def migrer_bases():
+    """Met à jour le schéma des bases existantes (migrations)."""
+    for db_path, liste in (
+        (ARTICLES_DB_PATH, migrations.MIGRATIONS_ARTICLES),
+        (LEADERBOARD_DB_PATH, migrations.MIGRATIONS_LEADERBOARD),
+    ):
+        if db_path.exists():
+            migrations.migrer_fichier(db_path, liste)
+
+
+def ouvrir_pools():
+    """Met à jour le schéma des bases existantes (migrations) et crée les pools du worker."""
+    migrer_bases()
+    for db_path in (ARTICLES_DB_PATH, LEADERBOARD_DB_PATH):
+        get_pool(db_path)
+
+
+def fermer_pools():
+    """Ferme toutes les connexions des pools du process courant."""
+    pid = os.getpid()
+    with _pools_verrou:
+        for cle in [cle for cle in _pools if cle[0] == pid]:
+            _pools.pop(cle).fermer()
+
+
+@contextmanager
+def connexion_ecriture(db_path):
+    """Connexion d'écriture courte (hors pool), qui attend si un autre process écrit."""
+    conn = sqlite3.connect(str(db_path), timeout=30, factory=metriques.ConnexionMesuree)
+    # réglage par connexion (le mode WAL, lui, est posé une fois dans le fichier par les migrations)
+    conn.execute("PRAGMA synchronous = NORMAL")
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def connexion_articles():
+    return get_pool(ARTICLES_DB_PATH).connexion()
+
+
+def connexion_leaderboard():
+    return get_pool(LEADERBOARD_DB_PATH).connexion()
@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+import os
+import zlib
+
+# Export en flux des articles et de l'historique des classements, en NDJSON ou
+# en CSV, pour les consommateurs en masse. Les lignes sont lues par lots
+# (fetchmany) sur un curseur SQLite et envoyées au fil de l'eau : la mémoire
+# reste constante quelle que soit la taille de l'export, sans validation
+# pydantic ligne par ligne. Les requêtes suivent un index dans l'ordre de
+# l'export, pour que SQLite n'ait jamais à trier en mémoire.
+
+# Lignes lues puis envoyées à la fois
+TAILLE_LOT = int(os.getenv("EXPORT_TAILLE_LOT", "1000"))
+# Niveau de compression gzip (1 = rapide, 9 = compact)
+NIVEAU_GZIP = int(os.getenv("EXPORT_NIVEAU_GZIP", "6"))
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+# Type d'un export compressé, quel que soit son format
+TYPE_GZIP = "application/gzip"
+
+
+def _conditions(filtres):
+    """Clause WHERE et paramètres des filtres (colonne, opérateur, valeur) renseignés."""
+    presents = [(colonne, operateur, valeur) for colonne, operateur, valeur in filtres if valeur is not None]
+    if not presents:
+        return "", []
+    clause = " AND ".join(f"{colonne} {operateur} ?" for colonne, operateur, _ in presents)
+    return f"WHERE {clause}", [valeur for _, _, valeur in presents]
+
+
+def articles(conn, id_min=None, id_max=None, depuis=None, jusqu_a=None):
+    """
+    Curseur et colonnes de l'export des articles.
+
+    Trié par id, ou par (date_ajout, id) dès qu'un filtre de date est donné
+    (même ordre en pratique : les articles sont ajoutés dans l'ordre des id).
+    """
+    where, params = _conditions([
+        ("id", ">=", id_min), ("id", "<=", id_max),
+        ("date_ajout", ">=", depuis), ("date_ajout", "<", jusqu_a),
+    ])
+    ordre = "date_ajout, id" if depuis is not None or jusqu_a is not None else "id"
+    colonnes = ["id", "titre", "lien", "date_ajout", "contenu_ia"]
+    curseur = conn.execute(
+        f"SELECT {', '.join(colonnes)} FROM articles {where} ORDER BY {ordre}", params
+    )
+    return curseur, colonnes
+
+
+def historique_classement(conn, snapshot_min=None, snapshot_max=None, depuis=None, jusqu_a=None):
+    """Curseur et colonnes de l'export de tous les classements, par snapshot puis rang."""
+    where, params = _conditions([
+        ("c.snapshot_id", ">=", snapshot_min), ("c.snapshot_id", "<=", snapshot_max),
+        ("s.created_at", ">=", depuis), ("s.created_at", "<", jusqu_a),
+    ])
+    colonnes = ["snapshot_id", "created_at", "rank", "symbol", "name", "count"]
+    # dans l'ordre de la clé primaire (snapshot_id, rank) ; snapshots et coins
+    # sont lus par leur clé, une ligne par snapshot et par coin restant en cache
+    curseur = conn.execute(f"""
+        SELECT c.snapshot_id, s.created_at, c.rank, k.symbol, k.name, c.count
+        FROM classement c
+        JOIN snapshots s ON s.id = c.snapshot_id
+        JOIN coins k ON k.id = c.coin_id
+        {where}
+        ORDER BY c.snapshot_id, c.rank
+    """, params)
+    return curseur, colonnes
+
+
+def _lots(curseur, taille_lot):
+    while True:
+        rows = curseur.fetchmany(taille_lot)
+        if not rows:
+            return
+        yield rows
+
+
+def lignes(curseur, colonnes, format, taille_lot=TAILLE_LOT):
+    """Le résultat de `curseur` en morceaux de bytes NDJSON ou CSV, un par lot de lignes."""
+    if format == "csv":
+        tampon = io.StringIO()
+        ecrivain = csv.writer(tampon, lineterminator="\n")
+        ecrivain.writerow(colonnes)
+        for rows in _lots(curseur, taille_lot):
+            ecrivain.writerows(rows)
+            yield tampon.getvalue().encode()
+            tampon.seek(0)
+            tampon.truncate()
+        if tampon.tell():
+            # export vide : l'en-tête seul
+            yield tampon.getvalue().encode()
+    else:
+        encodeur = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+        for rows in _lots(curseur, taille_lot):
+            yield "".join(encodeur.encode(dict(zip(colonnes, row))) + "\n" for row in rows).encode()
+
+
+def compresser(morceaux, niveau=NIVEAU_GZIP):
+    """Compresse un flux de morceaux au format gzip, sans le garder en mémoire."""
+    compresseur = zlib.compressobj(niveau, zlib.DEFLATED, 31)  # 31 : en-tête gzip
+    for morceau in morceaux:
+        compresse = compresseur.compress(morceau)
+        if compresse:
+            yield compresse
+    yield compresseur.flush()
+
+
+def flux(ouvrir, requete, format, gzip=False):
+    """
+    Morceaux à envoyer pour un export du résultat de `requete(conn)` (curseur,
+    colonnes). La connexion est ouverte par `ouvrir()` au premier morceau
+    demandé, dans le générateur : une réponse jamais envoyée n'ouvre rien, et
+    la connexion est fermée à la fin du flux ou quand le client se déconnecte.
+    """
+    conn = ouvrir()
+    try:
+        curseur, colonnes = requete(conn)
+        morceaux = lignes(curseur, colonnes, format)
+        if gzip:
+            morceaux = compresser(morceaux)
+        yield from morceaux
+    finally:
+        conn.close()
@@ -0,0 +1,345 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+import metriques
+from coins import canonique
+
+# Quota Gemini en requêtes par minute (offre gratuite de gemini-2.5-flash-lite : 15 RPM)
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "15"))
+# Nombre d'appels en vol en même temps
+CONCURRENCE = int(os.getenv("GEMINI_CONCURRENCE", "5"))
+
+TENTATIVES_MAX = 6
+BACKOFF_BASE = 1.0  # secondes, doublé à chaque tentative
+BACKOFF_MAX = 60.0
+
+APPELS_LLM = metriques.histogramme(
+    "llm_appel_secondes", "Durée de chaque appel au modèle, par issue (ok, ou code HTTP de l'erreur)", ("issue",)
+)
+ATTENTES_DEBIT = metriques.histogramme(
+    "llm_attente_debit_secondes", "Attente d'un jeton du limiteur de débit avant un appel au modèle"
+)
+REPRISES_LLM = metriques.compteur("llm_reprises_total", "Appels au modèle relancés après une erreur, par code HTTP", ("code",))
+BACKOFF_LLM = metriques.compteur("llm_backoff_secondes_total", "Temps passé en backoff avant de relancer un appel")
+TOKENS_LLM = metriques.compteur("llm_tokens_total", "Tokens consommés d'après usage_metadata (prompt, reponse)", ("sens",))
+
+
+def construire_prompt(texte):
+    return f"""
+    Tu es un expert crypto. Analyse ce texte et extrais les crypto-monnaies mentionnées.
+
+    Règles :
+    1. Ignore les termes génériques.
+    2. Ignore les entreprises sauf token.
+    3. Renvoie une liste vide si rien.
+
+    Format JSON : {{ "coins": [{{"name": "Bitcoin", "symbol": "BTC"}}] }}
+
+    Texte :
+    "{texte}"
+    """
+
+
+def construire_prompt_lot(articles):
+    """Un seul prompt pour plusieurs articles : `articles` est une liste de (id, texte)."""
+    textes = "\n".join(
+        f'<article id="{article_id}">\n{texte}\n</article>' for article_id, texte in articles
+    )
+    return f"""
+    Tu es un expert crypto. Analyse chacun des textes ci-dessous et extrais les crypto-monnaies mentionnées.
+
+    Règles :
+    1. Ignore les termes génériques.
+    2. Ignore les entreprises sauf token.
+    3. Renvoie une liste vide pour un texte sans crypto.
+    4. Réponds pour chaque article, sans en oublier.
+
+    Format JSON, une entrée par id d'article : {{ "12": {{ "coins": [{{"name": "Bitcoin", "symbol": "BTC"}}] }}, "13": {{ "coins": [] }} }}
+
+    Textes :
+{textes}
+    """
+
+
+def par_lots(taille_lot=1, budget_tokens=None):
+    """True si extraire_tous regroupe les articles dans des prompts de lot avec ces options."""
+    return taille_lot > 1 or bool(budget_tokens)
+
+
+def version_prompt(taille_lot=1, budget_tokens=None):
+    """Empreinte du gabarit de prompt utilisé : une extraction faite avec un autre gabarit est périmée."""
+    if par_lots(taille_lot, budget_tokens):
+        gabarit = construire_prompt_lot([(0, "{texte}")])
+    else:
+        gabarit = construire_prompt("{texte}")
+    return hashlib.sha256(gabarit.encode("utf-8")).hexdigest()[:12]
+
+
+def estimer_tokens(texte):
+    # ~4 caractères par token : suffisant pour remplir un lot sans dépasser le budget
+    return len(texte) // 4 + 1
+
+
+def former_lots(articles, taille_lot, budget_tokens=None):
+    """Découpe les (id, texte) en lots d'au plus `taille_lot` articles et `budget_tokens` tokens."""
+    lots, lot, tokens = [], [], 0
+    for article in articles:
+        cout = estimer_tokens(article[1])
+        if lot and (len(lot) >= taille_lot or (budget_tokens and tokens + cout > budget_tokens)):
+            lots.append(lot)
+            lot, tokens = [], 0
+        lot.append(article)
+        tokens += cout
+    if lot:
+        lots.append(lot)
+    return lots
+
+
+class LimiteurDebit:
+    """
+    Seau à jetons asynchrone : `rpm` jetons par minute, au plus `rafale` d'avance.
+
+    Quand l'API répond 429 malgré tout, `penaliser` vide le seau pour que
+    tous les appels en cours ralentissent, pas seulement celui qui a échoué.
+    """
+
+    def __init__(self, rpm, rafale=None):
+        self.debit = rpm / 60.0  # jetons par seconde
+        self.capacite = float(rafale if rafale is not None else max(1, rpm // 4))
+        self.jetons = self.capacite
+        self.dernier = time.monotonic()
+        self._verrou = asyncio.Lock()
+        self.attente_totale = 0.0
+
+    def _remplir(self):
+        maintenant = time.monotonic()
+        self.jetons = min(self.capacite, self.jetons + (maintenant - self.dernier) * self.debit)
+        self.dernier = maintenant
+
+    async def acquerir(self):
+        async with self._verrou:
+            self._remplir()
+            if self.jetons < 1:
+                attente = (1 - self.jetons) / self.debit
+                self.attente_totale += attente
+                await asyncio.sleep(attente)
+                self._remplir()
+            self.jetons -= 1
+
+    def penaliser(self, delai):
+        self._remplir()
+        self.jetons = min(self.jetons, -delai * self.debit)
+
+
+def code_http(exc):
+    """Code HTTP porté par une erreur de l'API (google.api_core expose `.code`)."""
+    code = getattr(exc, "code", None)
+    if callable(code):  # erreurs gRPC : code() renvoie un StatusCode
+        return None
+    return code if isinstance(code, int) else getattr(exc, "status_code", None)
+
+
+def est_reessayable(exc):
+    code = code_http(exc)
+    return code == 429 or (code is not None and 500 <= code < 600)
+
+
+def delai_backoff(tentative):
+    # backoff exponentiel avec gigue, pour ne pas relancer tous les appels ensemble
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** tentative) * random.uniform(0.5, 1.0)
+
+
+def lire_coins(texte_reponse):
+    data = json.loads(texte_reponse)
+    return data.get("coins", [])
+
+
+def lire_lot(texte_reponse, ids):
+    """
+    Coins par id d'article dans la réponse d'un lot.
+
+    Lève ValueError si la réponse est illisible ; les ids absents ou mal formés
+    sont simplement omis (réponse partielle).
+    """
+    data = json.loads(texte_reponse)
+    if not isinstance(data, dict):
+        raise ValueError("Réponse de lot inattendue (objet JSON attendu)")
+
+    resultats = {}
+    for article_id in ids:
+        entree = data.get(str(article_id))
+        if isinstance(entree, dict):
+            entree = entree.get("coins")
+        if isinstance(entree, list) and all(isinstance(c, dict) and "symbol" in c and "name" in c for c in entree):
+            resultats[article_id] = entree
+    return resultats
+
+
+@dataclass
+class Statistiques:
+    """Consommation d'un run d'extraction (tokens d'après usage_metadata)."""
+    appels: int = 0
+    tokens_prompt: int = 0
+    tokens_reponse: int = 0
+    lots_scindes: int = 0
+    duree: float = 0.0
+
+    def compter(self, response):
+        self.appels += 1
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            prompt = getattr(usage, "prompt_token_count", 0) or 0
+            reponse = getattr(usage, "candidates_token_count", 0) or 0
+            self.tokens_prompt += prompt
+            self.tokens_reponse += reponse
+            TOKENS_LLM.ajouter(prompt, "prompt")
+            TOKENS_LLM.ajouter(reponse, "reponse")
+
+    def resume(self, nb_articles):
+        n = max(1, nb_articles)
+        return (
+            f"{self.appels} appels, {(self.tokens_prompt + self.tokens_reponse) / n:.0f} tokens/article "
+            f"({self.tokens_prompt} en entrée, {self.tokens_reponse} en sortie), "
+            f"{self.duree / n * 1000:.0f} ms/article, {self.lots_scindes} lots scindés"
+        )
+
+
+async def appeler_modele(modele, prompt, limiteur, tentatives_max=TENTATIVES_MAX):
+    """Appel asynchrone au modèle, limité par le seau à jetons, avec reprise sur 429/5xx."""
+    for tentative in range(tentatives_max):
+        with ATTENTES_DEBIT.chronometrer():
+            await limiteur.acquerir()
+        debut = time.perf_counter()
+        try:
+            response = await modele.generate_content_async(prompt)
+        except Exception as e:
+            APPELS_LLM.observer(time.perf_counter() - debut, str(code_http(e) or "erreur"))
+            if not est_reessayable(e) or tentative == tentatives_max - 1:
+                raise
+            REPRISES_LLM.ajouter(1, str(code_http(e)))
+            delai = delai_backoff(tentative)
+            if code_http(e) == 429:
+                limiteur.penaliser(delai)
+            BACKOFF_LLM.ajouter(delai)
+            await asyncio.sleep(delai)
+        else:
+            APPELS_LLM.observer(time.perf_counter() - debut, "ok")
+            return response
+
+
+async def extraire_tous(modele, textes, concurrence=CONCURRENCE, rpm=GEMINI_RPM, progression=None,
+                        taille_lot=1, budget_tokens=None, stats=None):
+    """
+    Extrait les cryptos de chaque texte, avec au plus `concurrence` appels en vol.
+
+    Retourne une liste alignée sur `textes` : la liste des coins trouvés,
+    ou None si l'article n'a pas pu être analysé.
+    `progression(i, coins, erreur)` est appelé à chaque article terminé.
+
+    Avec `taille_lot` > 1 (ou un `budget_tokens`), plusieurs articles partagent
+    un même prompt ; un lot dont la réponse est illisible ou incomplète, ou
+    dont l'appel est refusé (4xx), est scindé en deux et relancé, jusqu'à
+    l'article seul. Un lot encore en 429/5xx après les reprises n'est pas
+    scindé : ses articles restent à None.
+    """
+    limiteur = LimiteurDebit(rpm)
+    semaphore = asyncio.Semaphore(concurrence)
+    resultats = [None] * len(textes)
+    stats = stats if stats is not None else Statistiques()
+    debut = time.monotonic()
+
+    async def traiter(i, texte):
+        async with semaphore:
+            try:
+                response = await appeler_modele(modele, construire_prompt(texte), limiteur)
+                stats.compter(response)
+                resultats[i] = lire_coins(response.text)
+                erreur = None
+            except Exception as e:
+                erreur = e
+        if progression:
+            progression(i, resultats[i], erreur)
+
+    async def traiter_lot(lot):
+        if len(lot) == 1:
+            return await traiter(*lot[0])
+
+        async with semaphore:
+            try:
+                response = await appeler_modele(modele, construire_prompt_lot(lot), limiteur)
+                stats.compter(response)
+                trouves = lire_lot(response.text, [i for i, _ in lot])
+            except Exception as e:
+                if est_reessayable(e):
+                    # 429/5xx encore après toutes les reprises : scinder multiplierait
+                    # les appels pendant que l'API freine, le lot est en échec
+                    trouves, erreur = None, e
+                else:
+                    # JSON illisible, ou appel refusé (prompt trop long...) : on scinde
+                    trouves = {}
+
+        if trouves is None:
+            if progression:
+                for i, _ in lot:
+                    progression(i, None, erreur)
+            return
+
+        for i, coins in trouves.items():
+            resultats[i] = coins
+            if progression:
+                progression(i, coins, None)
+
+        manquants = [article for article in lot if article[0] not in trouves]
+        if manquants:
+            stats.lots_scindes += 1
+            moitie = (len(manquants) + 1) // 2
+            await asyncio.gather(*(
+                traiter_lot(partie) for partie in (manquants[:moitie], manquants[moitie:]) if partie
+            ))
+
+    if par_lots(taille_lot, budget_tokens):
+        # les ids des prompts de lot sont les positions dans `textes`
+        lots = former_lots(list(enumerate(textes)), taille_lot if taille_lot > 1 else len(textes), budget_tokens)
+        await asyncio.gather(*(traiter_lot(lot) for lot in lots))
+    else:
+        await asyncio.gather(*(traiter(i, texte) for i, texte in enumerate(textes)))
+
+    stats.duree += time.monotonic() - debut
+    return resultats
+
+
+def agreger(resultats):
+    """Compte les mentions par symbole et construit le classement trié."""
+    crypto_scores = defaultdict(int)
+    crypto_names = {}
+
+    for found_coins in resultats:
+        # score d'itération : une fois par article, sous son symbole canonique
+        vus = set()
+        for coin in found_coins or []:
+            symbol, name = canonique(coin['symbol'], coin['name'])
+            if 2 <= len(symbol) <= 8 and symbol not in vus:
+                vus.add(symbol)
+                crypto_scores[symbol] += 1
+                crypto_names[symbol] = name
+
+    leaderboard = []
+    for symbol, count in crypto_scores.items():
+        leaderboard.append({
+            "name": crypto_names.get(symbol, symbol),
+            "symbol": symbol,
+            "count": count,
+        })
+
+    # Tri et classement
+    leaderboard.sort(key=lambda x: x['count'], reverse=True)
+    for rank, item in enumerate(leaderboard, 1):
+        item['rank'] = rank
+
+    return leaderboard
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import re
+
+# Extracteur local et déterministe : un dictionnaire symbole / nom / alias
+# compilé en une seule regex (trie), appliqué en process sur contenu_ia.
+# Il suit les règles du prompt Gemini : pas de termes génériques (ils ne sont
+# pas dans le dictionnaire), pas d'entreprise sauf si c'est son token qui est
+# cité (« Binance » seul ne donne pas BNB). Quand un texte laisse un doute
+# (alias qui est aussi un mot courant, exchange sans son token, ticker
+# inconnu), l'article est marqué ambigu : en mode hybride, lui seul part au LLM.
+
+# (symbol, nom, alias) — le symbole et le nom sont aussi des alias
+DICTIONNAIRE = [
+    ("BTC", "Bitcoin", ["XBT"]),
+    ("ETH", "Ethereum", ["Ether"]),
+    ("SOL", "Solana", []),
+    ("XRP", "XRP", []),
+    ("BNB", "Binance Coin", []),
+    ("DOGE", "Dogecoin", []),
+    ("ADA", "Cardano", []),
+    ("BCH", "Bitcoin Cash", []),
+    ("TRX", "Tron", ["TRON"]),
+    ("AVAX", "Avalanche", []),
+    ("LINK", "Chainlink", []),
+    ("DOT", "Polkadot", []),
+    ("TON", "Toncoin", []),
+    ("SHIB", "Shiba Inu", []),
+    ("LTC", "Litecoin", []),
+    ("UNI", "Uniswap", []),
+    ("NEAR", "Near Protocol", []),
+    ("APT", "Aptos", []),
+    ("ARB", "Arbitrum", []),
+    ("OP", "Optimism", []),
+    ("SUI", "Sui", []),
+    ("POL", "Polygon", ["MATIC"]),
+    ("USDT", "Tether", []),
+    ("USDC", "USD Coin", []),
+    ("DAI", "Dai", []),
+    ("XLM", "Stellar", []),
+    ("HBAR", "Hedera", []),
+    ("ATOM", "Cosmos", []),
+    ("ETC", "Ethereum Classic", []),
+    ("XMR", "Monero", []),
+    ("ZEC", "Zcash", []),
+    ("FIL", "Filecoin", []),
+    ("ICP", "Internet Computer", []),
+    ("PEPE", "Pepe", []),
+    ("WIF", "dogwifhat", []),
+    ("BONK", "Bonk", []),
+    ("HYPE", "Hyperliquid", []),
+    ("MON", "Monad", []),
+    ("ONDO", "Ondo", []),
+    ("ENA", "Ethena", []),
+    ("TAO", "Bittensor", []),
+    ("RENDER", "Render", ["RNDR"]),
+    ("INJ", "Injective", []),
+    ("SEI", "Sei", []),
+    ("TIA", "Celestia", []),
+    ("KAS", "Kaspa", []),
+    ("ALGO", "Algorand", []),
+    ("AAVE", "Aave", []),
+    ("MKR", "Maker", []),
+    ("LDO", "Lido", []),
+    ("CRV", "Curve", []),
+    ("PENDLE", "Pendle", []),
+    ("JUP", "Jupiter", []),
+    ("PYTH", "Pyth", []),
+    ("WLD", "Worldcoin", []),
+    ("FET", "Fetch.ai", []),
+    ("GRT", "The Graph", []),
+    ("IMX", "Immutable", []),
+    ("STX", "Stacks", []),
+    ("VET", "VeChain", []),
+    ("XTZ", "Tezos", []),
+    ("SAND", "The Sandbox", []),
+    ("MANA", "Decentraland", []),
+    ("FUSE", "Fuse", []),
+    ("BERA", "Berachain", []),
+    ("TRUMP", "Official Trump", []),
+    ("CRO", "Cronos", []),
+    ("OKB", "OKB", []),
+    ("PYUSD", "PayPal USD", []),
+]
+
+# Alias qui sont aussi des mots courants ou des noms d'entreprise/protocole :
+# reconnus, mais l'article est ambigu.
+ALIAS_AMBIGUS = {
+    "Avalanche", "Cosmos", "Curve", "Maker", "Stellar", "Optimism", "Immutable",
+    "Stacks", "Render", "Jupiter", "Sei", "Sui", "Dai", "Lido", "Aave", "Uniswap",
+    "Tether", "Hyperliquid", "Ondo", "Fuse", "Pepe", "Bonk", "Polygon", "Tron",
+    "OP", "NEAR", "TRUMP", "SAND", "MANA",
+}
+
+# Exchanges / entreprises émettrices d'un token : cités sans leur token, ils
+# ne comptent pas (règle 2 du prompt) mais rendent l'article ambigu.
+ENTREPRISES = {
+    "Binance": "BNB", "OKX": "OKB", "Crypto.com": "CRO", "KuCoin": "KCS", "Bitget": "BGB",
+    "Coinbase": None, "Kraken": None, "Bybit": None, "Upbit": None, "Ripple": "XRP",
+}
+
+# Tickers candidats absents du dictionnaire : « MON reward », « token FUSE », « $WIF »
+TICKER_CANDIDAT = re.compile(
+    r"\$([A-Z][A-Z0-9]{1,7})\b"
+    r"|\b([A-Z]{2,6})\s+(?:token|tokens|coin|coins|price|airdrop|rewards?|holders|memecoin)\b"
+    r"|\b(?:token|coin|memecoin)\s+([A-Z]{2,6})\b"
+)
+PAS_UN_TICKER = {"ETF", "ETFS", "SEC", "USD", "CEO", "CFO", "NFT", "NFTS", "IPO", "DAO", "DEX", "CEX",
+                 "AI", "US", "UK", "EU", "FTX", "SPX", "DXY", "RWA", "TVL", "OG", "VC", "HPC"}
+
+MOTS_TOKEN = re.compile(r"\b(?:token|tokens|airdrop|memecoin|altcoin)\b", re.I)
+
+
+def _motif_trie(mots):
+    """Compile une liste de mots en une alternative regex factorisée par préfixes (trie)."""
+    trie = {}
+    for mot in mots:
+        noeud = trie
+        for car in mot:
+            noeud = noeud.setdefault(car, {})
+        noeud[""] = {}
+
+    def motif(noeud):
+        if list(noeud) == [""]:
+            return ""
+        branches = [re.escape(car) + motif(fils) for car, fils in sorted(noeud.items()) if car]
+        resultat = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in noeud:
+            resultat = "(?:" + resultat + ")?"
+        return resultat
+
+    return motif(trie)
+
+
+class ExtracteurLocal:
+    def __init__(self, dictionnaire=DICTIONNAIRE):
+        self.noms = {}  # symbol -> nom affiché
+        self.par_nom = {}  # nom/alias en minuscules -> symbol
+        self.par_ticker = {}  # ticker exact -> symbol
+        for symbol, nom, alias in dictionnaire:
+            self.noms[symbol] = nom
+            self.par_ticker[symbol] = symbol
+            for terme in [nom, *alias]:
+                if terme.isupper():
+                    self.par_ticker[terme] = symbol
+                else:
+                    self.par_nom[terme.lower()] = symbol
+        for entreprise in ENTREPRISES:
+            self.par_nom.setdefault(entreprise.lower(), None)
+
+        # noms insensibles à la casse, tickers sensibles (« SOL » mais pas « sol »)
+        self.regex = re.compile(
+            r"(?<![\w.])(?:(?i:" + _motif_trie(sorted(self.par_nom)) + r")|"
+            + _motif_trie(sorted(self.par_ticker)) + r")(?![\w])"
+        )
+        self.ambigus = {a.lower() for a in ALIAS_AMBIGUS if not a.isupper()} | {a for a in ALIAS_AMBIGUS if a.isupper()}
+        self.entreprises = {e.lower(): token for e, token in ENTREPRISES.items()}
+        self.version = hashlib.sha256(
+            json.dumps([dictionnaire, sorted(ALIAS_AMBIGUS), ENTREPRISES], sort_keys=True).encode("utf-8")
+        ).hexdigest()[:12]
+
+    def analyser(self, texte):
+        """
+        Retourne (coins, ambigu) : les coins au format de la réponse Gemini,
+        dans l'ordre de première mention, et si le texte mérite l'avis du LLM.
+        """
+        symboles = []
+        ambigu = False
+        entreprises = []
+
+        for match in self.regex.finditer(texte or ""):
+            terme = match.group(0)
+            if terme in self.par_ticker:
+                symbol = self.par_ticker[terme]
+                ambigu = ambigu or terme in self.ambigus
+            else:
+                cle = terme.lower()
+                if cle in self.entreprises:
+                    entreprises.append(cle)
+                    continue
+                symbol = self.par_nom[cle]
+                ambigu = ambigu or cle in self.ambigus
+            if symbol not in symboles:
+                symboles.append(symbol)
+
+        # entreprise citée sans son token : ignorée, mais à confirmer
+        if any(self.entreprises[e] not in symboles for e in entreprises):
+            ambigu = True
+
+        # ticker inconnu du dictionnaire, ou vocabulaire « token » sans aucune crypto reconnue
+        for match in TICKER_CANDIDAT.finditer(texte or ""):
+            candidat = next(g for g in match.groups() if g)
+            if candidat not in self.par_ticker and candidat not in PAS_UN_TICKER:
+                ambigu = True
+        if not symboles and MOTS_TOKEN.search(texte or ""):
+            ambigu = True
+
+        return [{"name": self.noms[s], "symbol": s} for s in symboles], ambigu
+
+    def extraire(self, texte):
+        return self.analyser(texte)[0]
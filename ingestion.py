@@ -0,0 +1,223 @@
+import asyncio
+import calendar
+import os
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import feedparser
+import httpx
+
+import cache_extractions
+import metriques
+import nettoyage
+
+# Récupération des flux RSS partagée par recup_sql.py, main.py et l'API.
+# Les flux sont téléchargés en parallèle sur un client HTTP commun ; l'ETag et
+# le Last-Modified de chaque flux sont conservés dans articles.db pour que le
+# serveur réponde 304 quand rien n'a changé (pas de téléchargement ni de parsing).
+
+FLUX_PAR_DEFAUT = [
+    "https://cointelegraph.com/rss",
+    "https://cointelegraph.com/rss/tag/bitcoin",
+    "https://cointelegraph.com/rss/tag/ethereum",
+    "https://cointelegraph.com/rss/tag/altcoin",
+    "https://cointelegraph.com/rss/category/market-analysis",
+]
+
+# Nombre d'entrées retenues par flux (comme feed.entries[:50] auparavant)
+LIMITE_PAR_FLUX = 50
+TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+LIMITES = httpx.Limits(max_connections=10, max_keepalive_connections=10)
+
+# telechargement et parsing par flux ; nettoyage et insertion par lot de flux
+ETAPES = metriques.histogramme("flux_etape_secondes", "Durée des étapes de l'ingestion des flux RSS", ("etape",))
+FLUX = metriques.compteur("flux_recuperes_total", "Flux téléchargés, par statut HTTP (erreur : réseau)", ("statut",))
+
+
+def flux_configures():
+    """Liste des flux à suivre : variable RSS_FEEDS (séparés par des virgules) ou liste par défaut."""
+    valeur = os.getenv("RSS_FEEDS")
+    if not valeur:
+        return list(FLUX_PAR_DEFAUT)
+    return [url.strip() for url in valeur.split(",") if url.strip()]
+
+
+@dataclass
+class ResultatFlux:
+    url: str
+    statut: Optional[int] = None  # 200, 304, ou None en cas d'erreur réseau
+    entrees: List = field(default_factory=list)
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    erreur: Optional[str] = None
+
+    @property
+    def modifie(self):
+        return self.statut == 200
+
+
+def lire_etats(conn):
+    """{url: (etag, last_modified)} des flux déjà récupérés."""
+    return {
+        url: (etag, last_modified)
+        for url, etag, last_modified in conn.execute("SELECT url, etag, last_modified FROM flux_etat")
+    }
+
+
+def enregistrer_etats(conn, resultats):
+    """Mémorise ETag/Last-Modified des flux téléchargés (dans la transaction en cours)."""
+    conn.executemany("""
+        INSERT INTO flux_etat (url, etag, last_modified) VALUES (?, ?, ?)
+        ON CONFLICT (url) DO UPDATE SET
+            etag = excluded.etag,
+            last_modified = excluded.last_modified,
+            derniere_recuperation = CURRENT_TIMESTAMP
+    """, [(r.url, r.etag, r.last_modified) for r in resultats if r.modifie])
+
+
+def parser_flux(contenu):
+    with ETAPES.chronometrer("parsing"):
+        return feedparser.parse(contenu)
+
+
+async def requeter(client, url, etat):
+    """
+    GET (conditionnel si `etat` = (etag, last_modified)) d'un flux, sans le parser :
+    retourne (ResultatFlux sans entrées, contenu), contenu à None hors d'un 200.
+    """
+    resultat = ResultatFlux(url=url)
+    entetes = {}
+    if etat:
+        etag, last_modified = etat
+        if etag:
+            entetes["If-None-Match"] = etag
+        if last_modified:
+            entetes["If-Modified-Since"] = last_modified
+
+    debut = time.perf_counter()
+    try:
+        reponse = await client.get(url, headers=entetes)
+    except httpx.HTTPError as e:
+        FLUX.ajouter(1, "erreur")
+        resultat.erreur = str(e)
+        return resultat, None
+    ETAPES.observer(time.perf_counter() - debut, "telechargement")
+    FLUX.ajouter(1, str(reponse.status_code))
+
+    resultat.statut = reponse.status_code
+    if reponse.status_code == 304:
+        return resultat, None
+    if reponse.status_code != 200:
+        resultat.erreur = f"HTTP {reponse.status_code}"
+        return resultat, None
+
+    resultat.etag = reponse.headers.get("ETag")
+    resultat.last_modified = reponse.headers.get("Last-Modified")
+    return resultat, reponse.content
+
+
+async def _telecharger(client, url, etat, limite):
+    resultat, contenu = await requeter(client, url, etat)
+    if contenu is not None:
+        # parsing hors de la boucle d'événements : les autres flux continuent d'arriver
+        feed = await asyncio.to_thread(parser_flux, contenu)
+        resultat.entrees = feed.entries[:limite]
+    return resultat
+
+
+async def recuperer_flux(urls, etats=None, client=None, limite=LIMITE_PAR_FLUX):
+    """
+    Télécharge les flux en parallèle. Avec `etats` ({url: (etag, last_modified)}),
+    les requêtes sont conditionnelles et un flux inchangé revient en 304, sans entrées.
+    """
+    etats = etats or {}
+    if client is None:
+        async with httpx.AsyncClient(timeout=TIMEOUT, limits=LIMITES, follow_redirects=True) as client:
+            return await recuperer_flux(urls, etats, client, limite)
+
+    return list(await asyncio.gather(*(
+        _telecharger(client, url, etats.get(url), limite) for url in urls
+    )))
+
+
+def date_publication(entry):
+    """
+    Date de publication d'une entrée (UTC, au format de date_ajout), ou None si
+    le flux n'en donne pas ou la place dans le futur.
+    """
+    date = entry.get("published_parsed") or entry.get("updated_parsed")
+    if date is None or calendar.timegm(date) > time.time():
+        return None
+    return time.strftime("%Y-%m-%d %H:%M:%S", date)
+
+
+def entree_vers_article(entry, resume=None):
+    """
+    (titre, lien, contenu_ia, date_publication) d'une entrée de flux : titre +
+    résumé nettoyé de son HTML, et date de publication (None si inconnue).
+
+    `resume` : résumé déjà nettoyé (par nettoyer_lot), sinon nettoyé ici.
+    """
+    if resume is None:
+        resume = nettoyage.nettoyer(entry.get("summary", ""))
+    full_text = f"Titre: {entry.title}\nRésumé: {resume}"
+    return entry.title, entry.link, full_text, date_publication(entry)
+
+
+def entrees_vers_articles(entrees):
+    """entree_vers_article sur toute une liste, le nettoyage HTML étant fait en lot."""
+    with ETAPES.chronometrer("nettoyage"):
+        resumes = nettoyage.nettoyer_lot(entry.get("summary", "") for entry in entrees)
+    return [entree_vers_article(entry, resume) for entry, resume in zip(entrees, resumes)]
+
+
+def _ligne_article(titre, lien, contenu, date_publication=None):
+    return titre, lien, contenu, cache_extractions.empreinte(contenu), date_publication
+
+
+def inserer_articles(conn, articles):
+    """
+    Insère en bloc les (titre, lien, contenu_ia[, date_publication]), avec
+    l'empreinte de leur texte ; retourne (nouveaux, déjà présents).
+
+    Un seul executemany en INSERT OR IGNORE : les doublons (déjà en base, ou
+    présents dans plusieurs flux) sont écartés par l'index unique de `lien`
+    sans lever d'exception. rowcount ne compte que les lignes réellement
+    insérées par cet executemany (pas celles des triggers de l'index plein
+    texte), donc le décompte reste exact même si un autre process insère les
+    mêmes liens entre-temps.
+    """
+    count_new = conn.executemany(
+        "INSERT OR IGNORE INTO articles (titre, lien, contenu_ia, hash_contenu, date_publication) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [_ligne_article(*article) for article in articles]
+    ).rowcount
+    return count_new, len(articles) - count_new
+
+
+def enregistrer(conn, resultats):
+    """
+    Nettoie et insère les entrées récupérées, et mémorise l'état des flux, en une transaction.
+
+    Retourne un résumé : entrées récupérées, nouveaux articles, doublons, flux inchangés.
+    """
+    articles = entrees_vers_articles([entry for r in resultats for entry in r.entrees])
+    with ETAPES.chronometrer("insertion"), conn:
+        count_new, count_existing = inserer_articles(conn, articles)
+        enregistrer_etats(conn, resultats)
+
+    return {
+        "total_fetched": len(articles),
+        "new_articles": count_new,
+        "existing_articles": count_existing,
+        "feeds_unchanged": sum(r.statut == 304 for r in resultats),
+        "feeds_failed": [r.url for r in resultats if r.erreur],
+    }
+
+
+def rafraichir(conn, urls=None, limite=LIMITE_PAR_FLUX):
+    """Récupère les flux configurés (requêtes conditionnelles) et insère les nouveaux articles."""
+    urls = urls or flux_configures()
+    resultats = asyncio.run(recuperer_flux(urls, lire_etats(conn), limite=limite))
+    return enregistrer(conn, resultats)
@@ -1,55 +1,49 @@
-import sqlite3
-
 #recupération des articles
-import feedparser
+import asyncio
 import json
-import ssl
-from bs4 import BeautifulSoup
-
-
-#connexion a la bdd
-conn = sqlite3.connect("articles.db")
-cursor = conn.cursor()
 
-# --- correction erreur SSL ---
-if hasattr(ssl, '_create_unverified_context'):
-    ssl._create_default_https_context = ssl._create_unverified_context
+import ingestion
+import pipeline
 
-rss_url = "https://cointelegraph.com/rss"
-feed = feedparser.parse(rss_url)
+# Les articles sont écrits au fil de l'eau, un objet JSON par ligne (NDJSON) :
+# ni la liste complète en mémoire, ni un fichier à recharger d'un bloc ensuite
+FICHIER_ARTICLES = "articles_clean.ndjson"
 
-articles = []
 
-print(f"Récupération de {len(feed.entries)} articles...")
-
-for entry in feed.entries[:50]:
-    # 1. On récupère le contenu brut
-    raw_summary = entry.summary
+async def exporter(chemin):
+    """
+    Tous les flux configurés, téléchargés en parallèle (sans requête conditionnelle :
+    on veut le contenu complet pour reconstruire le fichier), écrits article par article.
+    Retourne (nombre d'articles, premier article).
+    """
+    nb, exemple = 0, None
+    pages = pipeline.parser(pipeline.telecharger(ingestion.flux_configures()), ingestion.LIMITE_PAR_FLUX)
+    # un même article peut apparaître dans plusieurs flux
+    pages = pipeline.dedoublonner(pipeline.nettoyer(pages))
+    with open(chemin, "w", encoding="utf-8") as f:
+        async for _, articles in pages:
+            # Titre + Résumé nettoyé du HTML
+            for _, lien, full_text, _ in articles:
+                article = {"text_for_ai": full_text, "original_link": lien}
+                f.write(json.dumps(article, ensure_ascii=False) + "\n")
+                nb += 1
+                exemple = exemple or article
+    return nb, exemple
 
-    # 2. On nettoie
-    soup = BeautifulSoup(raw_summary, "html.parser")
-    clean_summary = soup.get_text(separator=" ").strip()
 
-    # 3. On construit le texte pour l'IA (Titre + Résumé propre)
-    full_text = f"Titre: {entry.title}\nRésumé: {clean_summary}"
+nb_articles, exemple = asyncio.run(exporter(FICHIER_ARTICLES))
 
-    articles.append({
-        "text_for_ai": full_text,
-        "original_link": entry.link
-    })
+print(f"Récupération de {nb_articles} articles...")
 
 # Exemple de résultat propre
-print("-" * 40)
-print("EXEMPLE DE TEXTE NETTOYÉ POUR L'IA :")
-print(articles[0]['text_for_ai'])
-print("-" * 40)
-
-# Sauvegarde
-with open("articles_clean.json", "w", encoding="utf-8") as f:
-    json.dump(articles, f, ensure_ascii=False, indent=2)
+if exemple:
+    print("-" * 40)
+    print("EXEMPLE DE TEXTE NETTOYÉ POUR L'IA :")
+    print(exemple['text_for_ai'])
+    print("-" * 40)
 
 
-# on va demander a l'ia de recup les articles_clean.json et des les parses pour
+# on va demander a l'ia de recup les articles_clean.ndjson et des les parses pour
 # extraire les crypto-monnaies mentionnées dans ce texte. Pour chaque
 # crypto, donne-moi son nom complet et son symbole boursier (Ticker)
 # standard (ex: BTC, ETH). Retourne un JSON avec un classement des crypto qui sont sorti le plus de fois et faire un leaderboard.
@@ -58,7 +52,6 @@ with open("articles_clean.json", "w", encoding="utf-8") as f:
 
 from dotenv import load_dotenv
 import os
-import json
 import google.generativeai as genai
 from collections import defaultdict
 import time
@@ -77,18 +70,22 @@ model = genai.GenerativeModel(
     generation_config={"response_mime_type": "application/json"}
 )
 
-try:
-    with open("articles_clean.json", "r", encoding="utf-8") as f:
-        articles = json.load(f)
-except FileNotFoundError:
-    articles = []
+def lire_articles(chemin):
+    """Articles du fichier NDJSON, lus ligne par ligne."""
+    try:
+        with open(chemin, "r", encoding="utf-8") as f:
+            for ligne in f:
+                if ligne.strip():
+                    yield json.loads(ligne)
+    except FileNotFoundError:
+        return
 
 crypto_scores = defaultdict(int)
 crypto_names = {}
 
 # --- prompt + requete API ---
-for i, article in enumerate(articles):
-    print(f"Traitement article {i + 1}/{len(articles)}...")
+for i, article in enumerate(lire_articles(FICHIER_ARTICLES)):
+    print(f"Traitement article {i + 1}/{nb_articles}...")
 
     # Prompt adapté pour Gemini
     prompt = f"""
@@ -0,0 +1,253 @@
+import bisect
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Métriques du process, au format texte de Prometheus (/metrics de l'API) ou
+# en JSON à la fin d'un script (METRIQUES_JSON=fichier). Sans dépendance :
+# des compteurs et des histogrammes à buckets fixes, un verrou par métrique ;
+# une observation coûte environ une microseconde (bench/bench_metriques.py).
+#
+# Chaque process a ses métriques : avec plusieurs workers gunicorn, /metrics
+# répond pour le worker qui traite la requête, comme /cache.
+
+# METRIQUES=0 désactive toute la collecte (les appels deviennent des no-op)
+ACTIVES = os.getenv("METRIQUES", "1") != "0"
+
+# Bornes des buckets, en secondes : de la requête SQL en cache au lot LLM
+BUCKETS_SECONDES = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Compteur:
+    type = "counter"
+
+    def __init__(self, nom, aide, labels=()):
+        self.nom = nom
+        self.aide = aide
+        self.labels = labels
+        self._valeurs = {}
+        self._verrou = threading.Lock()
+
+    def ajouter(self, valeur=1, *labels):
+        if not ACTIVES:
+            return
+        with self._verrou:
+            self._valeurs[labels] = self._valeurs.get(labels, 0) + valeur
+
+    def series(self):
+        with self._verrou:
+            return [(labels, valeur) for labels, valeur in self._valeurs.items()]
+
+
+class Histogramme:
+    type = "histogram"
+
+    def __init__(self, nom, aide, labels=(), buckets=BUCKETS_SECONDES):
+        self.nom = nom
+        self.aide = aide
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [compte par bucket (+Inf en dernier), somme]
+        self._verrou = threading.Lock()
+
+    def observer(self, valeur, *labels):
+        if not ACTIVES:
+            return
+        i = bisect.bisect_left(self.buckets, valeur)
+        with self._verrou:
+            serie = self._series.get(labels)
+            if serie is None:
+                serie = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][i] += 1
+            serie[1] += valeur
+
+    @contextmanager
+    def chronometrer(self, *labels):
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observer(time.perf_counter() - debut, *labels)
+
+    def series(self):
+        with self._verrou:
+            return [(labels, list(comptes), somme) for labels, (comptes, somme) in self._series.items()]
+
+
+_registre = {}
+_verrou_registre = threading.Lock()
+
+
+def _enregistrer(metrique):
+    with _verrou_registre:
+        return _registre.setdefault(metrique.nom, metrique)
+
+
+def compteur(nom, aide, labels=()):
+    """Compteur `nom` du registre (créé au premier appel, partagé ensuite)."""
+    return _enregistrer(Compteur(nom, aide, labels))
+
+
+def histogramme(nom, aide, labels=(), buckets=BUCKETS_SECONDES):
+    """Histogramme `nom` du registre (créé au premier appel, partagé ensuite)."""
+    return _enregistrer(Histogramme(nom, aide, labels, buckets))
+
+
+def _echapper(valeur):
+    return str(valeur).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(noms, valeurs, extra=None):
+    paires = [f'{nom}="{_echapper(valeur)}"' for nom, valeur in zip(noms, valeurs)]
+    if extra is not None:
+        paires.append(extra)
+    return "{" + ",".join(paires) + "}" if paires else ""
+
+
+def exposition():
+    """Toutes les métriques au format texte de Prometheus (version 0.0.4)."""
+    with _verrou_registre:
+        metriques = sorted(_registre.values(), key=lambda m: m.nom)
+    lignes = []
+    for m in metriques:
+        lignes.append(f"# HELP {m.nom} {m.aide}")
+        lignes.append(f"# TYPE {m.nom} {m.type}")
+        if m.type == "counter":
+            for labels, valeur in m.series():
+                lignes.append(f"{m.nom}{_labels(m.labels, labels)} {valeur}")
+            continue
+        for labels, comptes, somme in m.series():
+            cumul = 0
+            for borne, compte in zip((*m.buckets, "+Inf"), comptes):
+                cumul += compte
+                le = f'le="{borne}"'
+                lignes.append(f"{m.nom}_bucket{_labels(m.labels, labels, le)} {cumul}")
+            lignes.append(f"{m.nom}_sum{_labels(m.labels, labels)} {somme}")
+            lignes.append(f"{m.nom}_count{_labels(m.labels, labels)} {cumul}")
+    return "\n".join(lignes) + "\n"
+
+
+def instantane():
+    """Les mêmes métriques en dict sérialisable : compte, somme et buckets de chaque série."""
+    with _verrou_registre:
+        metriques = sorted(_registre.values(), key=lambda m: m.nom)
+    resultat = {}
+    for m in metriques:
+        if m.type == "counter":
+            series = [{"labels": dict(zip(m.labels, labels)), "valeur": valeur} for labels, valeur in m.series()]
+        else:
+            series = [
+                {"labels": dict(zip(m.labels, labels)), "count": sum(comptes), "sum": somme,
+                 "buckets": dict(zip(map(str, (*m.buckets, "+Inf")), comptes))}
+                for labels, comptes, somme in m.series()
+            ]
+        resultat[m.nom] = {"type": m.type, "aide": m.aide, "series": series}
+    return resultat
+
+
+def ecrire_json(chemin=None):
+    """Écrit instantane() dans `chemin`, ou dans METRIQUES_JSON ; ne fait rien si aucun n'est donné."""
+    chemin = chemin or os.getenv("METRIQUES_JSON")
+    if not chemin:
+        return None
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump(instantane(), f, ensure_ascii=False, indent=2)
+    return chemin
+
+
+# --- SQLite : durée de chaque execute, par instruction -----------------------
+
+REQUETES_SQL = histogramme(
+    "sqlite_requete_secondes", "Durée des execute SQLite, par instruction (fichier:fonction:ligne)",
+    ("requete",)
+)
+
+# (code, instruction) de l'appelant -> label : f_lineno coûte plus cher que la
+# mesure elle-même, il n'est lu qu'une fois par endroit du code
+_libelles = {}
+
+_execute = sqlite3.Connection.execute
+_executemany = sqlite3.Connection.executemany
+
+
+def _libelle(frame):
+    cle = (frame.f_code, frame.f_lasti)
+    libelle = _libelles.get(cle)
+    if libelle is None:
+        fichier = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+        libelle = _libelles[cle] = f"{fichier}:{frame.f_code.co_name}:{frame.f_lineno}"
+    return libelle
+
+
+class ConnexionMesuree(sqlite3.Connection):
+    """
+    Connexion sqlite3 (factory de sqlite3.connect) qui chronomètre execute et
+    executemany. L'instruction est désignée par l'endroit du code qui l'exécute
+    (« snapshots:classement_snapshot:71 ») : nombre de séries borné, même
+    avec des requêtes construites dynamiquement (IN (?, ?, ...)).
+    La durée est celle de l'execute (préparation et première ligne), pas
+    celle des fetch qui suivent.
+    """
+
+    def execute(self, sql, parametres=()):
+        if not ACTIVES:
+            return _execute(self, sql, parametres)
+        debut = time.perf_counter()
+        try:
+            return _execute(self, sql, parametres)
+        finally:
+            REQUETES_SQL.observer(time.perf_counter() - debut, _libelle(sys._getframe(1)))
+
+    def executemany(self, sql, parametres):
+        if not ACTIVES:
+            return _executemany(self, sql, parametres)
+        debut = time.perf_counter()
+        try:
+            return _executemany(self, sql, parametres)
+        finally:
+            REQUETES_SQL.observer(time.perf_counter() - debut, _libelle(sys._getframe(1)))
+
+
+# --- API : latence par route --------------------------------------------------
+
+REQUETES_HTTP = histogramme(
+    "http_requete_secondes", "Durée des requêtes HTTP, par route, méthode et statut",
+    ("route", "methode", "statut")
+)
+
+
+class MiddlewareMetriques:
+    """
+    Middleware ASGI (sans BaseHTTPMiddleware, qui coûterait plus que la mesure) :
+    durée de chaque requête jusqu'au dernier octet envoyé, étiquetée par le
+    chemin déclaré de la route (/leaderboard/{symbol}, pas /leaderboard/BTC).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ACTIVES:
+            return await self.app(scope, receive, send)
+
+        statut = [500]
+
+        async def envoyer(message):
+            if message["type"] == "http.response.start":
+                statut[0] = message["status"]
+            await send(message)
+
+        debut = time.perf_counter()
+        try:
+            await self.app(scope, receive, envoyer)
+        finally:
+            route = scope.get("route")
+            REQUETES_HTTP.observer(
+                time.perf_counter() - debut,
+                route.path if route is not None else "(aucune)", scope["method"], statut[0]
+            )
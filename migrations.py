@@ -0,0 +1,361 @@
+import sqlite3
+
+import agregation
+import cache_extractions
+import coins
+
+# Schéma des deux bases, versionné par PRAGMA user_version.
+#
+# Chaque migration (version, description, étapes) est appliquée une seule
+# fois, dans sa propre transaction, avec la nouvelle user_version. Les bases
+# créées avant ce module (start.sh, setup.sh, anciens preparer_schema) sont en
+# version 0 : la version 1 les ramène toutes au même schéma, quelle que soit
+# la copie du DDL qui les a créées.
+#
+# Pour faire évoluer le schéma : ajouter une migration en fin de liste, ne
+# jamais modifier une migration déjà publiée.
+
+
+def _ajouter_colonne(table, colonne, definition):
+    def etape(conn):
+        colonnes = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if colonne not in colonnes:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {colonne} {definition}")
+    return etape
+
+
+def _recompter_si_vide(conn):
+    if conn.execute("SELECT 1 FROM compteurs_cryptos LIMIT 1").fetchone() is None:
+        agregation.recompter(conn)
+
+
+def _recompter_tout(conn):
+    agregation.recompter(conn)
+    agregation.reindexer_mentions(conn)
+    agregation.recompter_horaires(conn)
+
+
+def _dater_articles_sans_date(conn):
+    """
+    Date d'ajout des articles qui n'en ont pas (insérés avant que la colonne ait
+    une valeur par défaut) : celle de l'article daté qui les précède, sinon du
+    premier article daté. NULL cassait le curseur de /articles sur (date_ajout, id).
+    """
+    modifies = conn.execute("""
+        UPDATE articles SET date_ajout = COALESCE(
+            (SELECT p.date_ajout FROM articles p
+             WHERE p.id < articles.id AND p.date_ajout IS NOT NULL
+             ORDER BY p.id DESC LIMIT 1),
+            (SELECT MIN(date_ajout) FROM articles),
+            CURRENT_TIMESTAMP
+        )
+        WHERE date_ajout IS NULL
+    """).rowcount
+    if modifies:
+        # ces articles n'avaient pas d'heure dans mentions_horaires
+        agregation.recompter_horaires(conn)
+
+
+def _classement_par_coin(conn):
+    """
+    Recopie `classement` avec un coin_id à la place de symbol, name et
+    created_at (ce dernier est celui du snapshot). Les rangs en double des très
+    anciens classements (deux exécutions dans la même seconde) sont renumérotés.
+    """
+    conn.execute("""CREATE TABLE classement_coins (
+        snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+        rank INTEGER NOT NULL,
+        coin_id INTEGER NOT NULL REFERENCES coins(id),
+        count INTEGER NOT NULL,
+        PRIMARY KEY (snapshot_id, rank)
+    ) WITHOUT ROWID""")
+    rows = conn.execute("""
+        SELECT snapshot_id, ROW_NUMBER() OVER (PARTITION BY snapshot_id ORDER BY rank, id),
+               symbol, COALESCE(name, ''), count
+        FROM classement
+        WHERE snapshot_id IS NOT NULL AND symbol IS NOT NULL
+        ORDER BY id
+    """).fetchall()
+    ids = coins.interner(conn, [(symbol, name) for _, _, symbol, name, _ in rows])
+    conn.executemany(
+        "INSERT INTO classement_coins (snapshot_id, rank, coin_id, count) VALUES (?, ?, ?, ?)",
+        [(row[0], row[1], coin_id, row[4] or 0) for row, coin_id in zip(rows, ids)]
+    )
+    conn.execute("DROP TABLE classement")
+    conn.execute("ALTER TABLE classement_coins RENAME TO classement")
+
+
+def _rattacher_anciens_classements(conn):
+    """Anciennes lignes de `classement` (table append-only) : un snapshot par exécution, repérée par created_at."""
+    legacy = conn.execute("""
+        SELECT created_at FROM classement
+        WHERE snapshot_id IS NULL
+        GROUP BY created_at
+        ORDER BY created_at
+    """).fetchall()
+    for (created_at,) in legacy:
+        snapshot_id = conn.execute(
+            "INSERT INTO snapshots (created_at) VALUES (?)", (created_at,)
+        ).lastrowid
+        conn.execute(
+            "UPDATE classement SET snapshot_id = ? WHERE snapshot_id IS NULL AND created_at IS ?",
+            (snapshot_id, created_at)
+        )
+    if legacy:
+        conn.execute(
+            "INSERT OR REPLACE INTO snapshot_courant (id, snapshot_id) SELECT 1, MAX(id) FROM snapshots"
+        )
+
+
+MIGRATIONS_ARTICLES = [
+    (1, "articles, état des flux, jobs, extractions et compteurs", [
+        """CREATE TABLE IF NOT EXISTS articles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            titre TEXT NOT NULL,
+            lien TEXT UNIQUE NOT NULL,
+            contenu_ia TEXT,
+            date_ajout TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        # les bases créées par start.sh / setup.sh n'avaient pas cette colonne
+        _ajouter_colonne("articles", "contenu_ia", "TEXT"),
+        """CREATE TABLE IF NOT EXISTS flux_etat (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            derniere_recuperation TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            type TEXT NOT NULL,
+            statut TEXT NOT NULL,
+            cree_le TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            debut TIMESTAMP,
+            fin TIMESTAMP,
+            resultat TEXT,
+            erreur TEXT
+        )""",
+        # un seul job actif par type, quel que soit le worker qui l'a lancé
+        """CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_un_actif_par_type
+            ON jobs (type) WHERE statut IN ('en_attente', 'en_cours')""",
+        """CREATE TABLE IF NOT EXISTS extractions (
+            article_id INTEGER PRIMARY KEY REFERENCES articles(id) ON DELETE CASCADE,
+            hash_contenu TEXT NOT NULL,
+            version_prompt TEXT NOT NULL,
+            modele TEXT NOT NULL,
+            coins TEXT NOT NULL,
+            extrait_le TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS compteurs_cryptos (
+            symbol TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            premiere_mention INTEGER NOT NULL
+        )""",
+        _recompter_si_vide,
+    ]),
+    (2, "index de tri et de pagination de /articles", [
+        "CREATE INDEX IF NOT EXISTS idx_articles_date_ajout ON articles (date_ajout, id)",
+    ]),
+    (3, "recherche plein texte (FTS5) sur le titre et le contenu", [
+        # table externe : l'index ne recopie pas les textes, il pointe sur articles.id
+        """CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+            titre, contenu_ia,
+            content='articles', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )""",
+        # bm25 par défaut de la colonne rank : un mot du titre pèse plus que dans le résumé
+        "INSERT INTO articles_fts (articles_fts, rank) VALUES ('rank', 'bm25(4.0, 1.0)')",
+        """CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts (rowid, titre, contenu_ia) VALUES (new.id, new.titre, new.contenu_ia);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, titre, contenu_ia)
+            VALUES ('delete', old.id, old.titre, old.contenu_ia);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF titre, contenu_ia ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, titre, contenu_ia)
+            VALUES ('delete', old.id, old.titre, old.contenu_ia);
+            INSERT INTO articles_fts (rowid, titre, contenu_ia) VALUES (new.id, new.titre, new.contenu_ia);
+        END""",
+        # indexe les articles déjà en base
+        "INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')",
+    ]),
+    (4, "index des mentions : quels articles citent quels coins", [
+        """CREATE TABLE IF NOT EXISTS article_coins (
+            article_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE,
+            symbol TEXT NOT NULL,
+            PRIMARY KEY (article_id, symbol)
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS idx_article_coins_symbol ON article_coins (symbol, article_id)",
+        agregation.reindexer_mentions,
+    ]),
+    (5, "mentions par heure et par symbole (classements par fenêtre, tendances)", [
+        """CREATE TABLE IF NOT EXISTS mentions_horaires (
+            heure INTEGER NOT NULL,
+            symbol TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (heure, symbol)
+        ) WITHOUT ROWID""",
+        agregation.recompter_horaires,
+    ]),
+    (6, "symboles canoniques : alias fusionnés (XBT -> BTC, Ether -> ETH)", [
+        _recompter_tout,
+    ]),
+    (7, "points de reprise des traitements en flux (pipeline.py), par id d'article", [
+        """CREATE TABLE IF NOT EXISTS reprises (
+            nom TEXT PRIMARY KEY,
+            article_id INTEGER NOT NULL,
+            mis_a_jour TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+    ]),
+    (8, "empreinte du texte stockée sur l'article (plus de hachage de toute la base à chaque analyse)", [
+        _ajouter_colonne("articles", "hash_contenu", "TEXT"),
+        # articles à (re)hacher : insérés sans empreinte, ou texte modifié depuis
+        "CREATE INDEX IF NOT EXISTS idx_articles_sans_empreinte ON articles (id) WHERE hash_contenu IS NULL",
+        """CREATE TRIGGER IF NOT EXISTS articles_empreinte_update AFTER UPDATE OF contenu_ia ON articles
+        WHEN new.contenu_ia IS NOT old.contenu_ia AND new.hash_contenu IS old.hash_contenu BEGIN
+            UPDATE articles SET hash_contenu = NULL WHERE id = new.id;
+        END""",
+        cache_extractions.hacher_articles,
+    ]),
+    (9, "date de publication des articles (mentions par heure de publication)", [
+        # NULL pour les articles déjà en base et les entrées sans date : date_ajout fait foi
+        _ajouter_colonne("articles", "date_publication", "TIMESTAMP"),
+    ]),
+    (10, "flux déjà traités par un traitement en flux (backfill.py --reprendre), à part de flux_etat", [
+        """CREATE TABLE IF NOT EXISTS reprises_flux (
+            nom TEXT NOT NULL,
+            url TEXT NOT NULL,
+            traite_le TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (nom, url)
+        ) WITHOUT ROWID""",
+    ]),
+    (11, "date d'ajout des articles qui n'en avaient pas (curseur de /articles)", [
+        _dater_articles_sans_date,
+    ]),
+]
+
+MIGRATIONS_LEADERBOARD = [
+    (1, "classement et snapshots", [
+        """CREATE TABLE IF NOT EXISTS classement (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            rank INTEGER,
+            symbol TEXT,
+            name TEXT,
+            count INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            premier_article_id INTEGER,
+            dernier_article_id INTEGER,
+            nb_articles INTEGER
+        )""",
+        """CREATE TABLE IF NOT EXISTS snapshot_courant (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            snapshot_id INTEGER NOT NULL REFERENCES snapshots(id)
+        )""",
+        _ajouter_colonne("classement", "snapshot_id", "INTEGER REFERENCES snapshots(id)"),
+        _rattacher_anciens_classements,
+        # index couvrants : le classement d'un snapshot se lit sans toucher la table
+        """CREATE INDEX IF NOT EXISTS idx_classement_snapshot_rank
+            ON classement (snapshot_id, rank, name, symbol, count, created_at)""",
+        """CREATE INDEX IF NOT EXISTS idx_classement_snapshot_symbol
+            ON classement (snapshot_id, symbol COLLATE NOCASE, rank, name, count, created_at)""",
+    ]),
+    (2, "historique d'une crypto à travers les snapshots", [
+        "CREATE INDEX IF NOT EXISTS idx_classement_symbol ON classement (symbol COLLATE NOCASE, created_at)",
+    ]),
+    (3, "référentiel des coins : classements stockés par coin_id", [
+        """CREATE TABLE IF NOT EXISTS coins (
+            id INTEGER PRIMARY KEY,
+            symbol TEXT NOT NULL UNIQUE COLLATE NOCASE,
+            name TEXT NOT NULL
+        )""",
+        coins.semer,
+        _classement_par_coin,
+        # le snapshot d'un coin et son historique, couvrants (rank est dans la clé primaire)
+        "CREATE INDEX IF NOT EXISTS idx_classement_coin ON classement (coin_id, snapshot_id, count)",
+    ]),
+]
+
+
+def version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrer(conn, migrations):
+    """
+    Applique les migrations manquantes ; retourne la liste des versions appliquées.
+
+    Sûr en concurrence (plusieurs workers qui démarrent ensemble) : chaque
+    migration prend le verrou d'écriture (BEGIN IMMEDIATE) puis relit la
+    version avant de s'appliquer.
+    """
+    cible = migrations[-1][0]
+    if version(conn) >= cible:
+        return []
+
+    # WAL est persistant dans le fichier : posé une fois ici, hors transaction
+    conn.execute("PRAGMA journal_mode = WAL")
+
+    appliquees = []
+    isolation = conn.isolation_level
+    conn.isolation_level = None  # transactions explicites
+    try:
+        for numero, _, etapes in migrations:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if version(conn) >= numero:
+                    conn.execute("ROLLBACK")
+                    continue
+                for etape in etapes:
+                    if callable(etape):
+                        etape(conn)
+                    else:
+                        conn.execute(etape)
+                conn.execute(f"PRAGMA user_version = {numero}")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            appliquees.append(numero)
+    finally:
+        conn.isolation_level = isolation
+    return appliquees
+
+
+def migrer_articles(conn):
+    return migrer(conn, MIGRATIONS_ARTICLES)
+
+
+def migrer_leaderboard(conn):
+    return migrer(conn, MIGRATIONS_LEADERBOARD)
+
+
+def migrer_fichier(db_path, migrations):
+    """Ouvre (ou crée) la base `db_path` et la met à jour."""
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    try:
+        return migrer(conn, migrations)
+    finally:
+        conn.close()
+
+
+def main():
+    """Crée ou met à jour les deux bases (start.sh, setup.sh)."""
+    from db import ARTICLES_DB_PATH, LEADERBOARD_DB_PATH
+
+    for db_path, migrations in ((ARTICLES_DB_PATH, MIGRATIONS_ARTICLES), (LEADERBOARD_DB_PATH, MIGRATIONS_LEADERBOARD)):
+        appliquees = migrer_fichier(db_path, migrations)
+        if appliquees:
+            descriptions = {numero: description for numero, description, _ in migrations}
+            for numero in appliquees:
+                print(f"{db_path.name} : migration {numero} ({descriptions[numero]})")
+        else:
+            print(f"{db_path.name} : à jour (version {migrations[-1][0]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+from bs4.dammit import EntitySubstitution
+
+# Nettoyage HTML -> texte des résumés RSS, partagé par l'ingestion et les scripts.
+#
+# La référence est BeautifulSoup(html, "html.parser").get_text(separator=" ").strip() :
+# tous les textes du document joints par des espaces, sans commentaires ni
+# contenu de <script>, <style>, <template>, <rt>, <rp>. Backends disponibles :
+#   - "htmlparser" (défaut) : sous-classe de html.parser.HTMLParser qui rejoue
+#     les règles de BeautifulSoup sans construire d'arbre. Même tokenizer, donc
+#     sortie identique octet pour octet, environ 4x plus rapide ;
+#   - "lxml", "selectolax" : dépendances optionnelles, identiques sur les résumés
+#     de flux mais pas sur du HTML pathologique (entités, CDATA, balise tronquée) ;
+#   - "bs4" : la référence.
+# La conformité et le débit de chacun se mesurent avec bench/bench_nettoyage.py
+# sur bench/fixtures/resumes_html.json.
+
+BACKEND_PAR_DEFAUT = os.getenv("NETTOYAGE_BACKEND", "htmlparser")
+# Processus pour nettoyer_lot (1 = dans le process courant)
+PROCESSUS = int(os.getenv("NETTOYAGE_PROCESSUS", "1"))
+# En dessous, démarrer un pool coûte plus cher que le nettoyage lui-même
+SEUIL_PROCESSUS = 2000
+TAILLE_BLOC = 500
+
+# Règles de BeautifulSoup (bs4.builder.HTMLTreeBuilder)
+ESPACES_ASCII = "\x20\x0a\x09\x0c\x0d"
+CONTENEURS_EXCLUS = {"script", "style", "template", "rt", "rp"}
+ESPACES_PRESERVES = {"pre", "textarea"}
+BALISES_VIDES = {
+    "area", "base", "basefont", "bgsound", "br", "col", "command", "embed", "frame", "hr",
+    "image", "img", "input", "isindex", "keygen", "link", "menuitem", "meta", "nextid",
+    "param", "source", "spacer", "track", "wbr",
+}
+ENTITES = EntitySubstitution.HTML_ENTITY_TO_CHARACTER
+
+
+def _normaliser(texte, preserve):
+    """Un texte fait uniquement d'espaces ASCII devient " " ou "\\n" (hors <pre>/<textarea>)."""
+    if not preserve and not texte.strip(ESPACES_ASCII):
+        return "\n" if "\n" in texte else " "
+    return texte
+
+
+class _Textes:
+    """
+    Suit les balises ouvertes comme l'arbre de BeautifulSoup, pour savoir si
+    un texte est retenu (hors conteneur exclu) et si ses espaces sont préservés.
+    """
+
+    def __init__(self):
+        self.morceaux = []
+        self._pile = []
+        self._ouvertes = {}
+        self._conteneurs = 0
+        self._preserve = 0
+
+    def ouvrir(self, nom):
+        self._pile.append(nom)
+        self._ouvertes[nom] = self._ouvertes.get(nom, 0) + 1
+        if nom in CONTENEURS_EXCLUS:
+            self._conteneurs += 1
+        if nom in ESPACES_PRESERVES:
+            self._preserve += 1
+
+    def fermer(self, nom):
+        """Dépile jusqu'à la dernière balise `nom` ouverte ; rien si elle ne l'est pas."""
+        if not self._ouvertes.get(nom):
+            return
+        while True:
+            haut = self._pile.pop()
+            self._ouvertes[haut] -= 1
+            if haut in CONTENEURS_EXCLUS:
+                self._conteneurs -= 1
+            if haut in ESPACES_PRESERVES:
+                self._preserve -= 1
+            if haut == nom:
+                return
+
+    def texte(self, texte, cdata=False):
+        texte = _normaliser(texte, self._preserve)
+        # une section CDATA est retenue même dans un conteneur exclu
+        if cdata or not self._conteneurs:
+            self.morceaux.append(texte)
+
+    def resultat(self):
+        return " ".join(self.morceaux).strip()
+
+
+class _ExtracteurHTMLParser(HTMLParser):
+    """Rejoue les événements de BeautifulSoupHTMLParser sans construire d'arbre."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.textes = _Textes()
+        self._donnees = []
+        # balises vides déjà fermées : un </br> ultérieur est ignoré
+        self._deja_fermees = []
+
+    def _vider(self, cdata=False):
+        if self._donnees:
+            texte = "".join(self._donnees)
+            self._donnees = []
+            self.textes.texte(texte, cdata)
+
+    def handle_starttag(self, tag, attrs, vide=True):
+        self._vider()
+        self.textes.ouvrir(tag)
+        if vide and tag in BALISES_VIDES:
+            self.handle_endtag(tag, verifier=False)
+            self._deja_fermees.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, vide=False)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag, verifier=True):
+        if verifier and tag in self._deja_fermees:
+            self._deja_fermees.remove(tag)
+            return
+        self._vider()
+        self.textes.fermer(tag)
+
+    def handle_data(self, data):
+        self._donnees.append(data)
+
+    def handle_charref(self, name):
+        if name.startswith(("x", "X")):
+            code = int(name.lstrip("xX"), 16)
+        else:
+            code = int(name)
+        data = None
+        if code < 256:
+            # &#147; & co : références Windows-1252 plutôt qu'Unicode
+            try:
+                data = bytearray([code]).decode("windows-1252")
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(code)
+            except (ValueError, OverflowError):
+                pass
+        self._donnees.append(data or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name):
+        caractere = ENTITES.get(name)
+        self._donnees.append(caractere if caractere is not None else f"&{name}")
+
+    def _ignorer(self, data):
+        self._vider()
+
+    handle_comment = handle_decl = handle_pi = _ignorer
+
+    def unknown_decl(self, data):
+        self._vider()
+        if data.upper().startswith("CDATA["):
+            self._donnees.append(data[len("CDATA["):])
+            self._vider(cdata=True)
+
+    def extraire(self, html):
+        self.feed(html)
+        self.close()
+        self._vider()
+        return self.textes.resultat()
+
+
+def _nettoyer_bs4(html):
+    return BeautifulSoup(html, "html.parser").get_text(separator=" ").strip()
+
+
+def _nettoyer_htmlparser(html):
+    return _ExtracteurHTMLParser().extraire(html)
+
+
+class _CibleLxml:
+    """Cible du parseur lxml (interface SAX) : mêmes règles que _ExtracteurHTMLParser."""
+
+    def __init__(self):
+        self.textes = _Textes()
+        self._donnees = []
+
+    def _vider(self):
+        if self._donnees:
+            texte = "".join(self._donnees)
+            self._donnees = []
+            self.textes.texte(texte)
+
+    def start(self, tag, attrib):
+        self._vider()
+        self.textes.ouvrir(tag)
+
+    def end(self, tag):
+        self._vider()
+        self.textes.fermer(tag)
+
+    def data(self, data):
+        self._donnees.append(data)
+
+    def comment(self, text):
+        self._vider()
+
+    def pi(self, target, data=None):
+        self._vider()
+
+    def close(self):
+        self._vider()
+        return self.textes.resultat()
+
+
+def _nettoyer_lxml(html):
+    from lxml import etree
+
+    if not html.strip():
+        return ""
+    parser = etree.HTMLParser(target=_CibleLxml())
+    parser.feed(html)
+    return parser.close()
+
+
+def _nettoyer_selectolax(html):
+    from selectolax.lexbor import LexborHTMLParser
+
+    if not html.strip():
+        return ""
+    racine = LexborHTMLParser(html).root
+    textes = _Textes()
+    # retire les conteneurs exclus avec leur contenu
+    racine.strip_tags(sorted(CONTENEURS_EXCLUS))
+    for noeud in racine.traverse(include_text=True):
+        if noeud.tag != "-text":
+            continue
+        texte = noeud.text_content
+        preserve = False
+        if not texte.strip(ESPACES_ASCII):
+            parent = noeud.parent
+            while parent is not None and not preserve:
+                preserve = parent.tag in ESPACES_PRESERVES
+                parent = parent.parent
+        textes.morceaux.append(_normaliser(texte, preserve))
+    return textes.resultat()
+
+
+BACKENDS = {
+    "bs4": _nettoyer_bs4,
+    "htmlparser": _nettoyer_htmlparser,
+    "lxml": _nettoyer_lxml,
+    "selectolax": _nettoyer_selectolax,
+}
+
+
+def backend(nom=None):
+    """Fonction de nettoyage du backend `nom` (par défaut NETTOYAGE_BACKEND, ou htmlparser)."""
+    nom = nom or BACKEND_PAR_DEFAUT
+    if nom not in BACKENDS:
+        raise ValueError(f"Backend de nettoyage inconnu : {nom} (attendu : {', '.join(BACKENDS)})")
+    return BACKENDS[nom]
+
+
+def nettoyer(html, backend_nom=None):
+    """Texte brut d'un fragment HTML, identique à la sortie de BeautifulSoup."""
+    return backend(backend_nom)(html)
+
+
+def _nettoyer_bloc(resumes, backend_nom):
+    fonction = backend(backend_nom)
+    return [fonction(html) for html in resumes]
+
+
+def nettoyer_lot(resumes, backend_nom=None, processus=None):
+    """
+    Nettoie une liste de fragments HTML, dans l'ordre.
+
+    Au-delà de SEUIL_PROCESSUS fragments et avec `processus` > 1 (défaut :
+    NETTOYAGE_PROCESSUS), le travail est réparti par blocs sur un pool de
+    processus : utile pour un gros rattrapage, pas pour un rafraîchissement courant.
+    """
+    resumes = list(resumes)
+    processus = PROCESSUS if processus is None else processus
+    backend_nom = backend_nom or BACKEND_PAR_DEFAUT
+    if processus <= 1 or len(resumes) < SEUIL_PROCESSUS:
+        return _nettoyer_bloc(resumes, backend_nom)
+
+    blocs = [resumes[i:i + TAILLE_BLOC] for i in range(0, len(resumes), TAILLE_BLOC)]
+    with ProcessPoolExecutor(max_workers=processus) as pool:
+        return [
+            texte
+            for bloc in pool.map(_nettoyer_bloc, blocs, [backend_nom] * len(blocs))
+            for texte in bloc
+        ]
@@ -0,0 +1,279 @@
+import asyncio
+from collections import OrderedDict
+from itertools import islice
+
+import httpx
+
+import cache_extractions
+import ingestion
+import metriques
+
+# Traitement en flux, pour les gros rattrapages (des années d'archives de flux
+# RSS) : chaque étape est un générateur asynchrone qui consomme la précédente,
+#
+#   telecharger -> parser -> nettoyer -> dedoublonner -> inserer      (flux -> articles)
+#   lire_a_extraire -> extraire -> enregistrer                        (articles -> extractions)
+#
+# et les étapes qui doivent avancer en parallèle tournent dans leur propre tâche
+# derrière une file bornée (en_tache). Une étape lente fait attendre celles
+# d'avant au lieu de laisser les éléments s'accumuler : la mémoire dépend des
+# tailles de files et de lots, pas du nombre d'articles.
+#
+# Reprise après interruption : les articles d'une page sont enregistrés dans
+# la même transaction que son url dans `reprises_flux`, une page qui y figure
+# est donc entièrement insérée. La table est propre à chaque traitement (nom de
+# reprise) : flux_etat, lui, est aussi tenu par le rafraîchissement courant, et
+# n'indique pas ce qu'un rattrapage a déjà fait. L'extraction, elle, mémorise
+# dans `reprises` le dernier id d'article traité (backfill.py --reprendre).
+
+# Éléments en attente entre deux étapes (pages de flux, ou lots d'articles)
+TAILLE_FILE = 4
+# Articles par transaction d'insertion, et par lot d'extraction
+TAILLE_LOT = 500
+# Téléchargements simultanés (au plus ingestion.LIMITES connexions)
+CONCURRENCE = 8
+# Liens mémorisés pour écarter les doublons entre flux proches ; au-delà,
+# l'index unique de `lien` écarte les doublons à l'insertion
+MEMOIRE_LIENS = 50_000
+
+ETAPES = metriques.histogramme("pipeline_etape_secondes", "Durée des étapes du pipeline en flux, par lot", ("etape",))
+ELEMENTS = metriques.compteur("pipeline_articles_total", "Articles sortis de chaque étape du pipeline", ("etape",))
+
+_FIN = object()
+
+
+async def en_tache(source, taille=TAILLE_FILE):
+    """
+    Itère `source` dans une tâche à part, à travers une file de `taille` éléments :
+    la source avance pendant que le consommateur travaille, et s'arrête quand la
+    file est pleine. Une exception de la source est relancée chez le consommateur ;
+    si le consommateur s'arrête, la source est annulée.
+    """
+    file = asyncio.Queue(maxsize=taille)
+
+    async def produire():
+        try:
+            async for element in source:
+                await file.put((element, None))
+        except Exception as e:
+            await file.put((_FIN, e))
+        else:
+            await file.put((_FIN, None))
+        finally:
+            await source.aclose()
+
+    tache = asyncio.ensure_future(produire())
+    try:
+        while True:
+            element, erreur = await file.get()
+            if element is _FIN:
+                if erreur is not None:
+                    raise erreur
+                return
+            yield element
+    finally:
+        if not tache.done():
+            tache.cancel()
+            try:
+                await tache
+            except asyncio.CancelledError:
+                pass
+
+
+# --- flux -> articles -----------------------------------------------------------
+
+async def telecharger(urls, etats=None, concurrence=CONCURRENCE, client=None):
+    """
+    (ResultatFlux, contenu) de chaque url, dans l'ordre d'arrivée. Les urls sont
+    lues au fur et à mesure (un générateur de pages d'archives convient) et au
+    plus `concurrence` téléchargements sont en cours. Avec `etats`, les requêtes
+    sont conditionnelles, comme ingestion.recuperer_flux.
+    """
+    etats = etats or {}
+    if client is None:
+        async with httpx.AsyncClient(timeout=ingestion.TIMEOUT, limits=ingestion.LIMITES,
+                                     follow_redirects=True) as client:
+            async for element in telecharger(urls, etats, concurrence, client):
+                yield element
+        return
+
+    urls = iter(urls)
+    en_cours = set()
+    try:
+        while True:
+            for url in islice(urls, concurrence - len(en_cours)):
+                en_cours.add(asyncio.ensure_future(ingestion.requeter(client, url, etats.get(url))))
+            if not en_cours:
+                return
+            termines, en_cours = await asyncio.wait(en_cours, return_when=asyncio.FIRST_COMPLETED)
+            for tache in termines:
+                yield tache.result()
+    finally:
+        for tache in en_cours:
+            tache.cancel()
+
+
+async def parser(telechargements, limite=None):
+    """ResultatFlux avec ses entrées (les `limite` premières, toutes par défaut), parsées hors de la boucle."""
+    async for resultat, contenu in telechargements:
+        if contenu is not None:
+            feed = await asyncio.to_thread(ingestion.parser_flux, contenu)
+            resultat.entrees = feed.entries[:limite]
+        yield resultat
+
+
+async def nettoyer(resultats):
+    """(ResultatFlux, [(titre, lien, contenu_ia, date_publication)]) : les entrées de chaque page nettoyées en un lot."""
+    async for resultat in resultats:
+        articles = []
+        if resultat.entrees:
+            articles = await asyncio.to_thread(ingestion.entrees_vers_articles, resultat.entrees)
+            # les entrées feedparser pèsent bien plus que les articles : libérées tout de suite
+            resultat.entrees = []
+        yield resultat, articles
+
+
+async def dedoublonner(pages, memoire=MEMOIRE_LIENS):
+    """Écarte les articles dont le lien vient de passer (les `memoire` derniers liens, en LRU)."""
+    vus = OrderedDict()
+    async for resultat, articles in pages:
+        uniques = []
+        for article in articles:
+            lien = article[1]
+            if lien in vus:
+                vus.move_to_end(lien)
+                continue
+            vus[lien] = None
+            if len(vus) > memoire:
+                vus.popitem(last=False)
+            uniques.append(article)
+        yield resultat, uniques
+
+
+def _inserer(conn, resultats, articles, nom_reprise=None):
+    with ETAPES.chronometrer("insertion"), conn:
+        count_new, count_existing = ingestion.inserer_articles(conn, articles)
+        ingestion.enregistrer_etats(conn, resultats)
+        if nom_reprise:
+            sauver_flux_traites(conn, nom_reprise, [r.url for r in resultats if not r.erreur])
+    ELEMENTS.ajouter(count_new, "insertion")
+    return {
+        "total_fetched": len(articles),
+        "new_articles": count_new,
+        "existing_articles": count_existing,
+        "feeds_unchanged": sum(r.statut == 304 for r in resultats),
+        "feeds_failed": [r.url for r in resultats if r.erreur],
+    }
+
+
+async def inserer(pages, conn, taille_lot=TAILLE_LOT, nom_reprise=None):
+    """
+    Insère les articles par transactions d'au moins `taille_lot` articles (les
+    pages entières), avec l'état des flux correspondants et, avec `nom_reprise`,
+    les urls traitées (reprises_flux) ; donne le bilan de chaque transaction,
+    aux clés d'ingestion.enregistrer.
+    """
+    resultats, articles = [], []
+    async for resultat, uniques in pages:
+        resultats.append(resultat)
+        articles.extend(uniques)
+        if len(articles) >= taille_lot:
+            yield _inserer(conn, resultats, articles, nom_reprise)
+            resultats, articles = [], []
+    if resultats:
+        yield _inserer(conn, resultats, articles, nom_reprise)
+
+
+def ingerer(conn, urls, etats=None, concurrence=CONCURRENCE, limite=None,
+            taille_lot=TAILLE_LOT, taille_file=TAILLE_FILE, nom_reprise=None):
+    """
+    telecharger -> parser -> nettoyer -> dedoublonner -> inserer : générateur
+    asynchrone des bilans d'insertion. Le parsing et le nettoyage ont chacun
+    leur tâche, pour avancer pendant les téléchargements et les insertions.
+    """
+    pages = en_tache(parser(telecharger(urls, etats, concurrence), limite), taille_file)
+    pages = en_tache(nettoyer(pages), taille_file)
+    return inserer(dedoublonner(pages), conn, taille_lot, nom_reprise)
+
+
+# --- articles -> extractions ----------------------------------------------------
+
+def lire_flux_traites(conn, nom):
+    """Urls déjà traitées par le traitement `nom` (reprises_flux)."""
+    return {url for url, in conn.execute("SELECT url FROM reprises_flux WHERE nom = ?", (nom,))}
+
+
+def sauver_flux_traites(conn, nom, urls):
+    """Ajoute `urls` aux flux traités par `nom`, dans la transaction en cours."""
+    conn.executemany(
+        "INSERT OR IGNORE INTO reprises_flux (nom, url) VALUES (?, ?)",
+        [(nom, url) for url in urls]
+    )
+
+
+def lire_reprise(conn, nom):
+    """Dernier id d'article traité par le traitement `nom` (0 s'il n'a jamais tourné)."""
+    ligne = conn.execute("SELECT article_id FROM reprises WHERE nom = ?", (nom,)).fetchone()
+    return ligne[0] if ligne else 0
+
+
+def sauver_reprise(conn, nom, article_id):
+    with conn:
+        conn.execute("""
+            INSERT INTO reprises (nom, article_id) VALUES (?, ?)
+            ON CONFLICT (nom) DO UPDATE SET article_id = excluded.article_id, mis_a_jour = CURRENT_TIMESTAMP
+        """, (nom, article_id))
+
+
+async def lire_a_extraire(conn, versions_valides, apres_id=0, taille_lot=TAILLE_LOT):
+    """Lots (id, contenu_ia) de cache_extractions.lots_a_extraire, d'id > `apres_id`."""
+    for lot in cache_extractions.lots_a_extraire(conn, versions_valides, apres_id, taille_lot):
+        yield lot
+
+
+async def extraire(lots, analyser_lot):
+    """
+    (lot, groupes) : `analyser_lot` est une coroutine qui reçoit un lot
+    (id, contenu_ia) et retourne les groupes à enregistrer, des
+    (rows, resultats, version_prompt, modele) comme enregistrer_extractions.
+    """
+    async for lot in lots:
+        groupes = await analyser_lot(lot)
+        ELEMENTS.ajouter(len(lot), "extraction")
+        yield lot, groupes
+
+
+async def enregistrer(extraits, conn, nom_reprise=None):
+    """
+    Enregistre les groupes de chaque lot, puis avance le point de reprise
+    `nom_reprise`. Le point de reprise ne dépasse jamais un article en échec
+    (résultat à None) : tout ce qui le précède est extrait, et une reprise
+    repasse par les échecs. Donne (lot, groupes) une fois enregistrés.
+    """
+    bloque = False
+    async for lot, groupes in extraits:
+        echecs = [
+            article_id
+            for rows, resultats, _, _ in groupes
+            for (article_id, _), coins in zip(rows, resultats)
+            if coins is None
+        ]
+        with ETAPES.chronometrer("enregistrement"):
+            for rows, resultats, version, modele in groupes:
+                cache_extractions.enregistrer_extractions(conn, rows, resultats, version, modele)
+            if nom_reprise and not bloque:
+                sauver_reprise(conn, nom_reprise, min(echecs) - 1 if echecs else lot[-1][0])
+        bloque = bloque or bool(echecs)
+        ELEMENTS.ajouter(len(lot), "enregistrement")
+        yield lot, groupes
+
+
+def analyser(conn, versions_valides, analyser_lot, apres_id=0, nom_reprise=None,
+             taille_lot=TAILLE_LOT, taille_file=TAILLE_FILE):
+    """
+    lire_a_extraire -> extraire -> enregistrer : l'extraction d'un lot avance
+    pendant l'enregistrement du précédent. Générateur asynchrone des
+    (lot, groupes) enregistrés.
+    """
+    lots = lire_a_extraire(conn, versions_valides, apres_id, taille_lot)
+    return enregistrer(en_tache(extraire(lots, analyser_lot), taille_file), conn, nom_reprise)
@@ -0,0 +1,132 @@
+import html
+import os
+import re
+
+# Recherche plein texte dans les articles, partagée par l'API et le serveur MCP.
+# L'index est la table FTS5 `articles_fts` (migration 3 de migrations.py), tenue
+# à jour par des triggers à chaque insertion dans `articles` : l'ingestion n'a
+# rien à faire de plus. Le classement est bm25, le titre pesant plus que le
+# résumé ; la pagination se fait par curseur sur (score, id, borne d'id).
+#
+# Les pages ne sont pas stables si des articles arrivent entre deux pages. La
+# borne écarte bien les nouveaux articles, mais bm25 prend ses statistiques
+# (IDF des termes, longueur moyenne des textes) sur toute la table : chaque
+# insertion change un peu les scores des articles déjà trouvés, et la page
+# suivante, qui reprend après (score, id) de la précédente, peut alors répéter
+# ou sauter quelques résultats. Sans nouvel article, la pagination est exacte.
+#
+# FTS5 calcule bm25 pour chaque article trouvé avant de trier : pour un mot
+# présent dans un article sur quatre (« bitcoin »), c'est environ 480 ms sur un
+# million d'articles (bench/bench_recherche.py), loin des 10 ms visées. Par
+# défaut le classement reste exact, et ces requêtes-là restent lentes ;
+# RECHERCHE_CANDIDATS=N le limite aux N articles trouvés les plus récents, que
+# FTS5 parcourt sans calculer de score pour les autres (17 ms pour « bitcoin »
+# avec N = 2000). Les résultats ne sont alors plus le haut du classement de
+# tous les articles trouvés, et la pagination s'arrête après N :
+# resultats_tronques() le signale.
+
+# Nombre maximal d'articles classés par recherche (0 = tous, bm25 exact)
+RECHERCHE_CANDIDATS = int(os.getenv("RECHERCHE_CANDIDATS", "0"))
+
+# Mots, "phrases exactes" et préfixes (mot*) ; tout le reste est ignoré
+_TERMES = re.compile(r'"([^"]*)"|(\w+)(\*?)')
+_MOTS = re.compile(r"\w+")
+
+SNIPPET_DEBUT = "<mark>"
+SNIPPET_FIN = "</mark>"
+SNIPPET_MOTS = 16
+# Marqueurs demandés à snippet() : caractères de contrôle absents des textes
+# nettoyés, remplacés par <mark> et </mark> une fois le texte échappé
+_SENTINELLE_DEBUT = "\x02"
+_SENTINELLE_FIN = "\x03"
+
+
+def requete_fts(texte):
+    """
+    Requête FTS5 construite depuis la saisie d'un utilisateur, ou "" si elle ne
+    contient aucun mot.
+
+    Chaque mot est cité, pour qu'aucune saisie ne soit interprétée comme de la
+    syntaxe FTS5 (AND, NEAR, colonne:...) : tous les mots doivent être présents.
+    """
+    termes = []
+    for phrase, mot, prefixe in _TERMES.findall(texte):
+        if mot:
+            termes.append(f'"{mot}"{prefixe}')
+        else:
+            mots = _MOTS.findall(phrase)
+            if mots:
+                termes.append('"' + " ".join(mots) + '"')
+    return " ".join(termes)
+
+
+def extrait_html(brut):
+    """Extrait de snippet() échappé pour HTML, les mots trouvés entre <mark> et </mark>."""
+    texte = html.escape(brut or "")
+    return texte.replace(_SENTINELLE_DEBUT, SNIPPET_DEBUT).replace(_SENTINELLE_FIN, SNIPPET_FIN)
+
+
+def rechercher(conn, requete, limit, apres=None, borne=None, candidats=None):
+    """
+    Page de résultats pour une requête FTS5, du plus pertinent au moins pertinent.
+
+    `apres` : (score, id) du dernier résultat de la page précédente.
+    `borne` : id maximal considéré ; fixé à la première page et repris dans le
+    curseur, il écarte les articles arrivés entre-temps. Leurs insertions
+    changent quand même les scores bm25 des autres : l'ordre, lui, n'est pas
+    figé (voir plus haut).
+    Retourne des tuples (id, titre, lien, date_ajout, extrait, score) ; le score
+    est le bm25 de FTS5, négatif, d'autant plus bas que l'article est pertinent.
+    """
+    candidats = RECHERCHE_CANDIDATS if candidats is None else candidats
+    conditions, params = "", []
+    if borne is not None:
+        conditions += " AND rowid <= ?"
+        params.append(borne)
+    if candidats > 0:
+        # les plus récents d'abord : FTS5 s'arrête après `candidats` articles
+        conditions += " ORDER BY rowid DESC LIMIT ?"
+        params.append(candidats)
+
+    # 1) la page seule : le tri ne porte que sur (score, id), sans les textes ni les extraits
+    page = conn.execute(f"""
+        SELECT rowid, rank FROM (
+            SELECT rowid, rank FROM articles_fts
+            WHERE articles_fts MATCH ?{conditions}
+        )
+        {"WHERE (rank, rowid) > (?, ?)" if apres is not None else ""}
+        ORDER BY rank, rowid
+        LIMIT ?
+    """, (requete, *params, *(apres or ()), limit)).fetchall()
+    if not page:
+        return []
+
+    # 2) les extraits, uniquement pour les articles de la page
+    scores = dict(page)
+    rows = conn.execute(f"""
+        SELECT a.id, a.titre, a.lien, a.date_ajout,
+               snippet(articles_fts, -1, ?, ?, '…', ?)
+        FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid
+        WHERE articles_fts MATCH ? AND articles_fts.rowid IN ({", ".join("?" * len(page))})
+    """, (_SENTINELLE_DEBUT, _SENTINELLE_FIN, SNIPPET_MOTS, requete, *scores)).fetchall()
+    return sorted(
+        (row[:4] + (extrait_html(row[4]), scores[row[0]]) for row in rows),
+        key=lambda row: (row[5], row[0])
+    )
+
+
+def resultats_tronques(conn, requete, borne=None, candidats=None):
+    """
+    True si le classement a été limité à `candidats` articles (RECHERCHE_CANDIDATS
+    par défaut) alors que la requête en trouve davantage : il existe un article
+    trouvé au-delà des `candidats` plus récents.
+    """
+    candidats = RECHERCHE_CANDIDATS if candidats is None else candidats
+    if candidats <= 0:
+        return False
+    return conn.execute(f"""
+        SELECT 1 FROM articles_fts
+        WHERE articles_fts MATCH ?{" AND rowid <= ?" if borne is not None else ""}
+        ORDER BY rowid DESC
+        LIMIT 1 OFFSET ?
+    """, (requete, *([borne] if borne is not None else []), candidats)).fetchone() is not None
@@ -0,0 +1,138 @@
+import sqlite3
+
+import coins
+
+# Chaque exécution de analyse_articles.py produit un snapshot : un classement
+# complet rattaché à une ligne de `snapshots`. Les lectures ne portent que sur
+# le snapshot courant (pointeur dans `snapshot_courant`), via des index
+# couvrants, quel que soit le volume d'historique accumulé. Une ligne de
+# classement ne contient que des entiers : le coin y est un id de la table
+# `coins` (coins.py), son symbole et son nom sont joints à la lecture.
+
+
+def creer_snapshot(conn, leaderboard, premier_article_id=None, dernier_article_id=None, nb_articles=None):
+    """
+    Enregistre un nouveau classement et en fait le snapshot courant, en une transaction.
+
+    `leaderboard` est une liste de dicts {rank, symbol, name, count} ; les
+    coins encore inconnus sont ajoutés au référentiel.
+    """
+    with conn:
+        snapshot_id = conn.execute(
+            "INSERT INTO snapshots (premier_article_id, dernier_article_id, nb_articles) VALUES (?, ?, ?)",
+            (premier_article_id, dernier_article_id, nb_articles)
+        ).lastrowid
+        ids = coins.interner(conn, [(item['symbol'], item['name']) for item in leaderboard])
+
+        conn.executemany(
+            "INSERT INTO classement (snapshot_id, rank, coin_id, count) VALUES (?, ?, ?, ?)",
+            [(snapshot_id, item['rank'], coin_id, item['count']) for item, coin_id in zip(leaderboard, ids)]
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO snapshot_courant (id, snapshot_id) VALUES (1, ?)", (snapshot_id,)
+        )
+    # data_version ne change pas pour les commits de la connexion elle-même
+    if getattr(conn, "_snapshot_courant", None) is not None:
+        conn._snapshot_courant = None
+    return snapshot_id
+
+
+# Pointeur courant mémorisé sur la connexion elle-même (attribut
+# _snapshot_courant), avec son `PRAGMA data_version` : celui-ci change dès
+# qu'une autre connexion a commité ; tant qu'il est stable, le pointeur aussi.
+# La mémoire disparaît avec la connexion. Une connexion sqlite3 nue n'accepte
+# pas d'attribut : elle relit simplement le pointeur (connexions de db.py :
+# ConnexionMesuree, qui l'accepte).
+
+
+def snapshot_courant(conn):
+    """Retourne l'id du snapshot courant (None si aucun classement n'a encore été produit)."""
+    version = conn.execute("PRAGMA data_version").fetchone()[0]
+    en_cache = getattr(conn, "_snapshot_courant", None)
+    if en_cache is not None and en_cache[0] == version:
+        return en_cache[1]
+
+    try:
+        row = conn.execute("SELECT snapshot_id FROM snapshot_courant WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        # base antérieure aux snapshots, pas encore migrée
+        row = None
+
+    snapshot_id = row[0] if row else None
+    try:
+        conn._snapshot_courant = (version, snapshot_id)
+    except AttributeError:
+        pass
+    return snapshot_id
+
+
+def meme_classement(conn, snapshot_id, leaderboard):
+    """True si le snapshot contient déjà exactement ce classement : mêmes rangs, coins et comptes."""
+    if snapshot_id is None:
+        return False
+    rows = conn.execute("""
+        SELECT c.rank, k.symbol, c.count
+        FROM classement c
+        JOIN coins k ON k.id = c.coin_id
+        WHERE c.snapshot_id = ?
+        ORDER BY c.rank
+    """, (snapshot_id,)).fetchall()
+    return [(rank, symbol.upper(), count) for rank, symbol, count in rows] == [
+        (item['rank'], coins.canonique(item['symbol'], item['name'])[0], item['count']) for item in leaderboard
+    ]
+
+
+def snapshot_existe(conn, snapshot_id):
+    return conn.execute("SELECT 1 FROM snapshots WHERE id = ?", (snapshot_id,)).fetchone() is not None
+
+
+def classement_snapshot(conn, snapshot_id, limit, offset=0, apres_rang=None):
+    """
+    Lignes (rank, coin_id, count, created_at) du snapshot, par rang ; `apres_rang`
+    reprend après le dernier rang de la page précédente (curseur).
+    """
+    return conn.execute(f"""
+        SELECT c.rank, c.coin_id, c.count, s.created_at
+        FROM classement c
+        JOIN snapshots s ON s.id = c.snapshot_id
+        WHERE c.snapshot_id = ?{" AND c.rank > ?" if apres_rang is not None else ""}
+        ORDER BY c.rank
+        LIMIT ? OFFSET ?
+    """, (snapshot_id, *([apres_rang] if apres_rang is not None else []), limit, offset)).fetchall()
+
+
+def cryptos_du_snapshot(conn, snapshot_id, coin_ids):
+    """
+    Lignes (rank, coin_id, count, created_at) du snapshot pour une liste de
+    coins, en une requête sur l'index (coin_id, snapshot_id) ; retourne un dict
+    coin_id -> ligne, sans les coins absents du classement.
+    """
+    if not coin_ids:
+        return {}
+    rows = conn.execute(f"""
+        SELECT c.rank, c.coin_id, c.count, s.created_at
+        FROM classement c
+        JOIN snapshots s ON s.id = c.snapshot_id
+        WHERE c.snapshot_id = ? AND c.coin_id IN ({", ".join("?" * len(coin_ids))})
+    """, (snapshot_id, *coin_ids)).fetchall()
+    # premier rang si un coin apparaît deux fois (anciens classements, avant les alias)
+    trouves = {}
+    for row in sorted(rows):
+        trouves.setdefault(row[1], row)
+    return trouves
+
+
+def historique_coin(conn, coin_id, limit):
+    """
+    Lignes (snapshot_id, created_at, rank, count) d'un coin dans les `limit`
+    derniers snapshots où il est classé, du plus récent au plus ancien, par
+    l'index couvrant (coin_id, snapshot_id).
+    """
+    return conn.execute("""
+        SELECT c.snapshot_id, s.created_at, c.rank, c.count
+        FROM classement c
+        JOIN snapshots s ON s.id = c.snapshot_id
+        WHERE c.coin_id = ?
+        ORDER BY c.snapshot_id DESC
+        LIMIT ?
+    """, (coin_id, limit)).fetchall()
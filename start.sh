@@ -1,41 +1,7 @@
 #!/bin/bash
 
-python -c "
-import sqlite3
-from pathlib import Path
-
-# Base de données articles
-if not Path('articles.db').exists():
-    conn = sqlite3.connect('articles.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS articles (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            titre TEXT NOT NULL,
-            lien TEXT UNIQUE NOT NULL,
-            date_ajout TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-# Base de données leaderboard
-if not Path('leaderboard.db').exists():
-    conn = sqlite3.connect('leaderboard.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS classement (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            rank INTEGER NOT NULL,
-            name TEXT NOT NULL,
-            symbol TEXT NOT NULL,
-            count INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
-"
+# Création ou mise à jour du schéma des deux bases
+python migrations.py
 
 # Démarrer l'application avec Gunicorn + Uvicorn workers
 exec gunicorn api:app --workers 2 --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:${PORT:-8000}
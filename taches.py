@@ -0,0 +1,168 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import uuid
+
+import ingestion
+import migrations
+from db import ARTICLES_DB_PATH, SCRIPT_DIR, connexion_ecriture
+
+# Rafraîchissement des articles en tâche de fond.
+# Les jobs sont enregistrés dans articles.db, visibles de tous les workers
+# gunicorn : un index unique partiel garantit qu'un seul rafraîchissement est
+# actif à la fois, quel que soit le worker qui reçoit la requête.
+
+TYPE_RAFRAICHISSEMENT = "refresh-articles"
+# Un job « en cours » plus vieux que ça est considéré comme perdu (worker tué)
+DUREE_MAX_JOB = 600
+# Rafraîchissement périodique en secondes (0 = désactivé)
+REFRESH_INTERVAL = int(os.getenv("REFRESH_INTERVAL", "0"))
+FICHIER_VERROU = SCRIPT_DIR / ".refresh.lock"
+# Attentes (s) entre les tentatives d'enregistrer l'échec d'un job
+ATTENTES_MARQUAGE = (1, 5, 30)
+
+# garde une référence sur les tâches lancées (sinon le GC peut les annuler)
+_taches = set()
+
+journal = logging.getLogger(__name__)
+
+
+def _reserver_job(type_job):
+    """Crée un job en attente, ou retourne celui déjà actif : (id, créé ?)."""
+    with connexion_ecriture(ARTICLES_DB_PATH) as conn:
+        migrations.migrer_articles(conn)
+        with conn:
+            conn.execute("""
+                UPDATE jobs SET statut = 'echec', fin = CURRENT_TIMESTAMP, erreur = 'Job interrompu'
+                WHERE type = ? AND statut IN ('en_attente', 'en_cours')
+                  AND cree_le < datetime('now', ?)
+            """, (type_job, f"-{DUREE_MAX_JOB} seconds"))
+
+            job_id = uuid.uuid4().hex
+            cree = conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, type, statut) VALUES (?, ?, 'en_attente')",
+                (job_id, type_job)
+            ).rowcount == 1
+            if not cree:
+                job_id = conn.execute(
+                    "SELECT id FROM jobs WHERE type = ? AND statut IN ('en_attente', 'en_cours')",
+                    (type_job,)
+                ).fetchone()[0]
+    return job_id, cree
+
+
+def _marquer(job_id, statut, resultat=None, erreur=None):
+    with connexion_ecriture(ARTICLES_DB_PATH) as conn:
+        with conn:
+            if statut == "en_cours":
+                conn.execute("UPDATE jobs SET statut = ?, debut = CURRENT_TIMESTAMP WHERE id = ?", (statut, job_id))
+            else:
+                conn.execute(
+                    "UPDATE jobs SET statut = ?, fin = CURRENT_TIMESTAMP, resultat = ?, erreur = ? WHERE id = ?",
+                    (statut, json.dumps(resultat) if resultat is not None else None, erreur, job_id)
+                )
+
+
+def _lire_etats():
+    with connexion_ecriture(ARTICLES_DB_PATH) as conn:
+        migrations.migrer_articles(conn)
+        return ingestion.lire_etats(conn)
+
+
+def _enregistrer(resultats):
+    with connexion_ecriture(ARTICLES_DB_PATH) as conn:
+        return ingestion.enregistrer(conn, resultats)
+
+
+async def _executer_rafraichissement(job_id):
+    try:
+        await asyncio.to_thread(_marquer, job_id, "en_cours")
+        # réseau en asynchrone ; parsing HTML et INSERT dans un thread, hors boucle d'événements
+        etats = await asyncio.to_thread(_lire_etats)
+        resultats = await ingestion.recuperer_flux(ingestion.flux_configures(), etats)
+        resume = await asyncio.to_thread(_enregistrer, resultats)
+        await asyncio.to_thread(_marquer, job_id, "termine", resume)
+    except Exception as e:
+        journal.exception("Rafraîchissement %s en échec", job_id)
+        # l'échec vient souvent de la base elle-même (verrouillée) : on réessaie
+        # de l'enregistrer, pour ne pas laisser le job actif et bloquer les suivants
+        for attente in (*ATTENTES_MARQUAGE, None):
+            try:
+                await asyncio.to_thread(_marquer, job_id, "echec", None, str(e))
+                break
+            except Exception:
+                if attente is None:
+                    # dernier recours : _reserver_job le déclarera perdu après DUREE_MAX_JOB
+                    journal.exception("Échec du rafraîchissement %s non enregistré", job_id)
+                else:
+                    await asyncio.sleep(attente)
+
+
+async def lancer_rafraichissement():
+    """
+    Lance un rafraîchissement en tâche de fond, sauf s'il y en a déjà un d'actif.
+
+    Retourne (job_id, créé ?) : deux appels concurrents obtiennent le même job.
+    """
+    job_id, cree = await asyncio.to_thread(_reserver_job, TYPE_RAFRAICHISSEMENT)
+    if cree:
+        tache = asyncio.create_task(_executer_rafraichissement(job_id))
+        _taches.add(tache)
+        tache.add_done_callback(_taches.discard)
+    return job_id, cree
+
+
+def lire_job(conn, job_id):
+    row = conn.execute(
+        "SELECT id, type, statut, cree_le, debut, fin, resultat, erreur FROM jobs WHERE id = ?",
+        (job_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {
+        "id": row[0],
+        "type": row[1],
+        "statut": row[2],
+        "cree_le": row[3],
+        "debut": row[4],
+        "fin": row[5],
+        "resultat": json.loads(row[6]) if row[6] else None,
+        "erreur": row[7],
+    }
+
+
+def _prendre_verrou():
+    """Élection : le worker qui obtient le verrou exclusif sur le fichier fait tourner le planificateur."""
+    fichier = open(FICHIER_VERROU, "w")
+    try:
+        fcntl.flock(fichier, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        fichier.close()
+        return None
+    return fichier
+
+
+async def planificateur(intervalle=REFRESH_INTERVAL):
+    """
+    Rafraîchit les articles toutes les `intervalle` secondes, sur un seul worker.
+
+    Les autres workers retentent l'élection à chaque période : si l'élu
+    s'arrête, le verrou est libéré et un autre prend le relais.
+    """
+    verrou = None
+    try:
+        while True:
+            if verrou is None:
+                verrou = _prendre_verrou()
+            if verrou is not None:
+                # une erreur passagère (base verrouillée...) ne doit pas arrêter le planificateur
+                try:
+                    await lancer_rafraichissement()
+                except Exception:
+                    journal.exception("Rafraîchissement périodique non lancé")
+            await asyncio.sleep(intervalle)
+    finally:
+        if verrou is not None:
+            verrou.close()
@@ -0,0 +1,194 @@
+"""
+Moteur d'extraction (extraction.py) contre le faux modèle de bench/faux_modele.py :
+débit du seau à jetons, reprises sur 429/5xx, scission des lots, et articles
+en échec laissés à None pour être repris au run suivant.
+
+    python -m pytest -q tests
+"""
+import asyncio
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+RACINE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RACINE))
+sys.path.insert(0, str(RACINE / "bench"))
+
+import cache_extractions
+import extraction
+import ingestion
+import migrations
+from extraction import LimiteurDebit, Statistiques, appeler_modele, extraire_tous
+from faux_modele import ErreurAPI, FauxModele
+
+TEXTES = [
+    "Titre: Bitcoin dépasse 100k\nRésumé: BTC et Ethereum progressent.",
+    "Titre: Solana ETF\nRésumé: SOL attire les institutionnels.",
+    "Titre: Régulation\nRésumé: la SEC publie un rapport sur la blockchain.",
+    "Titre: XRP et BNB\nRésumé: XRP rebondit, BNB suit.",
+]
+RPM_ILLIMITE = 600_000
+
+
+class ModeleEnErreur(FauxModele):
+    """Faux modèle qui lève `codes` dans l'ordre avant de répondre (ou toujours, avec `toujours`)."""
+
+    def __init__(self, *codes, toujours=False, si=None):
+        super().__init__(latence=0)
+        self.codes = list(codes)
+        self.toujours = toujours
+        self.si = si
+
+    def _verifier_quota(self):
+        self.nb_appels += 1
+
+    async def generate_content_async(self, prompt):
+        self._verifier_quota()
+        if self.si is not None and self.si not in prompt:
+            return self._reponse(prompt)
+        if self.toujours:
+            raise ErreurAPI(self.codes[0])
+        if self.codes:
+            raise ErreurAPI(self.codes.pop(0))
+        return self._reponse(prompt)
+
+
+@pytest.fixture(autouse=True)
+def backoff_court(monkeypatch):
+    monkeypatch.setattr(extraction, "BACKOFF_BASE", 0.001)
+
+
+def extraire(modele, textes, **options):
+    options.setdefault("rpm", RPM_ILLIMITE)
+    stats = Statistiques()
+    return asyncio.run(extraire_tous(modele, textes, stats=stats, **options)), stats
+
+
+# --- seau à jetons --------------------------------------------------------------
+
+def test_limiteur_rafale_sans_attente():
+    async def scenario():
+        limiteur = LimiteurDebit(60, rafale=5)
+        debut = time.monotonic()
+        for _ in range(5):
+            await limiteur.acquerir()
+        return time.monotonic() - debut
+
+    assert asyncio.run(scenario()) < 0.05
+
+
+def test_limiteur_debit():
+    # 600 rpm = 10 jetons/s, rafale 1 : 6 jetons en 0,5 s
+    async def scenario():
+        limiteur = LimiteurDebit(600, rafale=1)
+        debut = time.monotonic()
+        for _ in range(6):
+            await limiteur.acquerir()
+        return time.monotonic() - debut
+
+    assert 0.45 <= asyncio.run(scenario()) < 0.8
+
+
+def test_limiteur_penaliser():
+    async def scenario():
+        limiteur = LimiteurDebit(600, rafale=1)
+        limiteur.penaliser(0.3)
+        debut = time.monotonic()
+        await limiteur.acquerir()
+        return time.monotonic() - debut
+
+    # 0,3 s de pénalité puis 0,1 s pour le jeton
+    assert 0.35 <= asyncio.run(scenario()) < 0.7
+
+
+# --- reprises -------------------------------------------------------------------
+
+@pytest.mark.parametrize("code", [429, 500, 503])
+def test_reprise_sur_429_et_5xx(code):
+    modele = ModeleEnErreur(code, code)
+    response = asyncio.run(appeler_modele(modele, extraction.construire_prompt(TEXTES[0]),
+                                          LimiteurDebit(RPM_ILLIMITE)))
+    assert modele.nb_appels == 3
+    assert {c["symbol"] for c in extraction.lire_coins(response.text)} == {"BTC", "ETH"}
+
+
+@pytest.mark.parametrize("code", [400, 403, 404])
+def test_pas_de_reprise_sur_4xx(code):
+    modele = ModeleEnErreur(code)
+    with pytest.raises(ErreurAPI):
+        asyncio.run(appeler_modele(modele, extraction.construire_prompt(TEXTES[0]),
+                                   LimiteurDebit(RPM_ILLIMITE)))
+    assert modele.nb_appels == 1
+
+
+def test_reprises_epuisees():
+    modele = ModeleEnErreur(503, toujours=True)
+    with pytest.raises(ErreurAPI):
+        asyncio.run(appeler_modele(modele, extraction.construire_prompt(TEXTES[0]),
+                                   LimiteurDebit(RPM_ILLIMITE), tentatives_max=3))
+    assert modele.nb_appels == 3
+
+
+# --- lots -----------------------------------------------------------------------
+
+def test_lot_complet_en_un_appel():
+    modele = FauxModele(latence=0)
+    resultats, stats = extraire(modele, TEXTES, taille_lot=4)
+    assert modele.nb_appels == 1 and stats.lots_scindes == 0
+    assert resultats == extraire(FauxModele(latence=0), TEXTES)[0]
+
+
+@pytest.mark.parametrize("defaut", ["taux_lot_incomplet", "taux_lot_illisible"])
+def test_lot_scinde_apres_reponse_invalide(defaut):
+    modele = FauxModele(latence=0, **{defaut: 1.0})
+    resultats, stats = extraire(modele, TEXTES, taille_lot=4)
+    assert stats.lots_scindes > 0
+    assert resultats == extraire(FauxModele(latence=0), TEXTES)[0]
+
+
+def test_lot_scinde_apres_appel_refuse():
+    # un article refusé (400) : le lot est scindé jusqu'à lui, les autres sont extraits
+    modele = ModeleEnErreur(400, toujours=True, si="Régulation")
+    resultats, stats = extraire(modele, TEXTES, taille_lot=4)
+    assert stats.lots_scindes > 0
+    assert resultats[2] is None
+    assert all(resultats[i] is not None for i in (0, 1, 3))
+
+
+@pytest.mark.parametrize("code", [429, 503])
+def test_lot_non_scinde_sur_429_et_5xx(code):
+    modele = ModeleEnErreur(code, toujours=True)
+    resultats, stats = extraire(modele, TEXTES, taille_lot=4)
+    assert modele.nb_appels == extraction.TENTATIVES_MAX
+    assert stats.lots_scindes == 0
+    assert resultats == [None] * len(TEXTES)
+
+
+# --- échecs repris au run suivant -----------------------------------------------
+
+def test_article_en_echec_repris_au_run_suivant():
+    conn = sqlite3.connect(":memory:")
+    migrations.migrer_articles(conn)
+    with conn:
+        ingestion.inserer_articles(conn, [(f"Article {i}", f"https://exemple.test/{i}", texte)
+                                          for i, texte in enumerate(TEXTES)])
+    valides = [("faux", "v1")]
+
+    rows = cache_extractions.articles_a_extraire(conn, valides)
+    erreurs = []
+    modele = ModeleEnErreur(400, toujours=True, si="Solana")
+    resultats = asyncio.run(extraire_tous(modele, [texte for _, texte in rows], rpm=RPM_ILLIMITE,
+                                          progression=lambda i, coins, erreur: erreurs.append(erreur)))
+    assert resultats[1] is None and sum(e is not None for e in erreurs) == 1
+    cache_extractions.enregistrer_extractions(conn, rows, resultats, "v1", "faux")
+
+    restants = cache_extractions.articles_a_extraire(conn, valides)
+    assert restants == [rows[1]]
+
+    resultats = asyncio.run(extraire_tous(FauxModele(latence=0), [texte for _, texte in restants],
+                                          rpm=RPM_ILLIMITE))
+    cache_extractions.enregistrer_extractions(conn, restants, resultats, "v1", "faux")
+    assert cache_extractions.articles_a_extraire(conn, valides) == []